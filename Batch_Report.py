@@ -0,0 +1,204 @@
+# Batch Report Program
+# Produces the nightly reports for many sites and dates without the Viewing_Tonight window.  Jobs come from a
+# manifest or from the saved locations in user_data_folder, and are spread over a process pool; each job runs
+# the same Viewing pipeline as the "Generate Report" button and writes its HTML/PNG/PDF into its own folder.
+#
+# manifest.json is a list of jobs, anything not given falls back to the command line defaults:
+# [{"site": "user_data_folder/WPRR.json", "date": "2025-05-11", "min_alt": 20},
+#  {"name": "Backyard", "latitude": 41.0, "longitude": -73.0, "date": "2025-05-12",
+#   "min_alt": {"n": 30, "e": 20, "s": 15, "w": 20}, "timezone": "America/New_York", "sampling": "dense",
+#   "sort_by_score": true}]
+# A site's time zone is looked up from its coordinates unless it, or its location file, gives one.  Each job writes
+# into reports/<date>_<name>_alt<min alts>_<sampling>[_score], so jobs that differ only in those do not overwrite
+# each other; a manifest listing the same job twice is refused.
+#
+# python Batch_Report.py --manifest manifest.json
+# python Batch_Report.py --sites user_data_folder --dates 2025-05-11 2025-05-12 --workers 4 --no-pdf
+# python Batch_Report.py --manifest manifest.json --trace batch_trace.json
+
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+
+def load_manifest(file_name):
+    with open(file_name, 'r') as manifest_file:
+        return json.load(manifest_file)
+
+
+def jobs_from_sites(site_folder, dates, min_alt):
+    return [{'site': file_name, 'date': date, 'min_alt': min_alt}
+            for file_name in sorted(glob.glob(os.path.join(site_folder, '*.json'))) for date in dates]
+
+
+def resolve_site(job, site_lookup):
+    # name, latitude and longitude for a job, from the job itself or from its saved location file
+    site = dict(job)
+    if 'site' in job:
+        with open(job['site'], 'r') as json_file:
+            site = {**json.load(json_file), **{k: v for k, v in job.items() if k != 'site'}}
+    if site.get('latitude') is None or site.get('longitude') is None:
+        full_address = f"{site.get('address', '')}, {site.get('city', '')}, {site.get('state', '')}"
+        site['latitude'], site['longitude'] = site_lookup.get_coordinates(full_address)
+    if site.get('latitude') is None or site.get('longitude') is None:
+        raise ValueError(f"Could not find coordinates for {site.get('name', job)}")
+    return site
+
+
+def min_altitudes(min_alt):
+    if isinstance(min_alt, dict):
+        return {f'min_alt_{k}': int(min_alt.get(k, 20)) for k in ['n', 'e', 's', 'w']}
+    return {f'min_alt_{k}': int(min_alt) for k in ['n', 'e', 's', 'w']}
+
+
+def job_folder(job, name):
+    # folder name of a job's outputs, from everything that changes them
+    altitudes = list(min_altitudes(job.get('min_alt', 20)).values())
+    alt = str(altitudes[0]) if len(set(altitudes)) == 1 else '-'.join(str(a) for a in altitudes)
+    folder = f"{job['date']}_{name.replace(' ', '_')}_alt{alt}_{job.get('sampling', 'adaptive')}"
+    return folder + ('_score' if job.get('sort_by_score') else '')
+
+
+def duplicate_jobs(jobs):
+    seen, duplicates = set(), []
+    for job in jobs:
+        key = json.dumps(job, sort_keys=True)
+        if key in seen:
+            duplicates.append(job)
+        seen.add(key)
+    return duplicates
+
+
+def run_job(job, output_root, make_pdf=True, offline=False, inline_plot=False, trace=False):
+    # one report, run inside a pool worker.  Returns the job's timings and output files, and with trace the
+    # spans it recorded (see Trace.Trace)
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    from Ephemeris import Cache
+    from Report.Report import Viewing, Targets, convert_html_to_pdf
+    from Site import Site
+    from Trace import Trace
+
+    Trace.enable(trace)
+    Trace.reset()  # a pool worker runs many jobs, each returns only its own spans
+    timings = {}
+
+    with Trace.span('report', date=job['date']) as report:
+        with Trace.span('site') as stage:
+            site_lookup = Site.SiteLookup(offline=offline)
+            site = resolve_site(job, site_lookup)
+            name = site.get('name') or f"{site['latitude']},{site['longitude']}"
+            report.label(site=name)
+            output_folder = os.path.join(output_root, job_folder(job, name))
+            os.makedirs(output_folder, exist_ok=True)
+        timings['site'] = stage.elapsed
+
+        with Trace.span('construct') as stage:
+            scan_sky = Viewing(site['latitude'], site['longitude'], name, job['date'], engine='numpy',
+                               cache=Cache.EphemerisCache(), height=site.get('height'), site_lookup=site_lookup,
+                               output_folder=output_folder, plot_inline=inline_plot, timezone=site.get('timezone'),
+                               sampling=job.get('sampling', 'adaptive'), **min_altitudes(job.get('min_alt', 20)))
+        timings['construct'] = stage.elapsed
+        with Trace.span('sun_moon') as stage:
+            scan_sky.plot_sun_moon()
+            scan_sky.adjust_delta_midnight()
+        timings['sun_moon'] = stage.elapsed
+        with Trace.span('planets') as stage:
+            for planet in scan_sky.planet_list:
+                scan_sky.check_sky_tonight(planet)
+        timings['planets'] = stage.elapsed
+        with Trace.span('targets') as stage:
+            viewing_targets = Targets()
+            if viewing_targets.data.get('target_group') == 'messier':
+                scan_sky.check_all_messier()
+            if viewing_targets.data.get('target_list'):
+                scan_sky.check_target_list(viewing_targets.data['target_list'])
+        timings['targets'] = stage.elapsed
+        with Trace.span('plan') as stage:
+            scan_sky.schedule()
+        timings['plan'] = stage.elapsed
+        with Trace.span('html') as stage:
+            scan_sky.sort_data()
+            scan_sky.write_out_html()
+            scan_sky.write_out_summary_html(sort_by_rise=job.get('sort_by_rise', True),
+                                            sort_by_score=job.get('sort_by_score', False))
+        timings['html'] = stage.elapsed
+        files = [scan_sky.html_filename, scan_sky.summary_filename] + ([] if inline_plot else [scan_sky.plot_path])
+        if make_pdf:
+            with Trace.span('pdf') as stage:
+                convert_html_to_pdf(scan_sky.summary_filename, scan_sky.summary_pdf_filename)
+                files.append(scan_sky.summary_pdf_filename)
+            timings['pdf'] = stage.elapsed
+    return {'job': f"{name} {job['date']}", 'timings': timings, 'elapsed': report.elapsed, 'files': files,
+            'trace': Trace.reset() if trace else []}
+
+
+def run_batch(jobs, output_root='reports', workers=None, make_pdf=True, offline=False, inline_plot=False,
+              trace_file=None):
+    # trace_file collects the spans of every job into one Chrome trace, a process per row
+    results = []
+    failures = 0
+    start = time.time()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_job, job, output_root, make_pdf, offline, inline_plot, bool(trace_file)): job
+                   for job in jobs}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                failures += 1
+                print(f"FAILED {futures[future]}: {e}")
+                continue
+            results.append(result)
+            stages = ', '.join(f'{label} {seconds:.2f}s' for label, seconds in result['timings'].items())
+            print(f"{result['job']}: {result['elapsed']:.2f}s ({stages})")
+    elapsed = time.time() - start
+    print(f"{len(results)} of {len(jobs)} reports in {elapsed:.2f}s, "
+          f"{len(results) / elapsed * 60 if elapsed else 0:.1f} reports/minute, {failures} failed")
+    if trace_file:
+        from Trace import Trace
+        recorded = [record for result in results for record in result['trace']]
+        Trace.write_chrome_trace(trace_file, recorded)
+        print(Trace.summary_table(recorded))
+        print(f"Trace written to {trace_file}")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate viewing reports for many sites and dates.')
+    parser.add_argument('--manifest', help='json list of jobs')
+    parser.add_argument('--sites', default='user_data_folder', help='folder of saved location json files')
+    parser.add_argument('--dates', nargs='*', default=[], help='YYYY-MM-DD dates to run every site for')
+    parser.add_argument('--min-alt', type=int, default=20, help='minimum altitude for every direction')
+    parser.add_argument('--output', default='reports', help='folder the reports are written under')
+    parser.add_argument('--workers', type=int, default=None, help='process pool size, default one per cpu')
+    parser.add_argument('--no-pdf', action='store_true', help='skip the PDF conversion')
+    parser.add_argument('--offline', action='store_true', help='only use cached locations and elevations')
+    parser.add_argument('--inline-plot', action='store_true', help='put the plot in the html, no png file')
+    parser.add_argument('--trace', metavar='FILE', help='record every stage and write a Chrome trace json')
+    parser.add_argument('--sampling', choices=['adaptive', 'dense'], default='adaptive',
+                        help='target sampling for jobs that do not give one, see Viewing.sampling_list')
+    args = parser.parse_args(argv)
+
+    if args.manifest:
+        jobs = load_manifest(args.manifest)
+    else:
+        jobs = jobs_from_sites(args.sites, args.dates, args.min_alt)
+    if not jobs:
+        sys.exit("No jobs, give a --manifest or some --dates")
+    for job in jobs:
+        job.setdefault('sampling', args.sampling)
+    duplicates = duplicate_jobs(jobs)
+    if duplicates:
+        sys.exit(f"Jobs listed more than once would overwrite each other: {duplicates}")
+    run_batch(jobs, args.output, args.workers, not args.no_pdf, args.offline, args.inline_plot, args.trace)
+
+
+if __name__ == '__main__':
+    # Required for Windows multiprocessing
+    multiprocessing.freeze_support()
+    main()
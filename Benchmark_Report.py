@@ -0,0 +1,209 @@
+# Benchmark Report Program
+# Times each stage of the Viewing pipeline headless so a change can be checked for speed: construction, the
+# sun/moon plot, the planets, the Messier catalog, the observing plan, the HTML and (when Playwright is installed)
+# the PDF, then the catalog stages again on synthetic catalogs from 100 up to 100k objects.  Geocoding and the
+# elevation lookup are answered by a stub and any attempt to open a network connection fails the run, so the
+# numbers never include a remote service.  Each stage is run --repeat times and the fastest counts.
+#
+# The results can be saved as a baseline and later runs compared against it; a stage more than --tolerance
+# slower than its baseline is flagged and the program exits with 1.  Baselines only make sense on the machine
+# they were recorded on, so benchmark_baseline.json is not checked in.
+#
+# python Benchmark_Report.py --save-baseline
+# python Benchmark_Report.py --sizes 100 1000 --repeat 5
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import platform
+import socket
+import sys
+import tempfile
+import time
+
+SITE = {'name': 'Ward Pound Ridge', 'latitude': 41.26, 'longitude': -73.60, 'height': 466,
+        'timezone': 'America/New_York'}
+DATE = '2025-05-11'
+SIZES = [100, 1000, 10000, 100000]
+
+
+class StubSiteLookup:
+    # stands in for Site.SiteLookup, every answer comes from memory
+    offline = True
+
+    def __init__(self, site=SITE):
+        self.site = site
+        self.calls = 0
+
+    def get_coordinates(self, address):
+        self.calls += 1
+        return self.site['latitude'], self.site['longitude']
+
+    def get_elevation_in_feet(self, lat, long):
+        self.calls += 1
+        return self.site['height']
+
+    def get_timezone(self, lat, long):
+        self.calls += 1
+        return self.site['timezone']
+
+
+@contextlib.contextmanager
+def no_network():
+    # any socket connect inside the block raises, so a stage that reaches for the network fails loudly
+    def _refuse(sock, address):
+        raise RuntimeError(f"network access during the benchmark: {address}")
+    connect, connect_ex = socket.socket.connect, socket.socket.connect_ex
+    socket.socket.connect = socket.socket.connect_ex = _refuse
+    try:
+        yield
+    finally:
+        socket.socket.connect, socket.socket.connect_ex = connect, connect_ex
+
+
+class Stages:
+    # fastest time seen for each stage over the repeats
+    def __init__(self):
+        self.best = {}
+
+    @contextlib.contextmanager
+    def time(self, name):
+        start = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - start
+        self.best[name] = min(elapsed, self.best.get(name, elapsed))
+
+
+def synthetic_catalog(size, seed=0):
+    # objects spread evenly over the sky
+    import numpy as np
+    from Catalog import Catalog
+    rng = np.random.default_rng(seed)
+    types = ['Galaxy', 'Open cluster', 'Globular cluster', 'Planetary nebula', 'Nebula']
+    return Catalog.Catalog(f'synthetic{size}', Catalog.compile_arrays(
+        [f'syn{i}' for i in range(1, size + 1)], rng.uniform(0.0, 360.0, size),
+        np.degrees(np.arcsin(rng.uniform(-1.0, 1.0, size))), type=[types[i % len(types)] for i in range(size)]))
+
+
+def new_viewing(output_folder, sampling='adaptive'):
+    from Report.Report import Viewing
+    return Viewing(SITE['latitude'], SITE['longitude'], SITE['name'], DATE, engine='numpy', height=SITE['height'],
+                   site_lookup=StubSiteLookup(), output_folder=output_folder, sampling=sampling)
+
+
+def messier_pipeline(stages, output_folder, make_pdf, sampling='adaptive'):
+    # returns the Viewing, whose ephemeris the catalog runs share
+    from Report.Report import convert_html_to_pdf
+    with stages.time('construct'):
+        scan_sky = new_viewing(output_folder, sampling)
+    with stages.time('solar_system'):
+        scan_sky.get_solar_system()
+    with stages.time('plot_sun_moon'):
+        scan_sky.plot_sun_moon()
+    with stages.time('adjust_delta_midnight'):
+        scan_sky.adjust_delta_midnight()
+    with stages.time('check_sky_tonight'):
+        for planet in scan_sky.planet_list:
+            scan_sky.check_sky_tonight(planet)
+    with stages.time('check_all_messier'):
+        scan_sky.check_all_messier()
+    with stages.time('schedule'):
+        scan_sky.schedule()
+    with stages.time('sort_data'):
+        scan_sky.sort_data()
+    with stages.time('set_html'):
+        scan_sky.set_html()
+    with stages.time('make_summary_html'):
+        scan_sky.make_summary_html(sort_by_rise=True)
+    with stages.time('write_out'):
+        scan_sky.write_out_html()
+        scan_sky.write_out_summary_html()
+    if make_pdf:
+        convert_html_to_pdf(scan_sky.summary_filename, scan_sky.summary_pdf_filename)  # browser start up, untimed
+        with stages.time('pdf'):
+            convert_html_to_pdf(scan_sky.summary_filename, scan_sky.summary_pdf_filename)
+    return scan_sky
+
+
+def catalog_pipeline(stages, output_folder, catalog, solar_system, sampling='adaptive'):
+    # solar_system is reused from the Messier run, the same night and site, so only the catalog stages run
+    import numpy as np
+    scan_sky = new_viewing(output_folder, sampling)
+    scan_sky.solar_system = solar_system
+    scan_sky.adjust_delta_midnight()
+    label = f'synthetic_{len(catalog)}'
+    with stages.time(f'{label}.check_catalog'):
+        scan_sky.check_catalog(catalog, np.arange(len(catalog)))
+    with stages.time(f'{label}.schedule'):
+        scan_sky.schedule()
+    with stages.time(f'{label}.sort_data'):
+        scan_sky.sort_data()
+    with stages.time(f'{label}.set_html'):
+        scan_sky.set_html()
+    with stages.time(f'{label}.make_summary_html'):
+        scan_sky.make_summary_html(sort_by_rise=True)
+
+
+def run_benchmarks(sizes=SIZES, repeat=3, make_pdf=None, sampling='adaptive'):
+    os.environ.setdefault('MPLBACKEND', 'Agg')
+    from astropy.utils import iers
+    iers.conf.auto_download = False
+    if make_pdf is None:
+        make_pdf = importlib.util.find_spec('playwright') is not None
+    stages = Stages()
+    catalogs = [synthetic_catalog(size) for size in sizes]
+    with no_network(), tempfile.TemporaryDirectory() as output_folder, open(os.devnull, 'w') as devnull, \
+            contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            scan_sky = messier_pipeline(stages, output_folder, make_pdf, sampling)
+            for catalog in catalogs:
+                catalog_pipeline(stages, output_folder, catalog, scan_sky.solar_system, sampling)
+    return stages.best
+
+
+def compare(results, baseline, tolerance, floor=0.005):
+    # stages slower than baseline by more than tolerance (and by more than floor seconds, to ignore timer noise)
+    return {name: (baseline[name], seconds) for name, seconds in results.items()
+            if name in baseline and seconds > baseline[name] * (1 + tolerance) and seconds - baseline[name] > floor}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the Viewing pipeline.')
+    parser.add_argument('--sizes', type=int, nargs='*', default=SIZES, help='synthetic catalog sizes')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per stage, the fastest counts')
+    parser.add_argument('--no-pdf', action='store_true', help='skip the PDF stage')
+    parser.add_argument('--baseline', default='benchmark_baseline.json')
+    parser.add_argument('--save-baseline', action='store_true', help='write these results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slow down, 0.25 is 25%%')
+    parser.add_argument('--output', help='also write the results to this json file')
+    parser.add_argument('--sampling', choices=['adaptive', 'dense'], default='adaptive',
+                        help='target sampling, see Viewing.sampling_list')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, args.repeat, False if args.no_pdf else None, args.sampling)
+    baseline = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r') as baseline_file:
+            baseline = json.load(baseline_file)['results']
+    regressions = compare(results, baseline, args.tolerance)
+
+    for name, seconds in results.items():
+        line = f"{name:40s} {seconds * 1000:10.1f} ms"
+        if name in baseline:
+            line += f"  baseline {baseline[name] * 1000:10.1f} ms  {(seconds / baseline[name] - 1) * 100:+6.1f}%"
+        print(line + ('  REGRESSION' if name in regressions else ''))
+
+    record = {'python': sys.version.split()[0], 'machine': platform.platform(), 'date': time.strftime('%Y-%m-%d'),
+              'repeat': args.repeat, 'sampling': args.sampling, 'results': results}
+    for file_name in [args.baseline] * args.save_baseline + [args.output] * bool(args.output):
+        with open(file_name, 'w') as json_file:
+            json.dump(record, json_file, indent=2)
+    if regressions:
+        print(f"{len(regressions)} stage(s) more than {args.tolerance:.0%} slower than {args.baseline}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,292 @@
+# Catalog package
+# Deep sky catalogs as arrays.  Each catalog is a compiled .npz file next to this module: ids and RA/Dec
+# (J2000, degrees, float64) are read when the catalog is opened, and the descriptive columns (type, suggested
+# filter, difficulty) are stored once each as a string table plus a small int index per object and only read the
+# first time they are asked for.  Catalogs are opened once per process and shared, see shared().
+#
+# messier.npz is compiled from the Messier package.  Caldwell, NGC and IC are compiled from the OpenNGC catalog
+# (https://github.com/mattiaverga/OpenNGC, CC-BY-SA-4.0), the Caldwell objects being looked up in it by their
+# NGC/IC designation.  caldwell.npz is checked in, compiled from the OpenNGC database the pyongc package ships,
+# whose addendum also has the three Caldwell objects that are not NGC/IC ones; ngc.npz and ic.npz are left for
+# the user to compile from NGC.csv:
+#
+# python -m Catalog.Catalog messier
+# python -m Catalog.Catalog ngc --csv NGC.csv        writes ngc.npz and ic.npz
+# python -m Catalog.Catalog caldwell                  needs ngc.npz and ic.npz, leaves out the three
+# python -m Catalog.Catalog caldwell --db ongc.db     pyongc's database, all 109
+
+import argparse
+import csv
+import os
+import re
+import threading
+
+import numpy as np
+
+folder = os.path.dirname(os.path.abspath(__file__))
+search_order = ['messier', 'caldwell', 'ngc', 'ic']  # where resolve() looks for an id, first match wins
+metadata_columns = ['type', 'filters', 'difficulty']
+
+# Caldwell number -> NGC/IC designation.  C9 (Sh2-155), C41 (the Hyades) and C99 (the Coalsack) are not NGC/IC
+# objects, they are only in OpenNGC's addendum, see CALDWELL_ADDENDUM
+CALDWELL = {
+    'c1': 'ngc188', 'c2': 'ngc40', 'c3': 'ngc4236', 'c4': 'ngc7023', 'c5': 'ic342', 'c6': 'ngc6543',
+    'c7': 'ngc2403', 'c8': 'ngc559', 'c10': 'ngc663', 'c11': 'ngc7635', 'c12': 'ngc6946', 'c13': 'ngc457',
+    'c14': 'ngc869', 'c15': 'ngc6826', 'c16': 'ngc7243', 'c17': 'ngc147', 'c18': 'ngc185', 'c19': 'ic5146',
+    'c20': 'ngc7000', 'c21': 'ngc4449', 'c22': 'ngc7662', 'c23': 'ngc891', 'c24': 'ngc1275', 'c25': 'ngc2419',
+    'c26': 'ngc4244', 'c27': 'ngc6888', 'c28': 'ngc752', 'c29': 'ngc5005', 'c30': 'ngc7331', 'c31': 'ic405',
+    'c32': 'ngc4631', 'c33': 'ngc6992', 'c34': 'ngc6960', 'c35': 'ngc4889', 'c36': 'ngc4559', 'c37': 'ngc6885',
+    'c38': 'ngc4565', 'c39': 'ngc2392', 'c40': 'ngc3626', 'c42': 'ngc7006', 'c43': 'ngc7814', 'c44': 'ngc7479',
+    'c45': 'ngc5248', 'c46': 'ngc2261', 'c47': 'ngc6934', 'c48': 'ngc2775', 'c49': 'ngc2237', 'c50': 'ngc2244',
+    'c51': 'ic1613', 'c52': 'ngc4697', 'c53': 'ngc3115', 'c54': 'ngc2506', 'c55': 'ngc7009', 'c56': 'ngc246',
+    'c57': 'ngc6822', 'c58': 'ngc2360', 'c59': 'ngc3242', 'c60': 'ngc4038', 'c61': 'ngc4039', 'c62': 'ngc247',
+    'c63': 'ngc7293', 'c64': 'ngc2362', 'c65': 'ngc253', 'c66': 'ngc5694', 'c67': 'ngc1097', 'c68': 'ngc6729',
+    'c69': 'ngc6302', 'c70': 'ngc300', 'c71': 'ngc2477', 'c72': 'ngc55', 'c73': 'ngc1851', 'c74': 'ngc3132',
+    'c75': 'ngc6124', 'c76': 'ngc6231', 'c77': 'ngc5128', 'c78': 'ngc6541', 'c79': 'ngc3201', 'c80': 'ngc5139',
+    'c81': 'ngc6352', 'c82': 'ngc6193', 'c83': 'ngc4945', 'c84': 'ngc5286', 'c85': 'ic2391', 'c86': 'ngc6397',
+    'c87': 'ngc1261', 'c88': 'ngc5823', 'c89': 'ngc6087', 'c90': 'ngc2867', 'c91': 'ngc3532', 'c92': 'ngc3372',
+    'c93': 'ngc6752', 'c94': 'ngc4755', 'c95': 'ngc6025', 'c96': 'ngc2516', 'c97': 'ngc3766', 'c98': 'ngc4609',
+    'c100': 'ic2944', 'c101': 'ngc6744', 'c102': 'ic2602', 'c103': 'ngc2070', 'c104': 'ngc362', 'c105': 'ngc4833',
+    'c106': 'ngc104', 'c107': 'ngc6101', 'c108': 'ngc4372', 'c109': 'ngc3195'}
+
+CALDWELL_ADDENDUM = {'c9': 'C009', 'c41': 'C041', 'c99': 'C099'}
+
+# OpenNGC object type codes
+OPENNGC_TYPES = {'*': 'Star', '**': 'Double star', '*Ass': 'Association of stars', 'OCl': 'Open cluster',
+                 'GCl': 'Globular cluster', 'Cl+N': 'Star cluster with nebula', 'G': 'Galaxy',
+                 'GPair': 'Galaxy pair', 'GTrpl': 'Galaxy triplet', 'GGroup': 'Group of galaxies',
+                 'PN': 'Planetary nebula', 'HII': 'H II region nebula', 'DrkN': 'Dark nebula',
+                 'EmN': 'Emission nebula', 'Neb': 'Nebula', 'RfN': 'Reflection nebula', 'SNR': 'Supernova remnant',
+                 'Nova': 'Nova star', 'Other': 'Other'}
+
+
+class Catalog:
+    def __init__(self, name, arrays):
+        # arrays is an open npz file (or a dict of the same arrays)
+        self.name = name
+        self._arrays = arrays
+        self.ids = np.asarray(arrays['ids']).astype(str)
+        self.ra = np.asarray(arrays['ra'], dtype=np.float64)
+        self.dec = np.asarray(arrays['dec'], dtype=np.float64)
+        self.link_template = str(arrays['link_template']) if 'link_template' in arrays else ''
+        self._index = None
+        self._dec_order = None
+        self._metadata = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def load(cls, name):
+        return cls(name, np.load(path(name)))
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = {obj: i for i, obj in enumerate(self.ids)}
+        return self._index
+
+    def by_declination(self):
+        # (declinations sorted, the index of each in the catalog) for band searches
+        if self._dec_order is None:
+            self._dec_order = np.argsort(self.dec, kind='stable')
+        return self.dec[self._dec_order], self._dec_order
+
+    def select(self, ids):
+        # index array for the ids this catalog has, and the list of those it does not
+        found = [self.index[obj] for obj in ids if obj in self.index]
+        missing = [obj for obj in ids if obj not in self.index]
+        return np.array(found, dtype=np.int64), missing
+
+    def metadata(self, column):
+        # a per object column of strings, read from the file the first time it is used
+        with self._lock:
+            if column not in self._metadata:
+                if f'{column}_codes' in self._arrays:
+                    table = np.asarray(self._arrays[f'{column}_table']).astype(str)
+                    self._metadata[column] = table[np.asarray(self._arrays[f'{column}_codes'])]
+                else:
+                    self._metadata[column] = np.full(len(self), '', dtype=str)
+            return self._metadata[column]
+
+    def details(self, i):
+        # type, filters, difficulty and finder chart url for one object, '' when the catalog does not have it
+        return self.details_list([i])[0]
+
+    def details_list(self, indices):
+        # details for many objects, each metadata column is looked up once
+        ids = self.ids[indices].tolist()
+        columns = {column: self.metadata(column)[indices].tolist() for column in metadata_columns}
+        links = [self.link_template.format(ID=obj.upper(), id=obj) for obj in ids] if self.link_template \
+            else [''] * len(ids)
+        return [dict(zip(columns, values), link=link) for *values, link in zip(*columns.values(), links)]
+
+
+def path(name):
+    return os.path.join(folder, f'{name}.npz')
+
+
+def available():
+    return [name for name in search_order if os.path.exists(path(name))]
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared(name):
+    # the process wide instance of a catalog, None when it has not been compiled
+    with _shared_lock:
+        if name not in _shared:
+            if os.path.exists(path(name)):
+                _shared[name] = Catalog.load(name)
+            elif name == 'messier':
+                _shared[name] = Catalog(name, messier_arrays())  # so a fresh checkout works before compiling
+            else:
+                return None
+        return _shared[name]
+
+
+def resolve(ids):
+    # target ids from any catalog -> ({catalog name: index array}, ids that no catalog has)
+    ids = [obj.lower() for obj in ids]
+    selected = {}
+    for name in search_order:
+        if not ids:
+            break
+        catalog = shared(name)
+        if catalog is None:
+            continue
+        indices, ids = catalog.select(ids)
+        if len(indices):
+            selected[name] = indices
+    return selected, ids
+
+
+def lookup(obj):
+    # (catalog, index) for one id, or (None, None)
+    selected, missing = resolve([obj])
+    for name, indices in selected.items():
+        return shared(name), int(indices[0])
+    return None, None
+
+
+def intern(values):
+    # strings -> (table of the distinct strings, int16 index of each value in it)
+    table, codes = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    return table, codes.astype(np.int16)
+
+
+def compile_arrays(ids, ra, dec, link_template='', **metadata):
+    arrays = {'ids': np.asarray(ids, dtype=str), 'ra': np.asarray(ra, dtype=np.float64),
+              'dec': np.asarray(dec, dtype=np.float64), 'link_template': np.asarray(link_template)}
+    for column, values in metadata.items():
+        arrays[f'{column}_table'], arrays[f'{column}_codes'] = intern(values)
+    return arrays
+
+
+def save(name, arrays):
+    np.savez(path(name), **arrays)
+    with _shared_lock:
+        _shared.pop(name, None)  # reopened from the new file next time
+    return path(name)
+
+
+def messier_arrays():
+    from Messier import Messier
+    messier = Messier.MessierData()
+    ids = sorted(messier.coordinates, key=lambda obj: int(obj[1:]))
+    return compile_arrays(ids, [messier.coordinates[obj][0] for obj in ids],
+                          [messier.coordinates[obj][1] for obj in ids],
+                          link_template='https://freestarcharts.com/images/Articles/Messier/Single/{ID}_Finder_Chart.pdf',
+                          type=[messier.object_type[obj] for obj in ids],
+                          filters=[messier.messier_filters.get(obj, '') for obj in ids],
+                          difficulty=[messier.messier_difficulty.get(obj, '') for obj in ids])
+
+
+def sexagesimal(text, hours=False):
+    # '20:59:17.14' or '-11:21:48.2' -> degrees
+    sign = -1.0 if text.strip().startswith('-') else 1.0
+    parts = [abs(float(part)) for part in text.strip().lstrip('+-').split(':')]
+    value = sum(part / 60.0 ** k for k, part in enumerate(parts))
+    return sign * value * (15.0 if hours else 1.0)
+
+
+def openngc_arrays(csv_file_name):
+    # {'ngc': arrays, 'ic': arrays} from OpenNGC's semicolon separated NGC.csv
+    rows = {'ngc': [], 'ic': []}
+    with open(csv_file_name, newline='', encoding='utf-8') as csv_file:
+        for row in csv.DictReader(csv_file, delimiter=';'):
+            match = re.fullmatch(r'(NGC|IC)(\d+)', row.get('Name', ''))
+            if not match or not row.get('RA') or not row.get('Dec') or row.get('Type') in ('Dup', 'NonEx'):
+                continue
+            rows[match.group(1).lower()].append((f'{match.group(1).lower()}{int(match.group(2))}',
+                                                 sexagesimal(row['RA'], hours=True), sexagesimal(row['Dec']),
+                                                 OPENNGC_TYPES.get(row['Type'], row['Type'])))
+    return {name: compile_arrays([r[0] for r in entries], [r[1] for r in entries], [r[2] for r in entries],
+                                 type=[r[3] for r in entries])
+            for name, entries in rows.items()}
+
+
+def caldwell_arrays():
+    ids, ras, decs, types = [], [], [], []
+    for obj, designation in CALDWELL.items():
+        catalog, i = lookup(designation)
+        if catalog is None:
+            continue
+        ids.append(obj)
+        ras.append(catalog.ra[i])
+        decs.append(catalog.dec[i])
+        types.append(catalog.metadata('type')[i])
+    return compile_arrays(ids, ras, decs, type=types)
+
+
+def openngc_name(designation):
+    # 'ngc188' -> 'NGC0188', the names in OpenNGC's database
+    match = re.fullmatch(r'(ngc|ic)(\d+)', designation)
+    return f'{match.group(1).upper()}{int(match.group(2)):04d}' if match else designation
+
+
+def caldwell_db_arrays(db_file_name):
+    # all of the Caldwell catalog from the OpenNGC sqlite database (pyongc/ongc.db), RA/Dec stored in radians
+    import sqlite3
+    names = {obj: openngc_name(CALDWELL.get(obj) or CALDWELL_ADDENDUM[obj])
+             for obj in sorted({**CALDWELL, **CALDWELL_ADDENDUM}, key=lambda obj: int(obj[1:]))}
+    with sqlite3.connect(db_file_name) as db:
+        found = {row[0]: row[1:] for row in db.execute(
+            f"SELECT name, ra, dec, type FROM objects WHERE name IN ({','.join('?' * len(names))})",
+            list(names.values()))}
+    missing = [obj for obj, name in names.items() if name not in found]
+    if missing:
+        raise ValueError(f"{db_file_name} does not have {missing}")
+    ids = list(names)
+    return compile_arrays(ids, [np.degrees(found[names[obj]][0]) for obj in ids],
+                          [np.degrees(found[names[obj]][1]) for obj in ids],
+                          type=[OPENNGC_TYPES.get(found[names[obj]][2], found[names[obj]][2]) for obj in ids])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compile a catalog into its .npz file.')
+    parser.add_argument('catalog', choices=['messier', 'ngc', 'caldwell'])
+    parser.add_argument('--csv', help='OpenNGC NGC.csv, for ngc')
+    parser.add_argument('--db', help="the pyongc package's OpenNGC database ongc.db, for caldwell")
+    args = parser.parse_args(argv)
+    if args.catalog == 'messier':
+        compiled = {'messier': messier_arrays()}
+    elif args.catalog == 'ngc':
+        if not args.csv:
+            parser.error('ngc needs --csv')
+        compiled = openngc_arrays(args.csv)
+    elif args.db:
+        compiled = {'caldwell': caldwell_db_arrays(args.db)}
+    else:
+        if shared('ngc') is None or shared('ic') is None:
+            parser.error('compile ngc first')
+        compiled = {'caldwell': caldwell_arrays()}
+    for name, arrays in compiled.items():
+        print(f"{len(arrays['ids'])} objects written to {save(name, arrays)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+# Cache part of the Ephemeris package
+# Keeps per night alt/az arrays on disk so re-running a report for the same site and date does not redo any of
+# the astropy work.  Every entry is a .npy file (float32 unless saved as something else, a rendered plot is
+# uint8) named after a hash of what it was computed from (site, date, time grid, catalog version ...), read back
+# memory mapped so nothing is copied until it is used.  The folder is kept under max_bytes by removing the least
+# recently used files; a load counts as a use.  Several processes (a batch run) may share the folder: each save
+# writes its own temporary file and renames it into place, and an entry removed or found torn by another process
+# is just a cache miss.  Every key includes CACHE_VERSION: bump it whenever the ephemeris math or the layout of
+# what is saved changes, so entries computed the old way are never served again (they age out under max_bytes).
+
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+CACHE_VERSION = 2  # 2: UT1-UTC in the fixed target engine, interpolated solar system nodes
+
+
+def catalog_version(*arrays):
+    # short fingerprint of a catalog's coordinates, changes whenever the catalog does
+    digest = hashlib.sha1()
+    for array in arrays:
+        digest.update(np.ascontiguousarray(array, dtype=np.float64).tobytes())
+    return digest.hexdigest()[:16]
+
+
+class EphemerisCache:
+    folder = 'ephemeris_cache'
+    max_bytes = 256 * 1024 * 1024
+
+    def __init__(self, folder=None, max_bytes=None):
+        self.folder = folder or self.folder
+        self.max_bytes = max_bytes if max_bytes is not None else self.max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(self.folder, exist_ok=True)
+
+    def key(self, **parts):
+        # parts must be json serialisable, floats are rounded so tiny noise does not miss the cache
+        clean = {k: round(v, 6) if isinstance(v, float) else v for k, v in parts.items()}
+        clean['cache_version'] = CACHE_VERSION
+        return hashlib.sha1(json.dumps(clean, sort_keys=True, default=str).encode()).hexdigest()[:24]
+
+    def path(self, key, name):
+        return os.path.join(self.folder, f'{key}_{name}.npy')
+
+    def load(self, key, name):
+        # read only memory mapped array, or None when it is not cached, was just evicted or is shorter than its
+        # header says (numpy raises ValueError for the mmap)
+        path = self.path(key, name)
+        try:
+            array = np.load(path, mmap_mode='r')
+            os.utime(path)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return array
+
+    def save(self, key, name, array, dtype=np.float32):
+        # write through a temporary file of this process's own so neither a crash nor another process saving the
+        # same entry leaves half an entry behind
+        path = self.path(key, name)
+        array = np.asarray(array, dtype=dtype)
+        fd, tmp_path = tempfile.mkstemp(dir=self.folder, prefix=f'{key}_{name}.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, array)
+            os.replace(tmp_path, path)
+        except BaseException:
+            remove(tmp_path)
+            raise
+        self.evict()
+        try:
+            return np.load(path, mmap_mode='r')
+        except (OSError, ValueError):  # evicted already, by this process or another
+            return array
+
+    def entries(self):
+        # (path, size, mtime) of every .npy file still there by the time it is looked at
+        found = []
+        for entry in os.scandir(self.folder):
+            if entry.name.endswith('.npy'):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                found.append((entry.path, stat.st_size, stat.st_mtime))
+        return found
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in sorted(entries, key=lambda e: e[2]):
+            if total <= self.max_bytes:
+                break
+            total -= size
+            remove(path)
+
+    def clear(self):
+        for path, _, _ in self.entries():
+            remove(path)
+
+
+def remove(path):
+    # another process may have removed it first
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
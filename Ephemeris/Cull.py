@@ -0,0 +1,70 @@
+# Cull part of the Ephemeris package
+# Cheap geometry that drops catalog objects which can not make it into tonight's report before any of them go
+# through the alt/az transforms.  An object culminates at 90 - |latitude - dec|, so anything outside a band of
+# declinations never climbs above the lowest minimum altitude; with a catalog sorted by declination that band is
+# two searchsorted calls.  What is left is checked against the sidereal time the viewing window covers: an object
+# above the minimum altitude only while its hour angle is within +/- the half arc, so one whose half arc is never
+# swept during the window stays too low all night.
+#
+# Catalog positions are J2000 and the report uses apparent places, so everything is tested against the minimum
+# altitude less margin(jd): a star's apparent place is within BASE_MARGIN of its J2000 one for the nutation (17
+# arcsec) and aberration (20.5 arcsec), plus the precession since J2000, which moves it at most 50.3 arcsec a
+# year (1.4 deg a century).  Moving by that much changes its altitude by no more, whatever the date.
+
+import numpy as np
+
+from Ephemeris import Ephemeris
+
+BASE_MARGIN = 0.25  # degrees
+PRECESSION_RATE = 50.3 / 3600.0  # degrees a year
+SIDEREAL_RATE = 1.00273790935  # sidereal hours per solar hour
+
+
+def margin(jd):
+    # degrees the apparent place at jd can be from the J2000 one
+    return BASE_MARGIN + PRECESSION_RATE * abs(float(jd) - Ephemeris.J2000) / 365.25
+
+
+def max_altitude(dec, latitude):
+    return 90.0 - np.abs(latitude - np.asarray(dec))
+
+
+def declination_band(latitude, min_alt, margin_deg):
+    # the declinations that culminate at or above min_alt - margin_deg, see margin
+    reach = 90.0 - (min_alt - margin_deg)
+    return max(latitude - reach, -90.0), min(latitude + reach, 90.0)
+
+
+def band_indices(sorted_dec, dec_order, latitude, min_alt, margin_deg):
+    # indices (into the unsorted catalog) of the declination band, dec_order = np.argsort(dec)
+    lo, hi = declination_band(latitude, min_alt, margin_deg)
+    start = np.searchsorted(sorted_dec, lo, side='left')
+    stop = np.searchsorted(sorted_dec, hi, side='right')
+    return dec_order[start:stop]
+
+
+def half_arc(dec, latitude, min_alt):
+    # degrees of hour angle either side of the meridian the object spends above min_alt, 0 when it never gets
+    # there and 180 when it never drops below
+    lat, dec = np.radians(latitude), np.radians(np.asarray(dec, dtype=float))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cos_h = (np.sin(np.radians(min_alt)) - np.sin(lat) * np.sin(dec)) / (np.cos(lat) * np.cos(dec))
+    cos_h = np.nan_to_num(cos_h, nan=-1.0, posinf=1.0, neginf=-1.0)
+    return np.where(cos_h >= 1.0, 0.0, np.degrees(np.arccos(np.clip(cos_h, -1.0, 1.0))))
+
+
+def up_during(ra, dec, latitude, lst_start, lst_span, min_alt):
+    # True where the hour angle passes through +/- half_arc while the sidereal time runs over
+    # [lst_start, lst_start + lst_span] degrees
+    h0 = half_arc(dec, latitude, min_alt)
+    ha_start = np.mod(lst_start - np.asarray(ra) + 180.0, 360.0) - 180.0
+    ha_end = ha_start + lst_span
+    return (h0 > 0) & (((ha_start <= h0) & (ha_end >= -h0)) | (ha_end >= 360.0 - h0) | (h0 >= 180.0))
+
+
+def visible(ra, dec, latitude, longitude, jd_start, jd_end, min_alt):
+    # mask of the objects that may clear min_alt at some point between jd_start and jd_end
+    lst_start = Ephemeris.local_sidereal_time(jd_start, longitude)
+    lst_span = (jd_end - jd_start) * 360.0 * SIDEREAL_RATE
+    min_alt = min_alt - margin((jd_start + jd_end) / 2.0)
+    return (max_altitude(dec, latitude) >= min_alt) & up_during(ra, dec, latitude, lst_start, lst_span, min_alt)
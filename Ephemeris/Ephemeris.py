@@ -0,0 +1,205 @@
+# Ephemeris package
+# Fast, pure NumPy position calculations used by the viewing reports.
+#
+# The fixed target engine works out alt/az for a whole catalog of fixed (RA/Dec) objects over a grid of
+# times.  Local sidereal time is computed once per sample and alt/az then comes straight out of the hour angle
+# and the site latitude, so there is no astropy frame transform involved at all.
+#
+# Error bound versus astropy's ICRS -> AltAz transform (no refraction, checked over the Messier catalog for
+# dates between 2000 and 2050, see tests/test_ephemeris.py):
+#   * precession + nutation + aberration on (default), with UT1-UTC: better than 0.0005 deg (under 2 arcsec) in
+#     altitude and in azimuth * cos(altitude), what is left being mostly the short nutation terms.  from_time
+#     takes UT1-UTC from astropy's IERS tables; without it (ut1_utc=0, sidereal time from UTC) the error follows
+#     UT1-UTC, which stays under 0.9 seconds: up to 0.004 deg, 0.0018 deg in altitude on 2005-01-10.
+#   * all three off: the catalog is used as if J2000 were the equinox of date, which costs roughly
+#     50 arcsec per year away from 2000 (about 0.35 deg in 2025, 0.8 deg by 2050).
+# The report works in whole degrees, so the default settings are well below what is displayed.
+
+import numpy as np
+
+J2000 = 2451545.0
+DEG = np.pi / 180.0
+ARCSEC = DEG / 3600.0
+ABERRATION_CONSTANT = 20.49552 * ARCSEC
+
+
+def julian_centuries(jd):
+    return (np.asarray(jd, dtype=float) - J2000) / 36525.0
+
+
+def mean_obliquity(t):
+    # radians, IAU 1980 polynomial, good to well under an arcsec for this century
+    return (84381.448 - 46.8150 * t - 0.00059 * t * t + 0.001813 * t * t * t) * ARCSEC
+
+
+def nutation(t):
+    # low precision nutation in longitude and obliquity (radians), about 0.5 arcsec
+    omega = (125.04452 - 1934.136261 * t) * DEG
+    sun_long = (280.4665 + 36000.7698 * t) * DEG
+    moon_long = (218.3165 + 481267.8813 * t) * DEG
+    d_psi = (-17.20 * np.sin(omega) - 1.32 * np.sin(2 * sun_long) - 0.23 * np.sin(2 * moon_long)
+             + 0.21 * np.sin(2 * omega)) * ARCSEC
+    d_eps = (9.20 * np.cos(omega) + 0.57 * np.cos(2 * sun_long) + 0.10 * np.cos(2 * moon_long)
+             - 0.09 * np.cos(2 * omega)) * ARCSEC
+    return d_psi, d_eps
+
+
+def greenwich_mean_sidereal_time(jd):
+    # degrees, IAU 1982 expression.  jd should be UT1, UTC is within 0.9 seconds (0.004 deg) of it
+    jd = np.asarray(jd, dtype=float)
+    t = julian_centuries(jd)
+    gmst = 280.46061837 + 360.98564736629 * (jd - J2000) + 0.000387933 * t * t - t * t * t / 38710000.0
+    return np.mod(gmst, 360.0)
+
+
+def local_sidereal_time(jd, longitude, nutate=True):
+    # degrees, apparent sidereal time when nutate is on, longitude is degrees east
+    lst = greenwich_mean_sidereal_time(jd) + longitude
+    if nutate:
+        t = julian_centuries(jd)
+        d_psi, _ = nutation(t)
+        lst = lst + d_psi * np.cos(mean_obliquity(t)) / DEG
+    return np.mod(lst, 360.0)
+
+
+def _rot_x(angle):
+    c, s = np.cos(angle), np.sin(angle)
+    return np.array([[1, 0, 0], [0, c, s], [0, -s, c]])
+
+
+def _rot_y(angle):
+    c, s = np.cos(angle), np.sin(angle)
+    return np.array([[c, 0, -s], [0, 1, 0], [s, 0, c]])
+
+
+def _rot_z(angle):
+    c, s = np.cos(angle), np.sin(angle)
+    return np.array([[c, s, 0], [-s, c, 0], [0, 0, 1]])
+
+
+def precession_matrix(t):
+    # J2000 mean equator/equinox -> mean equator/equinox of date (IAU 1976 angles)
+    zeta = (2306.2181 * t + 0.30188 * t * t + 0.017998 * t * t * t) * ARCSEC
+    z = (2306.2181 * t + 1.09468 * t * t + 0.018203 * t * t * t) * ARCSEC
+    theta = (2004.3109 * t - 0.42665 * t * t - 0.041833 * t * t * t) * ARCSEC
+    return _rot_z(-z) @ _rot_y(theta) @ _rot_z(-zeta)
+
+
+def nutation_matrix(t):
+    # mean equator/equinox of date -> true equator/equinox of date
+    eps = mean_obliquity(t)
+    d_psi, d_eps = nutation(t)
+    return _rot_x(-(eps + d_eps)) @ _rot_z(-d_psi) @ _rot_x(eps)
+
+
+def earth_velocity(t):
+    # direction of the earth's orbital motion in J2000 equatorial coordinates, scaled by v/c
+    mean_anomaly = (357.52911 + 35999.05029 * t) * DEG
+    sun_long = (280.46646 + 36000.76983 * t) * DEG + (1.914602 * np.sin(mean_anomaly)
+                                                     + 0.019993 * np.sin(2 * mean_anomaly)) * DEG
+    eps = mean_obliquity(0.0)
+    return ABERRATION_CONSTANT * np.array([np.sin(sun_long),
+                                           -np.cos(sun_long) * np.cos(eps),
+                                           -np.cos(sun_long) * np.sin(eps)])
+
+
+def radec_to_vectors(ra, dec):
+    ra = np.radians(np.asarray(ra, dtype=float))
+    dec = np.radians(np.asarray(dec, dtype=float))
+    return np.stack([np.cos(dec) * np.cos(ra), np.cos(dec) * np.sin(ra), np.sin(dec)], axis=-1)
+
+
+def vectors_to_radec(vectors):
+    ra = np.degrees(np.arctan2(vectors[..., 1], vectors[..., 0])) % 360.0
+    dec = np.degrees(np.arcsin(np.clip(vectors[..., 2] / np.linalg.norm(vectors, axis=-1), -1, 1)))
+    return ra, dec
+
+
+def apparent_place(ra, dec, jd, precess=True, nutate=True, aberrate=True):
+    # J2000 (ICRS) RA/Dec -> RA/Dec of date, in degrees.  jd is a single epoch, over one night the change in
+    # precession and nutation is far below an arcsec so the whole night shares the same place
+    t = julian_centuries(jd)
+    vectors = radec_to_vectors(ra, dec)
+    if aberrate:
+        velocity = earth_velocity(t)
+        vectors = vectors + velocity - (vectors @ velocity)[..., None] * vectors
+        vectors /= np.linalg.norm(vectors, axis=-1)[..., None]
+    rotation = np.eye(3)
+    if precess:
+        rotation = precession_matrix(t) @ rotation
+    if nutate:
+        rotation = nutation_matrix(t) @ rotation
+    return vectors_to_radec(vectors @ rotation.T)
+
+
+def refraction(alt):
+    # degrees to add to a true altitude, Bennett / Saemundsson for 10C and 1010 mbar
+    alt = np.asarray(alt, dtype=float)
+    r = 1.02 / np.tan(np.radians(alt + 10.3 / (alt + 5.11))) / 60.0
+    return np.where(alt > -1.0, r, 0.0)
+
+
+def hour_angle_to_altaz(hour_angle, dec, latitude):
+    # all degrees.  azimuth is measured from north through east, same as astropy's AltAz
+    ha = np.radians(hour_angle)
+    dec = np.radians(dec)
+    lat = np.radians(latitude)
+    sin_alt = np.sin(lat) * np.sin(dec) + np.cos(lat) * np.cos(dec) * np.cos(ha)
+    alt = np.degrees(np.arcsin(np.clip(sin_alt, -1.0, 1.0)))
+    az = np.degrees(np.arctan2(-np.cos(dec) * np.sin(ha),
+                               np.sin(dec) * np.cos(lat) - np.cos(dec) * np.sin(lat) * np.cos(ha)))
+    return alt, np.mod(az, 360.0)
+
+
+class FixedTargetEngine:
+    # Alt/Az for many fixed targets over a shared time grid.  The sidereal time for each sample is worked out
+    # once when the engine is built; after that every catalog costs one broadcasted hour angle calculation.
+    # times_jd are UTC, ut1_utc is UT1-UTC in seconds, per sample or one value for them all
+    def __init__(self, times_jd, latitude, longitude, precess=True, nutate=True, aberrate=True, refract=False,
+                 ut1_utc=0.0):
+        self.times_jd = np.atleast_1d(np.asarray(times_jd, dtype=float))
+        self.latitude = latitude
+        self.longitude = longitude
+        self.precess = precess
+        self.nutate = nutate
+        self.aberrate = aberrate
+        self.refract = refract
+        self.ut1_utc = np.asarray(ut1_utc, dtype=float)
+        self.epoch = float(np.mean(self.times_jd))
+        self.lst = local_sidereal_time(self.times_jd + self.ut1_utc / 86400.0, self.longitude, nutate=self.nutate)
+
+    @classmethod
+    def from_time(cls, times, location, **kwargs):
+        # build from an astropy Time grid and EarthLocation, with UT1-UTC from astropy's IERS tables (the same ones
+        # its AltAz transforms use); left at 0 for dates the tables do not cover
+        try:
+            kwargs.setdefault('ut1_utc', (times.ut1.jd - times.utc.jd) * 86400.0)
+        except (IndexError, ValueError):  # astropy's IERSRangeError is an IndexError
+            pass
+        return cls(times.utc.jd, location.lat.deg, location.lon.deg, **kwargs)
+
+    def apparent_radec(self, ra, dec):
+        if not (self.precess or self.nutate or self.aberrate):
+            return np.asarray(ra, dtype=float), np.asarray(dec, dtype=float)
+        return apparent_place(ra, dec, self.epoch, self.precess, self.nutate, self.aberrate)
+
+    def altaz(self, ra, dec):
+        # ra/dec are 1d arrays of J2000 degrees, returns (alt, az) in degrees with shape (objects, samples)
+        ra, dec = self.apparent_radec(np.atleast_1d(ra), np.atleast_1d(dec))
+        return self._altaz(self.lst[None, :], ra, dec)
+
+    def altaz_at(self, ra, dec, times_jd, apparent=False):
+        # same as altaz but at any times, times_jd is (objects, k) or broadcasts to it.  Pass apparent=True with
+        # the output of apparent_radec to skip the catalog conversion when calling this repeatedly
+        if not apparent:
+            ra, dec = self.apparent_radec(np.atleast_1d(ra), np.atleast_1d(dec))
+        ut1_utc = float(np.mean(self.ut1_utc))  # changes by milliseconds over a night
+        lst = local_sidereal_time(np.asarray(times_jd) + ut1_utc / 86400.0, self.longitude, nutate=self.nutate)
+        return self._altaz(lst, ra, dec)
+
+    def _altaz(self, lst, ra, dec):
+        hour_angle = lst - ra[:, None]
+        alt, az = hour_angle_to_altaz(hour_angle, dec[:, None], self.latitude)
+        if self.refract:
+            alt = alt + refraction(alt)
+        return alt, az
@@ -0,0 +1,149 @@
+# Events part of the Ephemeris package
+# Rise, set and culmination times for a whole catalog at once.  Rather than scanning a dense time grid, the
+# objects are sampled on a coarse grid to bracket each event and the brackets are then narrowed together by
+# bisection (rise/set) and golden section search (culmination), so every object costs a few dozen evaluations
+# no matter how accurate the answer needs to be.
+#
+# Times are plain floats (hours from midnight works well) and altaz_func(t) must accept an array of times
+# shaped (objects, k), row i being times for object i, and return (alt, az) in degrees with the same shape.  A
+# caller that already has alt/az on a coarse enough grid can hand it in, and only the refinement is evaluated.
+
+import numpy as np
+
+GOLDEN = (np.sqrt(5.0) - 1.0) / 2.0
+
+
+def quadrant(az):
+    # compass quadrant of azimuths in degrees, 0 N, 1 E, 2 S, 3 W.  The one rule for the minimum altitudes and
+    # every table: by the azimuth the reports print, int(az) + 1, so 1-89 N, 90-179 E, 180-269 S, 270-359 W and
+    # 360 N again
+    return (np.floor(np.asarray(az, dtype=float)).astype(np.int64) + 1) // 90 % 4
+
+
+def quadrant_thresholds(az, min_alt_n=20, min_alt_e=20, min_alt_s=20, min_alt_w=20):
+    # minimum altitude for each azimuth, see quadrant
+    thresholds = np.array([min_alt_n, min_alt_e, min_alt_s, min_alt_w], dtype=float)
+    return thresholds[quadrant(az)]
+
+
+def _clearance(altaz_func, t, thresholds):
+    alt, az = altaz_func(t)
+    return alt - quadrant_thresholds(az, *thresholds)
+
+
+def _bisect(altaz_func, lo, hi, thresholds, iterations, rising):
+    # narrow [lo, hi] around a threshold crossing, keeping the visible side on hi for rising objects and on lo
+    # for setting ones
+    for _ in range(iterations):
+        mid = (lo + hi) / 2.0
+        visible = _clearance(altaz_func, mid[:, None], thresholds)[:, 0] >= 0
+        if rising:
+            hi = np.where(visible, mid, hi)
+            lo = np.where(visible, lo, mid)
+        else:
+            lo = np.where(visible, mid, lo)
+            hi = np.where(visible, hi, mid)
+    return hi if rising else lo
+
+
+def _golden_max(altaz_func, lo, hi, iterations):
+    # golden section search for the highest altitude inside [lo, hi]
+    x1 = hi - GOLDEN * (hi - lo)
+    x2 = lo + GOLDEN * (hi - lo)
+    f1 = altaz_func(x1[:, None])[0][:, 0]
+    f2 = altaz_func(x2[:, None])[0][:, 0]
+    for _ in range(iterations):
+        left = f1 >= f2
+        hi = np.where(left, x2, hi)
+        lo = np.where(left, lo, x1)
+        new_x = np.where(left, hi - GOLDEN * (hi - lo), lo + GOLDEN * (hi - lo))
+        new_f = altaz_func(new_x[:, None])[0][:, 0]
+        x1, x2, f1, f2 = (np.where(left, new_x, x2), np.where(left, x1, new_x),
+                          np.where(left, new_f, f2), np.where(left, f1, new_f))
+    return (lo + hi) / 2.0
+
+
+def solve_rise_set(altaz_func, n_objects, t_start, t_end, thresholds=(20, 20, 20, 20), coarse_step=0.5,
+                   tolerance=1.0 / 120, coarse=None):
+    # Returns a dict of arrays (one entry per object):
+    #   rise / set      - first and last time the object clears its quadrant's minimum altitude inside
+    #                     [t_start, t_end]; t_start / t_end when it is already up / still up, nan if never
+    #   transit         - time of highest altitude while visible, nan if never visible
+    #   max_alt         - altitude at transit
+    #   rise_az, set_az - azimuth at rise and set
+    # plus 'evaluations', the number of alt/az evaluations made per object.
+    # tolerance is in the same units as the times, the default is 30 seconds when times are in hours.
+    # coarse is (grid, alt, az) already worked out, the grid sorted from t_start to t_end and alt/az shaped
+    # (objects, len(grid)); coarse_step is then not used, the refinement covers the grid's widest step.
+    if coarse is None:
+        n_coarse = max(int(np.ceil((t_end - t_start) / coarse_step)), 1) + 1
+        grid = np.linspace(t_start, t_end, n_coarse)
+        step = grid[1] - grid[0] if n_coarse > 1 else 0.0
+        alt, az = altaz_func(np.broadcast_to(grid, (n_objects, n_coarse)))
+    else:
+        grid, alt, az = coarse
+        n_coarse = len(grid)
+        step = float(np.max(np.diff(grid))) if n_coarse > 1 else 0.0
+    iterations = max(int(np.ceil(np.log2(max(step, tolerance) / tolerance))), 0)
+    golden_iterations = max(int(np.ceil(np.log(max(2 * step, tolerance) / tolerance) / -np.log(GOLDEN))), 0)
+
+    visible = alt - quadrant_thresholds(az, *thresholds) >= 0
+    seen = visible.any(axis=1)
+
+    first = np.argmax(visible, axis=1)
+    last = n_coarse - 1 - np.argmax(visible[:, ::-1], axis=1)
+    rows = np.arange(n_objects)
+
+    # every object goes through the refinement so altaz_func always sees the whole catalog, objects with nothing
+    # to refine get a zero width bracket and come straight back out
+    needs_rise = seen & (first > 0)
+    rise_hi = grid[first]
+    rise = _bisect(altaz_func, np.where(needs_rise, grid[np.maximum(first - 1, 0)], rise_hi), rise_hi,
+                   thresholds, iterations, rising=True)
+    needs_set = seen & (last < n_coarse - 1)
+    set_lo = grid[last]
+    set_ = _bisect(altaz_func, set_lo, np.where(needs_set, grid[np.minimum(last + 1, n_coarse - 1)], set_lo),
+                   thresholds, iterations, rising=False)
+
+    peak = np.argmax(np.where(visible, alt, -np.inf), axis=1)
+    lo = np.maximum(grid[np.maximum(peak - 1, 0)], rise)
+    hi = np.minimum(grid[np.minimum(peak + 1, n_coarse - 1)], set_)
+    transit = _golden_max(altaz_func, lo, np.maximum(hi, lo), golden_iterations)
+
+    event_alt, event_az = altaz_func(np.stack([rise, set_, transit], axis=1))
+    nan = np.where(seen, 1.0, np.nan)
+    return {'rise': rise * nan, 'set': set_ * nan, 'transit': transit * nan,
+            'max_alt': event_alt[rows, 2] * nan, 'rise_az': event_az[rows, 0] * nan,
+            'set_az': event_az[rows, 1] * nan,
+            'evaluations': n_coarse + 2 * iterations + golden_iterations + 2 + 3}
+
+
+# (name of the evening crossing, name of the morning crossing, sun altitude in degrees)
+TWILIGHT_LEVELS = [('sunset', 'sunrise', 0.0),
+                   ('civil_dusk', 'civil_dawn', -6.0),
+                   ('nautical_dusk', 'nautical_dawn', -12.0),
+                   ('astronomical_dusk', 'astronomical_dawn', -18.0)]
+
+
+def threshold_crossings(t, values, level):
+    # every time values crosses level, linearly interpolated between samples.  Returns (falling, rising) arrays
+    values = np.asarray(values, dtype=float)
+    above = values >= level
+    falling = np.flatnonzero(above[:-1] & ~above[1:])
+    rising = np.flatnonzero(~above[:-1] & above[1:])
+
+    def _interpolate(i):
+        return t[i] + (level - values[i]) * (t[i + 1] - t[i]) / (values[i + 1] - values[i])
+    return _interpolate(falling), _interpolate(rising)
+
+
+def sun_events(t, sun_alt, levels=TWILIGHT_LEVELS):
+    # sunset, civil/nautical/astronomical dusk and dawn and sunrise from a sampled sun altitude curve.  The first
+    # descending and last ascending crossing of each level are used, nan when the sun never gets there
+    t = np.asarray(t, dtype=float)
+    events = {}
+    for evening, morning, level in levels:
+        falling, rising = threshold_crossings(t, sun_alt, level)
+        events[evening] = falling[0] if len(falling) else np.nan
+        events[morning] = rising[-1] if len(rising) else np.nan
+    return events
@@ -0,0 +1,95 @@
+# Solar system part of the Ephemeris package
+# Works out the sun, moon and planets for a whole night in one go.  The earth and observer positions are
+# computed once for the time grid and shared by every body, and each body's position and velocity are computed
+# once too: the light travel time correction moves the body back along its velocity, position - velocity * tau,
+# instead of asking the ephemeris again for every pass (each ask redoes erfa's earth ephemeris).  Over the hours
+# of light time to Neptune that straight line is off by well under a km.  The barycentric positions change so
+# smoothly that they are only worked out at samples node_minutes apart and interpolated onto the rest, which moves
+# the moon by a few hundredths of an arcsec and everything else by less.  Everything then goes through a
+# single (bodies, samples) ICRS -> AltAz transform, on the full grid.
+
+import numpy as np
+import astropy.units as u
+from astropy.constants import c as speed_of_light
+from astropy.coordinates import (AltAz, CartesianRepresentation, ICRS, SkyCoord, get_body_barycentric,
+                                 get_body_barycentric_posvel)
+
+from Trace import Trace
+
+LIGHT_TIME_ITERATIONS = 3  # the light time changes by well under a microsecond after three passes
+node_minutes = 5.0  # the bodies are worked out at least this often, at most twice it apart
+
+
+def nodes(jd, step_days):
+    # indexes of the samples the bodies are worked out at: the first sample in every step_days bucket, the last
+    # sample, and the last one before any gap longer than a bucket so interpolation never spans it; every sample
+    # when the times are not increasing
+    jd = np.asarray(jd, dtype=np.float64)
+    if len(jd) < 3 or not (np.diff(jd) > 0).all():
+        return np.arange(len(jd))
+    bucket_step = np.diff(np.floor((jd - jd[0]) / step_days).astype(np.int64))
+    return np.unique(np.concatenate([[0], np.flatnonzero(bucket_step) + 1, np.flatnonzero(bucket_step > 1),
+                                     [len(jd) - 1]]))
+
+
+def on_grid(xyz, node_jd, jd):
+    # (3, nodes) quantity -> (3, samples), linear between the nodes
+    return u.Quantity([np.interp(jd, node_jd, row) for row in xyz.value], xyz.unit)
+
+
+class SolarSystemEphemeris:
+    body_list = ['sun', 'moon', 'mercury', 'venus', 'mars', 'jupiter', 'saturn', 'uranus', 'neptune']
+
+    def __init__(self, times, location, bodies=None, alt=None, az=None):
+        # alt/az (degrees, shape (bodies, samples)) can be passed in when they were saved earlier, for example
+        # from the Ephemeris cache; altaz is then None as no SkyCoord was built
+        self.times = times
+        self.location = location
+        self.bodies = list(bodies) if bodies is not None else list(self.body_list)
+        self.body_index = {body: i for i, body in enumerate(self.bodies)}
+        self.frame = AltAz(obstime=self.times, location=self.location)
+        if alt is not None and az is not None:
+            self.altaz = None
+            self.alt = alt
+            self.az = az
+        else:
+            self.altaz = self._compute()
+            self.alt = self.altaz.alt.deg  # shape (bodies, samples)
+            self.az = self.altaz.az.deg
+
+    def _compute(self):
+        obsgeoloc, _ = self.location.get_gcrs_posvel(self.times)
+        jd = self.times.jd
+        node = nodes(jd, node_minutes / 1440.0)
+        node_times, node_jd = self.times[node], jd[node]
+        observer = on_grid(get_body_barycentric('earth', node_times).xyz, node_jd, jd) + obsgeoloc.xyz
+        positions = []
+        for body in self.bodies:
+            with Trace.span('ephemeris_body', body=body):
+                position, velocity = (on_grid(v.xyz, node_jd, jd)
+                                      for v in get_body_barycentric_posvel(body, node_times))
+                body_loc = position
+                for _ in range(LIGHT_TIME_ITERATIONS):
+                    light_travel_time = np.sqrt(((body_loc - observer) ** 2).sum(axis=0)) / speed_of_light
+                    body_loc = position - velocity * light_travel_time
+                positions.append(body_loc)
+        xyz = u.Quantity(positions).to(u.km)  # shape (bodies, 3, samples)
+        icrs = ICRS(CartesianRepresentation(xyz, xyz_axis=1))
+        with Trace.span('ephemeris_transform') as span:
+            span.add(samples=len(self.bodies) * len(self.times))
+            return SkyCoord(icrs).transform_to(self.frame)
+
+    def body_altaz(self, body):
+        # AltAz SkyCoord for one body over the full time grid, only when computed here
+        return self.altaz[self.body_index[body]]
+
+    def body_alt(self, body):
+        return self.alt[self.body_index[body]] * u.deg
+
+    def interpolate(self, body, jd):
+        # alt/az in degrees for one body at other times (julian dates, any shape) inside the grid
+        i = self.body_index[body]
+        grid_jd = self.times.jd
+        alt = np.interp(jd, grid_jd, self.alt[i])
+        az = np.interp(jd, grid_jd, np.degrees(np.unwrap(np.radians(self.az[i]))))
+        return alt, np.mod(az, 360.0)
@@ -0,0 +1,84 @@
+# Import Budget Program
+# Checks how long the entry points and packages take to import, using python -X importtime in a fresh
+# interpreter, and that modules which should stay light do not pull in the heavy ones (the compute core must not
+# need tkinter, mail or plotting; the window must come up without astropy or matplotlib).  Exits with 1 when a
+# module is over its budget or imports something it should not, so it can run after any change to the imports.
+#
+# python Import_Budget.py
+# python Import_Budget.py --repeat 5 Report.Report
+
+import argparse
+import os
+import subprocess
+import sys
+
+# milliseconds, cumulative import time of the module in a fresh interpreter, roughly twice what it measures today
+BUDGETS = {
+    'Viewing_Tonight': 150,
+    'Batch_Report': 150,
+    'Mail.Mail': 150,
+    'Site.Site': 100,
+    'Trace.Trace': 50,
+    'Catalog.Catalog': 250,
+    'Ephemeris.Ephemeris': 250,
+    'Report.Report': 1200,
+}
+
+# top level packages a module must not import
+FORBIDDEN = {
+    'Viewing_Tonight': ['astropy', 'matplotlib', 'pandas', 'playwright', 'smtplib'],
+    'Batch_Report': ['astropy', 'matplotlib', 'tkinter', 'playwright'],
+    'Site.Site': ['requests', 'geopy'],
+    'Trace.Trace': ['numpy', 'astropy', 'matplotlib', 'tkinter'],
+    'Ephemeris.Ephemeris': ['astropy', 'matplotlib', 'tkinter'],
+    'Catalog.Catalog': ['astropy', 'matplotlib', 'tkinter'],
+    'Report.Report': ['tkinter', 'matplotlib', 'smtplib', 'playwright', 'pandas'],
+}
+
+
+def import_times(module):
+    # {imported module name: cumulative microseconds} for one fresh import of module
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def check(module, repeat=3):
+    # (milliseconds, forbidden packages it imported), best of repeat runs
+    best, imported = None, set()
+    for _ in range(repeat):
+        times = import_times(module)
+        imported |= set(times)
+        best = times[module] if best is None else min(best, times[module])
+    forbidden = sorted({name.split('.')[0] for name in imported} & set(FORBIDDEN.get(module, [])))
+    return best / 1000.0, forbidden
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check module import times against their budgets.')
+    parser.add_argument('modules', nargs='*', default=list(BUDGETS))
+    parser.add_argument('--repeat', type=int, default=3, help='runs per module, the fastest counts')
+    args = parser.parse_args(argv)
+
+    failures = 0
+    for module in args.modules:
+        milliseconds, forbidden = check(module, args.repeat)
+        budget = BUDGETS.get(module)
+        over = budget is not None and milliseconds > budget
+        failures += over or bool(forbidden)
+        status = 'OVER' if over else 'ok'
+        print(f"{module:22s} {milliseconds:8.1f} ms  budget {budget or '-':>5} ms  {status}"
+              + (f"  imports {', '.join(forbidden)}" if forbidden else ''))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+# Mail package
+# Sends the finished report by email.  Kept apart from the window and the report code so neither pays for
+# smtplib/ssl/email on startup; import it only when there is something to send.
+
+import json
+import os.path
+import smtplib
+import ssl
+import time
+from email.mime.text import MIMEText
+from email.mime.image import MIMEImage
+from email.mime.multipart import MIMEMultipart
+
+from Trace import Trace
+
+
+class Mail:  # need to add lots of error checking in the functions here
+    # One Mail sends one report to everyone on the list over a single SMTP session.  The message body is built
+    # once and only the To header changes per recipient.  Failed recipients are retried with a backoff, and the
+    # sends are spaced out so a big club list does not trip the provider's rate limits.
+    # mail.json: sender_email, sender_password, receiver_email (one address or a list), and optionally
+    # smtp_host, smtp_port and use_ssl.  For testing, a local debugging server needs no login or SSL:
+    # python -m aiosmtpd -n -l localhost:1025, then smtp_host "localhost", smtp_port 1025, use_ssl false
+    data = {}
+    json_file_name = 'mail.json'
+    mail_exists = True
+    plot_exists = True
+    sender_email_address = ''
+    sender_email_password = ''
+    receiver_email_address = ''
+    smtp_host = 'smtp.gmail.com'
+    port = 465
+    use_ssl = True
+    min_interval = 1.0  # seconds between messages
+    max_retries = 3
+    retry_delay = 5.0  # seconds, doubled after each failed try
+    marker = "Sun_Moon_Plot"
+    encodedcontent = ''
+    attachment_part = ''
+
+    def __init__(self, plot_file_name, smtp_host=None, port=None, use_ssl=None, plot_image=None):
+        # plot_image is the encoded plot (Viewing.plot_image), which saves reading plot_file_name back from disk
+        self.verify_json_exists()
+        self.plot_file_name = plot_file_name
+        self.plot_image = plot_image
+        self.server = None
+        self.last_sent = 0.0
+        if self.mail_exists:
+            self.load_json()
+            self.set_email_password()
+            self.smtp_host = self.data.get('smtp_host', self.smtp_host)
+            self.port = int(self.data.get('smtp_port', self.port))
+            self.use_ssl = self.data.get('use_ssl', self.use_ssl)
+        self.smtp_host = smtp_host or self.smtp_host
+        self.port = port or self.port
+        self.use_ssl = self.use_ssl if use_ssl is None else use_ssl
+        self.context = ssl.create_default_context() if self.use_ssl else None
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def connect(self):
+        if self.server is not None:
+            return self.server
+        if self.use_ssl:
+            self.server = smtplib.SMTP_SSL(self.smtp_host, self.port, context=self.context)
+        else:
+            self.server = smtplib.SMTP(self.smtp_host, self.port)
+        if self.sender_email_password:
+            self.server.login(self.sender_email_address, self.sender_email_password)
+        return self.server
+
+    def close(self):
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except smtplib.SMTPException:
+            self.server.close()
+        self.server = None
+
+    def build_message(self, html_msg, plain_msg):
+        # the parts every recipient shares; plain and html are alternatives, the plot is related to the html
+        message = MIMEMultipart("related")
+        message["Subject"] = "Astronomy Email"  # add infomation related to site and date
+        message["From"] = self.sender_email_address
+        message.preamble = 'This is a multi-part message in MIME format.'
+        msgAlternative = MIMEMultipart('alternative')
+        message.attach(msgAlternative)
+        msgAlternative.attach(MIMEText(plain_msg, "plain"))
+        msgAlternative.attach(MIMEText(html_msg, "html"))
+        # Attach Plot if exists
+        if self.plot_image is None:
+            self.verify_plot_exists()
+            if self.plot_exists:
+                with open(self.plot_file_name, "rb") as fo:
+                    self.plot_image = fo.read()
+        if self.plot_image is not None:
+            svg = self.plot_image.lstrip()[:1] == b'<'
+            msgImage = MIMEImage(self.plot_image, 'svg+xml' if svg else None)
+            msgImage.add_header('Content-ID', '<{0}>'.format(self.plot_file_name))
+            message.attach(msgImage)
+        return message
+
+    def receivers(self):
+        if isinstance(self.receiver_email_address, str):
+            return [self.receiver_email_address]
+        return list(self.receiver_email_address)
+
+    def send_email(self, html_msg, plain_msg, receivers=None):
+        # send to receivers (default the mail.json list) over one connection, returns {address: error} of
+        # the ones that still failed after retrying
+        message = self.build_message(html_msg, plain_msg)
+        failed = {}
+        keep_open = self.server is not None
+        with Trace.span('mail') as span:
+            try:
+                for receiver in receivers or self.receivers():
+                    del message["To"]
+                    message["To"] = receiver
+                    message_text = message.as_string()
+                    error = self._send_with_retry(receiver, message_text)
+                    span.add(recipients=1, bytes=len(message_text), failed=int(error is not None))
+                    if error is not None:
+                        failed[receiver] = error
+                        print(f"Mail to {receiver} failed: {error}")
+            finally:
+                if not keep_open:
+                    self.close()
+        return failed
+
+    def _send_with_retry(self, receiver, message_text):
+        delay = self.retry_delay
+        for attempt in range(self.max_retries + 1):
+            wait = self.last_sent + self.min_interval - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                self.connect().sendmail(self.sender_email_address, receiver, message_text)
+                return None
+            except smtplib.SMTPRecipientsRefused as e:
+                return e  # the address itself is bad, retrying will not help
+            except (smtplib.SMTPException, OSError) as e:
+                error = e
+                if isinstance(e, smtplib.SMTPServerDisconnected) or not isinstance(e, smtplib.SMTPException):
+                    # the session is gone (or never opened), reconnect on the next try
+                    if self.server is not None:
+                        self.server.close()
+                    self.server = None
+                if attempt < self.max_retries:
+                    time.sleep(delay)
+                    delay *= 2
+            finally:
+                self.last_sent = time.time()
+        return error
+
+    def set_email_password(self):
+        self.sender_email_address = self.data['sender_email']
+        self.sender_email_password = self.data['sender_password']
+        self.receiver_email_address = self.data['receiver_email']
+
+    def verify_plot_exists(self):
+        if not os.path.isfile(self.plot_file_name):
+            print("Can not load Location file, {0}".format(self.plot_file_name))
+            self.plot_exists = False
+
+    def verify_json_exists(self):
+        if not os.path.isfile(self.json_file_name):
+            print("Can not load Location file, {0}".format(self.json_file_name))
+            self.mail_exists = False
+
+    def load_json(self):
+        with open(self.json_file_name, 'r') as loc_json_file:
+            self.data = json.load(loc_json_file)
@@ -0,0 +1,135 @@
+# Pdf part of the Report package
+# Turns the summary HTML into a PDF with headless Chromium.  Starting Playwright and a browser costs far more
+# than printing a page, so PdfRenderer starts them once and keeps them for every report after that.  The browser
+# lives on its own thread running an asyncio loop (Playwright objects must stay on the thread that made them);
+# render() can be called from any thread, and up to `pages` renders run at the same time, each on a page taken
+# from a pool and handed back afterwards.
+#
+# Pages are printed once the 'load' event fires.  The report only links out to the finder charts, so waiting
+# for the network to go quiet ('networkidle') just added half a second or more per PDF.
+#
+# with PdfRenderer() as renderer:
+#     seconds = renderer.render('summary.html', 'summary.pdf')
+
+import asyncio
+import atexit
+import os
+import threading
+import time
+
+
+def file_url(html_filename):
+    return 'file:///' + os.path.abspath(html_filename).replace('\\', '/').lstrip('/')
+
+
+class PdfRenderer:
+    pages = 2  # pooled browser pages, the most renders in flight at once
+    wait_until = 'load'
+    timeout = 60  # seconds for one render
+    pdf_options = {'format': 'A4', 'landscape': True, 'print_background': True}
+
+    def __init__(self, pages=None, wait_until=None, timeout=None):
+        self.pages = pages or self.pages
+        self.wait_until = wait_until or self.wait_until
+        self.timeout = timeout or self.timeout
+        self.latencies = []  # seconds per PDF, in the order they finished
+        self._loop = None
+        self._thread = None
+        self._playwright = None
+        self._browser = None
+        self._page_pool = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def running(self):
+        return self._browser is not None
+
+    def start(self):
+        # launch the browser, does nothing when it is already up
+        with self._lock:
+            if self.running:
+                return
+            self._loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=self._loop.run_forever, name='pdf-renderer', daemon=True)
+            self._thread.start()
+            try:
+                self._call(self._launch())
+            except Exception:
+                self._stop_loop()
+                raise
+
+    async def _launch(self):
+        from playwright.async_api import async_playwright
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch()
+        self._page_pool = asyncio.Queue()
+        for _ in range(self.pages):
+            self._page_pool.put_nowait(await self._browser.new_page())
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result(self.timeout)
+
+    def render(self, html_filename, pdf_filename):
+        # blocks until the PDF is written, returns how long it took in seconds
+        self.start()
+        latency = self._call(self._render(file_url(html_filename), pdf_filename))
+        self.latencies.append(latency)
+        return latency
+
+    async def _render(self, url, pdf_filename):
+        start = time.perf_counter()
+        page = await self._page_pool.get()
+        try:
+            await page.goto(url, wait_until=self.wait_until)
+            await page.pdf(path=pdf_filename, **self.pdf_options)
+        except Exception:
+            # a page that failed part way is not trusted again, replace it
+            await page.close()
+            page = await self._browser.new_page()
+            raise
+        finally:
+            self._page_pool.put_nowait(page)
+        return time.perf_counter() - start
+
+    def close(self):
+        with self._lock:
+            if self._loop is None:
+                return
+            if self.running:
+                try:
+                    self._call(self._shutdown())
+                except Exception as e:
+                    print(f"PDF renderer did not shut down cleanly: {e}")
+            self._stop_loop()
+
+    async def _shutdown(self):
+        browser, playwright = self._browser, self._playwright
+        self._browser = self._playwright = self._page_pool = None
+        await browser.close()
+        await playwright.stop()
+
+    def _stop_loop(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(self.timeout)
+        self._loop.close()
+        self._loop = self._thread = None
+        self._browser = self._playwright = self._page_pool = None
+
+
+_shared_renderer = None
+
+
+def shared_renderer():
+    # one renderer per process, started on first use and closed when the process exits
+    global _shared_renderer
+    if _shared_renderer is None:
+        _shared_renderer = PdfRenderer()
+        atexit.register(_shared_renderer.close)
+    return _shared_renderer
@@ -0,0 +1,84 @@
+# Plot part of the Report package
+# Draws the sun and moon altitude chart with matplotlib's object oriented Agg API instead of pyplot: no global
+# figure list to leak into, no style change leaking out to other plots, and safe off the Tk thread.  A renderer
+# keeps one Figure and clears it for the next chart.  The result is the encoded image (PNG or SVG) as bytes, which
+# can be written next to the html or put straight into it as a data uri.
+
+import base64
+import threading
+
+import numpy as np
+
+MIME_TYPES = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+
+def data_uri(image, fmt='png'):
+    # image bytes -> something an <img src=...> takes, so the html needs no separate file
+    return f'data:{MIME_TYPES[fmt]};base64,{base64.b64encode(bytes(image)).decode("ascii")}'
+
+
+class SunMoonPlot:
+    formats = list(MIME_TYPES)
+
+    def __init__(self):
+        self.figure = None
+        self.renders = 0
+        self._lock = threading.Lock()
+
+    def _new_figure(self):
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        figure = Figure()
+        FigureCanvasAgg(figure)
+        return figure
+
+    def render(self, hours, sun_alt, moon_alt, title, xlabel, fmt='png'):
+        # hours from midnight and altitudes in degrees as plain arrays, returns the encoded image
+        if fmt not in self.formats:
+            raise ValueError(f"Unknown plot format {fmt}, expected one of {self.formats}")
+        import io
+        import matplotlib.style
+        from matplotlib.ticker import StrMethodFormatter
+        from astropy.visualization import astropy_mpl_style
+        hours, sun_alt, moon_alt = (np.asarray(a, dtype=float) for a in (hours, sun_alt, moon_alt))
+        with self._lock, matplotlib.style.context(astropy_mpl_style):
+            if self.figure is None:
+                self.figure = self._new_figure()
+            self.figure.clear()
+            ax = self.figure.add_subplot()
+            ax.plot(hours, moon_alt, '--', color='gray', label='Moon')
+            ax.plot(hours, sun_alt, color='red', label='Sun')
+            ax.fill_between(hours, 0, 90, sun_alt < 0, color='gray', alpha=0.5, zorder=0)
+            ax.fill_between(hours, 0, 90, sun_alt < -18, color='black', alpha=0.5, zorder=0)
+            ax.legend(loc='upper left')
+            ax.set_xlim(-12, 12)
+            ax.set_xticks(np.arange(13) * 2 - 12)
+            ax.set_ylim(0, 90)
+            ax.yaxis.set_major_formatter(StrMethodFormatter('{x:g}°'))
+            ax.set_xlabel(xlabel)
+            ax.set_ylabel('Altitude [deg]')
+            ax.set_title(title)
+            buffer = io.BytesIO()
+            self.figure.savefig(buffer, format=fmt)
+            self.figure.clear()  # the artists go now, the Figure itself is kept for the next chart
+        self.renders += 1
+        return buffer.getvalue()
+
+    def close(self):
+        with self._lock:
+            if self.figure is not None:
+                self.figure.clear()
+                self.figure = None
+
+
+_shared_renderer = None
+_shared_lock = threading.Lock()
+
+
+def shared_renderer():
+    # one renderer, and so one Figure, per process
+    global _shared_renderer
+    with _shared_lock:
+        if _shared_renderer is None:
+            _shared_renderer = SunMoonPlot()
+        return _shared_renderer
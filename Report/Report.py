@@ -0,0 +1,746 @@
+# Report package
+# The viewing calculations and the HTML/PDF report for one site and one night.  Nothing in here needs tkinter,
+# so the report can be produced headless (see Batch_Report.py) as well as from the Viewing_Tonight window.
+# matplotlib and the PDF browser are only imported by plot_sun_moon and convert_html_to_pdf, the first time they
+# are needed.
+
+import json
+import os.path
+import sys
+import astropy.units as u
+import numpy as np
+from astropy.time import Time
+from astropy.coordinates import SkyCoord, EarthLocation, AltAz
+import datetime
+from astral import moon
+from Catalog import Catalog
+from Ephemeris import Cache, Cull, Ephemeris, Events, SolarSystem
+from Report import Plot, Results, Schedule, Score, TimeGrid, Writer
+from Site import Site, TimeZone
+from Trace import Trace
+from collections import defaultdict
+
+
+class Targets:
+    data = {}
+    json_file_name = 'viewing_targets.json'
+
+    def __init__(self):
+        self.load_json()
+
+    def verify_json_exists(self):
+        if not os.path.isfile(self.json_file_name):
+            print("Can not load Targets file, {0}".format(self.json_file_name))
+            sys.exit("Program is existing")
+
+    def load_json(self):
+        with open(self.json_file_name, 'r') as loc_json_file:
+            self.data = json.load(loc_json_file)
+
+
+class Viewing:
+    messier_max = 110
+    planet_list = ['mercury', 'venus', 'mars', 'jupiter', 'saturn', 'uranus', 'neptune']
+    engine_list = ['astropy', 'numpy']  # numpy is the Ephemeris fixed target fast path
+    # the numpy engine's settings, part of the fixed target cache key along with Cache.CACHE_VERSION
+    fixed_engine_options = {'precess': True, 'nutate': True, 'aberrate': True, 'refract': False}
+    max_chunk_objects = 2000  # catalog objects transformed together, keeps memory flat for big catalogs
+    # How targets are sampled.  'dense' evaluates 500 evenly spaced samples over the night and lets the rise/set
+    # solver take its own coarse grid.  'adaptive' evaluates only the instants on the local clock's whole hours
+    # and 1/samples_per_hour hours: the detail rows are exact on the hour, and the same samples are the coarse
+    # grid the solver refines around crossings and culmination, to event_minutes.  Fewer samples per hour or a
+    # bigger event_minutes costs less; a visible spell shorter than the sample step can be missed
+    sampling_list = ['adaptive', 'dense']
+    samples_per_hour = 2  # adaptive only: 1, 2 or 4
+    event_minutes = 0.5  # rise, set and transit accuracy, each halving costs one more evaluation per object
+    plan_slot_minutes = 15  # observing plan, see schedule
+    plan_candidates = 300  # the best scoring targets the plan chooses from
+
+    def __init__(self, location_lat, location_long, location_name, viewing_date,
+                 min_alt_n=20, min_alt_e=20, min_alt_s=20, min_alt_w=20, engine='astropy', cache=None,
+                 height=None, site_lookup=None, output_folder='', plot_format='png', plot_inline=False,
+                 timezone=None, sampling='adaptive'):
+        self.lat = location_lat
+        self.long = location_long
+        self.date = self.fix_date(viewing_date)
+        self.file_date = viewing_date
+        self.moon_phase_pct = get_lunar_phase(self.date)
+        self.viewing_date_evening = str(datetime.date(int(viewing_date[0:4]), int(viewing_date[5:7]), int(viewing_date[8:10])))
+        self.site_name = location_name
+        self.site_file_name = self.site_name.replace(' ', '-')
+        self.min_alt_n = min_alt_n
+        self.min_alt_e = min_alt_e
+        self.min_alt_s = min_alt_s
+        self.min_alt_w = min_alt_w
+        self.engine = engine
+        self.cache = cache  # optional Ephemeris.Cache.EphemerisCache, None recomputes everything
+        if height is None:  # feet, looked up when not given; a site that can not be looked up is taken as 0
+            if site_lookup is not None:
+                height = site_lookup.get_elevation_in_feet(location_lat, location_long)
+            else:
+                height = Site.get_elevation_in_feet(location_lat, location_long)
+        self.height = height or 0
+        self.viewing_location = EarthLocation(lat=self.lat * u.deg, lon=self.long * u.deg, height=self.height * u.imperial.foot)
+        if sampling not in self.sampling_list:
+            raise ValueError(f"Unknown sampling {sampling}, expected one of {self.sampling_list}")
+        self.sampling = sampling
+        if timezone is None:  # IANA name, looked up offline from the coordinates when not given
+            if site_lookup is not None:
+                timezone = site_lookup.get_timezone(location_lat, location_long)
+            else:
+                timezone = TimeZone.zone_for(location_lat, location_long)
+            # the map can not tell which side of a nearby border keeping another time the site is on
+            borders = TimeZone.border_zones(location_lat, location_long, timezone, self.date)
+            if borders and timezone == TimeZone.zone_for(location_lat, location_long):
+                print(f"Site {location_lat}, {location_long} is within a few km of {', '.join(borders)}, using "
+                      f"{timezone}; give the timezone in the location file or job if that is wrong")
+        self.timezone = TimeZone.checked_zone(timezone, location_long)
+        self.utcoffset_minutes = TimeZone.local_midnight_offset(self.timezone, self.date)
+        self.utcoffset = self.utcoffset_minutes / 60 * u.hour  # at local midnight, TimeGrid has it for every sample
+        self.viewing_date_midnight_time = self.date + ' 00:00:00'
+        self.midnight = Time(self.viewing_date_midnight_time) - self.utcoffset
+        self.delta_midnight = np.linspace(-6, 6, 500) * u.hour  # this is the default value that is tuned later
+        self.sun_moon_delta_midnight = np.linspace(-12, 12, 1000) * u.hour
+        self.sun_moon_viewing_times = self.midnight + self.sun_moon_delta_midnight
+        self.sun_moon_viewing_frame = AltAz(obstime=self.sun_moon_viewing_times, location=self.viewing_location)
+        self.solar_system = None  # shared sun, moon and planet positions, see get_solar_system
+        self._sky = None  # the sun and moon on the viewing grid for scoring, see sky
+        self.html = ''
+        self.html_summary = ''
+        self.summary_sort_by_rise = False
+        self.summary_sort_by_score = False
+        self.output_folder = output_folder  # where the report files go, '' is the current folder
+        self.plot_format = plot_format  # 'png' or 'svg'
+        self.plot_inline = plot_inline  # True puts the plot in the html instead of a file next to it
+        self.plot_file_name = 'sun_moon_plot' + self.date + self.site_file_name + '.' + plot_format  # relative to the html
+        self.plot_path = os.path.join(self.output_folder, self.plot_file_name)
+        self.plot_image = None  # the encoded plot, see plot_sun_moon
+        self.plot_src = self.plot_file_name  # what the html's <img src=...> gets
+        self.html_filename = os.path.join(self.output_folder, 'astronomy_report.html')
+        self.visibility = Results.VisibilityTable()  # the hourly rows of the detail report
+        self.viewing_order = None  # row order for the report, see sort_data
+        self.sun_events = {}  # see get_sunset
+        self.dusk = None
+        self.sunset = None
+        self.sunrise = None
+        self.dawn = None
+        self.half_dark_hours = 0
+        self.viewing_summary_dictionary = defaultdict(dict)  # calculate general info for summary view
+        self.summary_page_information = self.set_summary_page_information()
+        self.summary_filename = os.path.join(self.output_folder, self.file_date + '_' +
+                                             self.site_name.replace(' ', '_') + '_' + 'astronomy_report_summary.html')
+        self.summary_pdf_filename = os.path.join(self.output_folder, 'astronomy_report_summary' + self.file_date +
+                                                 self.site_file_name + '.pdf')
+        self.catalog = Catalog.shared('messier')
+        self.target_catalogs = {}  # object id -> (Catalog.Catalog, index) of everything checked
+        self.culled = 0  # objects dropped by cull without being transformed
+        self.plan = None  # the observing order for the summary page, see schedule
+        self._set_viewing_times()
+
+    def set_summary_page_information(self):
+        pageinfo = """<h2> What is this page for?</h2>
+        The information on this page is intended to help you plan your observing session for the date
+         shown at the top of this page by providing a list of objects which will be visible in the sky over the course
+        of the evening.  The information provided here is applicable to the location shown at the very top of this page.
+        <br>
+        <h3>How to read the chart to the left </h3>
+        <ul>
+        <li>The time axis at the bottom of the chart presents midnight as 0. </li>
+        <li>The red line indicates the sun's altitude over the course of the charted period.  Sunset (left) and sunrise
+        (right) occur at the two points where the red line touches the bottom of the chart.</li>
+        <li>The grey shaded areas on the chart indicate twilight periods.  These are the periods when the sun continues
+         to illuminate sky after sunset or begins illuminating the sky before sunrise.</li>
+        <li>The grey dashed line indicates the moon's altitude over the course of the charted period.  The current
+        amount of lunar illumination is displayed as a percentage above the chart, with 0% indicating new moon, and
+        100% indicating a full moon. </li>
+        <li>Ideal conditions for observing deep sky objects will most commonly take place during the period indicated
+        by the black portion of the chart and with as little moon as possible.</li>
+        </ul>
+        <h2>What is the table below for?</h2>
+        The table below displays a list of planets and Messier objects which will be above the horizon between sunset
+        and sunrise.
+        <h3>Below Table Column Explanation</h3>
+        <ul>
+        <li><b>Rise Time</b> indicates the earliest time at which the object may be observed.  The earliest time indicated by
+         the Rise Time column will be sunset; this is because you (typically) won't be able to see the object earlier
+         than sundown.  The letter following the time (N, E, S, or W) indicates the compass quadrant the object is
+         in at that time: N = 0&deg;&ndash;89&deg;, E = 90&deg;&ndash;179&deg;, S = 180&deg;&ndash;269&deg;,
+         W = 270&deg;&ndash;359&deg;.</li>
+        <li><b>Set Time</b> indicates the latest time at which the object may be observed.  The latest time indicated by
+         the Set Time column will be sunrise; this is because you (typically) will no longer be able to see the object
+         after sunrise.  As with Rise Time, the letter following the time indicates the compass quadrant the object
+         occupies at that time.</li>
+        <li><b>Max Altitude</b> provides the time at which the object will be highest in the sky and how high it will be at
+         that time. </li>
+        <li><b>Score</b> rates from 0 to 100 how well the object can be seen at its best moment of the night, taking
+         in how dark the sky is, how much air you look through at its altitude, and how close and how bright the
+         moon is.  Hover over it for the details.</li>
+        <li><b>Finder Chart</b> contains a link to a star map to help you know what stars are near the object. </li>
+        <li><b>Suggested Filter</b> contains information regarding the filter(s) we believe will help reveal the most
+         detail for an object, but this can be rather subjective.  Brighter objects typically do not require a filter.
+         Fainter objects may be observed without a filter in ideal conditions, but the right filter can often bring
+         out additional detail, especially when observing from light-polluted locations.</li>
+         </ul>"""
+
+        return pageinfo
+
+    def sort_data(self):
+        self.viewing_order = self.visibility.order()
+
+    def set_html(self):
+        # the whole detail report as one string, write_out_html streams it instead
+        self.html = ''.join(self.iter_html())
+
+    def adjust_delta_midnight(self):
+        self.get_hours_sunset()
+        if self.half_dark_hours > 0:  # a sunset after midnight (far north in summer) keeps the default window
+            self.delta_midnight  = np.linspace(-self.half_dark_hours, self.half_dark_hours, 500) * u.hour
+            self._set_viewing_times()
+
+    def _set_viewing_times(self):
+        # the times targets are evaluated at over the delta_midnight window, see sampling
+        self._cache_time_arrays()
+        if self.sampling == 'dense':
+            self.viewing_times = self.midnight + self.delta_midnight
+        else:
+            self.viewing_times = self.midnight + self.time_grid.delta_hours * u.hour
+        self.viewing_frame = AltAz(obstime=self.viewing_times, location=self.viewing_location)
+
+    def _cache_time_arrays(self):
+        # the viewing grid as integer UTC and local hours and minutes (see TimeGrid), shared by every Viewing of the
+        # night, zone and sampling
+        midnight = self.midnight.utc
+        start, stop = float(self.delta_midnight[0].value), float(self.delta_midnight[-1].value)
+        if self.sampling == 'dense':
+            self.time_grid = TimeGrid.shared(float(midnight.jd1), float(midnight.jd2), start, stop,
+                                             len(self.delta_midnight), self.timezone)
+        else:
+            self.time_grid = TimeGrid.shared_clock(float(midnight.jd1), float(midnight.jd2), start, stop,
+                                                   self.timezone, self.samples_per_hour)
+
+    def local_clock_hours(self, delta_hours):
+        # hours from midnight -> hours from midnight on the local clock, which differ after a DST change in the
+        # night; NaN stays NaN
+        delta_hours = np.asarray(delta_hours, dtype=np.float64)
+        midnight = self.midnight.utc
+        unix_ms = TimeGrid.unix_ms(midnight.jd1, midnight.jd2 + np.nan_to_num(delta_hours) / 24.0)
+        return delta_hours + (TimeZone.offsets(self.timezone, unix_ms) - self.utcoffset_minutes) / 60.0
+
+    def get_hours_sunset(self):
+        if not self.sun_events:
+            self.get_sunset()
+        if self.sunset is None:  # sun never sets, keep the default window
+            return
+        self.half_dark_hours = round((self.midnight - self.sunset).to(u.hour).value)
+
+    def get_sunset(self):
+        # sunset, civil/nautical/astronomical dusk and dawn and sunrise as Time values (None when the sun never
+        # reaches that altitude), found on the shared sun altitude curve
+        sun_alt = self.get_solar_system().alt[self.solar_system.body_index['sun']]
+        events = Events.sun_events(self.sun_moon_delta_midnight.value, sun_alt)
+        self.sun_events = {name: None if np.isnan(hours) else self.midnight + hours * u.hour
+                           for name, hours in events.items()}
+        self.sunset = self.sun_events['sunset']
+        self.sunrise = self.sun_events['sunrise']
+        self.dusk = self.sun_events['astronomical_dusk']
+        self.dawn = self.sun_events['astronomical_dawn']
+
+    def get_solar_system(self):
+        # one batched ephemeris for the sun, moon and planets over the whole sun/moon time grid, shared by the
+        # plot, the twilight detection and the planet rows
+        if self.solar_system is None:
+            bodies = ['sun', 'moon'] + self.planet_list
+            alt = az = None
+            with Trace.span('solar_system', bodies=len(bodies)) as span:
+                if self.cache is not None:
+                    key = self.cache_key('solar_system', bodies=bodies, engine='astropy',
+                                         grid=self.grid_signature(self.sun_moon_viewing_times),
+                                         node_minutes=SolarSystem.node_minutes)
+                    alt, az = self.cache.load(key, 'alt'), self.cache.load(key, 'az')
+                span.label(cached=alt is not None and az is not None)
+                self.solar_system = SolarSystem.SolarSystemEphemeris(self.sun_moon_viewing_times,
+                                                                     self.viewing_location, bodies, alt, az)
+                if self.cache is not None and self.solar_system.altaz is not None:
+                    self.cache.save(key, 'alt', self.solar_system.alt)
+                    self.cache.save(key, 'az', self.solar_system.az)
+        return self.solar_system
+
+    def sky(self):
+        # (samples, Score.Sky): the viewing grid's first sample of every local hour, the same instants as the
+        # detail rows, and the sun and moon interpolated onto them; redone when the grid changes
+        if self._sky is None or self._sky[0] is not self.time_grid:
+            on_hour = np.flatnonzero(self.time_grid.local_minute < 5)
+            _, first = np.unique(self.time_grid.slot[on_hour], return_index=True)
+            samples = on_hour[first]
+            solar_system = self.get_solar_system()
+            jd = self.time_grid.jd[samples]
+            self._sky = (self.time_grid, samples, Score.Sky(*solar_system.interpolate('sun', jd),
+                                                            *solar_system.interpolate('moon', jd)))
+        return self._sky[1:]
+
+    def cache_key(self, stage, **parts):
+        # everything a cached array depends on: the site, the night and whatever the stage adds (engine, its
+        # options, grid ...); EphemerisCache.key adds the cache version
+        return self.cache.key(stage=stage, lat=float(self.lat), long=float(self.long), height=self.height,
+                              date=self.date, **parts)
+
+    @staticmethod
+    def grid_signature(times):
+        return [round(float(times[0].jd), 8), round(float(times[-1].jd), 8), len(times)]
+
+    def plot_sun_moon(self):
+        # the chart is cached next to the ephemeris, keyed by site, night, grid and everything drawn on it; it is
+        # written to plot_path, or with plot_inline only kept in memory and put in the html as a data uri
+        title = f'Sun & Moon Details at {self.site_name} with {self.moon_phase_pct}% Moon'
+        xlabel = f'Hours from Midnight on {self.date}'
+        image = None
+        if self.cache is not None:
+            key = self.cache_key('sun_moon_plot', grid=self.grid_signature(self.sun_moon_viewing_times),
+                                 title=title, xlabel=xlabel, fmt=self.plot_format)
+            image = self.cache.load(key, 'image')
+        if image is None:
+            solar_system = self.get_solar_system()
+            with Trace.span('plot_render', fmt=self.plot_format) as span:
+                image = Plot.shared_renderer().render(self.sun_moon_delta_midnight.value,
+                                                      solar_system.alt[solar_system.body_index['sun']],
+                                                      solar_system.alt[solar_system.body_index['moon']],
+                                                      title, xlabel, self.plot_format)
+                span.add(bytes=len(image))
+            if self.cache is not None:
+                self.cache.save(key, 'image', np.frombuffer(image, dtype=np.uint8), dtype=np.uint8)
+        self.plot_image = bytes(image)
+        if self.plot_inline:
+            self.plot_src = Plot.data_uri(self.plot_image, self.plot_format)
+        else:
+            with open(self.plot_path, 'wb') as f:
+                f.write(self.plot_image)
+            self.plot_src = self.plot_file_name
+
+    def fix_date(self, date):
+        # This function pushes the date forward 1 day to account for the fact that my calculations should be from
+        # midnight on the date provided
+        yr = int(date[0:4])
+        m = int(date[5:7])
+        d = int(date[8:10])
+        return str(datetime.date(yr, m, d) + datetime.timedelta(1))
+
+    def fixed_target_altaz(self, ras, decs, engine=None):
+        # alt/az in degrees for fixed RA/Dec targets over self.viewing_times, shape (N, samples)
+        engine = engine or self.engine
+        if engine not in self.engine_list:
+            raise ValueError(f"Unknown engine {engine}, expected one of {self.engine_list}")
+        with Trace.span('fixed_target_altaz', engine=engine) as span:
+            span.add(objects=len(ras), samples=len(ras) * len(self.viewing_times))
+            return self._cached_fixed_target_altaz(ras, decs, engine)
+
+    def _cached_fixed_target_altaz(self, ras, decs, engine):
+        if self.cache is None:
+            return self._fixed_target_altaz(ras, decs, engine)
+        key = self.cache_key('fixed_targets', engine=engine, grid=self.grid_signature(self.viewing_times),
+                             catalog=Cache.catalog_version(ras, decs),
+                             options=self.fixed_engine_options if engine == 'numpy' else {})
+        alts, azs = self.cache.load(key, 'alt'), self.cache.load(key, 'az')
+        if alts is None or azs is None:
+            Trace.add(cache_misses=1)
+            alts, azs = self._fixed_target_altaz(ras, decs, engine)
+            alts, azs = self.cache.save(key, 'alt', alts), self.cache.save(key, 'az', azs)
+        return alts, azs
+
+    def _fixed_target_altaz(self, ras, decs, engine):
+        if engine == 'numpy':
+            fixed_engine = Ephemeris.FixedTargetEngine.from_time(self.viewing_times, self.viewing_location,
+                                                                 **self.fixed_engine_options)
+            return fixed_engine.altaz(ras, decs)
+        # Reshape to (N, 1) so numpy broadcasts against the (500,) frame → result shape (N, 500)
+        sky_coords = SkyCoord(ra=np.reshape(ras, (-1, 1)) * u.deg, dec=np.reshape(decs, (-1, 1)) * u.deg)
+        all_altazs = sky_coords.transform_to(self.viewing_frame)
+        return all_altazs.alt.deg, all_altazs.az.deg
+
+    def fixed_target_altaz_func(self, ras, decs):
+        # alt/az as a function of hours from midnight for the rise/set solver, always the numpy engine since the
+        # solver evaluates it a few dozen times
+        fixed_engine = Ephemeris.FixedTargetEngine.from_time(self.viewing_times, self.viewing_location,
+                                                             **self.fixed_engine_options)
+        ra_app, dec_app = fixed_engine.apparent_radec(np.atleast_1d(ras), np.atleast_1d(decs))
+        midnight_jd = self.midnight.utc.jd
+        return lambda t: fixed_engine.altaz_at(ra_app, dec_app, midnight_jd + t / 24.0, apparent=True)
+
+    def planet_altaz_func(self, obj):
+        solar_system = self.get_solar_system()
+        midnight_jd = self.midnight.utc.jd
+        return lambda t: solar_system.interpolate(obj, midnight_jd + t / 24.0)
+
+    def solve_rise_set(self, objs, altaz_func, alts=None, azs=None):
+        # minute accurate rise, set and culmination over the viewing window for the summary page; with adaptive
+        # sampling the objects' alts/azs on the viewing grid are the solver's coarse grid
+        coarse = None
+        if self.sampling == 'adaptive' and alts is not None:
+            coarse = (self.time_grid.delta_hours, alts, azs)
+        with Trace.span('rise_set') as span:
+            events = Events.solve_rise_set(altaz_func, len(objs), self.delta_midnight[0].value,
+                                           self.delta_midnight[-1].value,
+                                           (self.min_alt_n, self.min_alt_e, self.min_alt_s, self.min_alt_w),
+                                           tolerance=self.event_minutes / 60, coarse=coarse)
+            span.add(objects=len(objs), samples=len(objs) * (events['evaluations'] - len(self.time_grid)
+                                                              if coarse is not None else events['evaluations']))
+        # numbers only (hours from midnight, the same on the local clock, and degrees), Writer.summary_row turns
+        # them into clock times
+        seen = np.flatnonzero(~np.isnan(events['rise']))
+        for name in ['rise', 'set', 'transit']:
+            events[name + '_clock'] = self.local_clock_hours(events[name])
+        columns = [events[name][seen].tolist() for name in ['rise', 'rise_az', 'set', 'set_az', 'max_alt', 'transit',
+                                                            'rise_clock', 'set_clock', 'transit_clock']]
+        for i, rise, rise_az, set_, set_az, max_alt, transit, rise_clock, set_clock, transit_clock in \
+                zip(seen.tolist(), *columns):
+            self.viewing_summary_dictionary[objs[i]].update({
+                "rise_hours": rise, "rise_az": rise_az, "set_hours": set_, "set_az": set_az,
+                "max_alt": max_alt, "transit_hours": transit,
+                "rise_clock": rise_clock, "set_clock": set_clock, "transit_clock": transit_clock})
+
+    def summary_base(self, obj):
+        # the per object details shown on the summary page, rise/set/max altitude are added by solve_rise_set
+        if obj in self.planet_list:
+            return {"type": 'Planet', "filters": '', "link": '', "difficulty": ''}
+        catalog, i = self.target_catalogs.get(obj) or Catalog.lookup(obj)
+        return summary_entry(catalog.details(i))
+
+    def check_all_messier(self, engine=None):
+        indices, _ = self.catalog.select([f"m{i}" for i in range(1, self.messier_max)])
+        self.check_catalog(self.catalog, indices, engine)
+
+    def check_target_list(self, target_list, engine=None):
+        # the viewing_targets.json target_list, ids from any compiled catalog (m31, c20, ngc7000 ...)
+        selected, missing = Catalog.resolve([obj for obj in target_list
+                                             if obj.lower() not in self.viewing_summary_dictionary])
+        if missing:
+            print(f"Not in any compiled catalog ({', '.join(Catalog.available())}): {', '.join(missing)}")
+        for name, indices in selected.items():
+            self.check_catalog(Catalog.shared(name), indices, engine)
+
+    def cull(self, catalog, indices):
+        # drop the objects that can not clear the lowest minimum altitude during the viewing window, using only
+        # their declination and the sidereal time (see Ephemeris.Cull), before any transforms
+        min_alt = min(self.min_alt_n, self.min_alt_e, self.min_alt_s, self.min_alt_w)
+        midnight_jd = self.midnight.utc.jd
+        in_band = np.zeros(len(catalog), dtype=bool)
+        in_band[Cull.band_indices(*catalog.by_declination(), self.lat, min_alt, Cull.margin(midnight_jd))] = True
+        indices = indices[in_band[indices]]
+        keep = Cull.visible(catalog.ra[indices], catalog.dec[indices], self.lat, self.long,
+                            midnight_jd + self.delta_midnight[0].value / 24.0,
+                            midnight_jd + self.delta_midnight[-1].value / 24.0, min_alt)
+        return indices[keep]
+
+    def check_catalog(self, catalog, indices, engine=None):
+        # every object at the given indices of a Catalog.Catalog, as one array through the transforms
+        with Trace.span('check_catalog', catalog=catalog.name) as span:
+            checked = len(indices)
+            with Trace.span('cull'):
+                indices = self.cull(catalog, indices)
+            self.culled += checked - len(indices)
+            span.add(objects=checked, culled=checked - len(indices))
+            if checked > len(indices):
+                print(f"Culled {checked - len(indices)} of {checked} {catalog.name} objects that stay too low tonight")
+            for start in range(0, len(indices), self.max_chunk_objects):
+                self._check_catalog_chunk(catalog, indices[start:start + self.max_chunk_objects], engine)
+
+    def _check_catalog_chunk(self, catalog, indices, engine):
+        keys = catalog.ids[indices].tolist()
+        ras  = catalog.ra[indices]
+        decs = catalog.dec[indices]
+        all_alts, all_azs = self.fixed_target_altaz(ras, decs, engine)
+
+        self.target_catalogs.update(zip(keys, ((catalog, i) for i in indices.tolist())))
+        self.viewing_summary_dictionary.update(zip(keys, map(summary_entry, catalog.details_list(indices))))
+        self.add_viewing_rows(keys, *self.hourly_samples(all_alts, all_azs), all_alts, all_azs)
+        self.score_targets(keys, all_alts, all_azs)
+        self.solve_rise_set(keys, self.fixed_target_altaz_func(ras, decs), all_alts, all_azs)
+
+    def visible(self, alts, azs):
+        # (objects, samples) mask of an alt/az array: above the minimum altitude of the quadrant it is in
+        thresholds = np.array([self.min_alt_n, self.min_alt_e, self.min_alt_s, self.min_alt_w])
+        return (alts >= thresholds[Events.quadrant(azs)]) & (alts <= 90)
+
+    def hourly_samples(self, alts, azs):
+        # the detail report rows of an (objects, samples) alt/az array as (object, sample) index arrays: for each
+        # object and local clock hour the first sample in the first five minutes of the hour with the object above
+        # its quadrant's minimum altitude.  One pass over the whole array, ordered by object and then hour
+        mask = self.visible(alts, azs) & (self.time_grid.local_minute < 5)
+        objs, samples = np.nonzero(mask)
+        hours = self.time_grid.slot[samples]
+        first = np.ones(len(objs), dtype=bool)
+        first[1:] = (objs[1:] != objs[:-1]) | (hours[1:] != hours[:-1])
+        return objs[first], samples[first]
+
+    def add_viewing_rows(self, objs, rows, samples, alts, azs):
+        # numbers only, the html rows are formatted when the report is written (see Writer.table_row); row k is
+        # object objs[rows[k]] at grid sample samples[k]
+        self.visibility.extend(objs, rows, self.time_grid.jd[samples], alts[rows, samples], azs[rows, samples],
+                               self.time_grid.local_hour[samples], self.time_grid.offset[samples])
+        Trace.add(rows=len(rows))
+
+    def score_targets(self, objs, alts, azs):
+        # observability score (see Score) for the summary page, hour by hour from the alt/az already worked out for
+        # the rows; objs are all planets (scored as bright targets) or none are
+        with Trace.span('score') as span:
+            samples, sky = self.sky()
+            alts, azs = alts[:, samples], azs[:, samples]
+            span.add(objects=len(objs), samples=alts.size)
+            scores = sky.score(alts, azs, self.visible(alts, azs), bright=objs[0] in self.planet_list)
+        seen = np.flatnonzero(scores['best'] >= 0)
+        best_hours = self.local_clock_hours(self.time_grid.delta_hours[samples[scores['best'][seen]]])
+        columns = [scores[name][seen].tolist() for name in ['score', 'airmass', 'moon_sep', 'moon_up', 'dark_fraction']]
+        for i, score, mass, moon_sep, moon_up, dark_fraction, best in zip(seen.tolist(), *columns, best_hours.tolist()):
+            self.viewing_summary_dictionary[objs[i]].update({
+                "score": score, "best_hours": best, "airmass": mass, "moon_sep": moon_sep if moon_up else None,
+                "dark_fraction": dark_fraction})
+
+    def plan_window(self):
+        # hours from midnight the plan can cover: astronomical night, or the viewing window when there is none
+        # (schedule then only keeps the slots with the sun below civil twilight)
+        if not self.sun_events:
+            self.get_sunset()
+        start, stop = self.delta_midnight[0].value, self.delta_midnight[-1].value
+        if self.dusk is not None and self.dawn is not None:
+            start = max(start, (self.dusk - self.midnight).to(u.hour).value)
+            stop = min(stop, (self.dawn - self.midnight).to(u.hour).value)
+        return start, stop
+
+    def plan_slots(self):
+        # start of every plan slot in hours from midnight, those in plan_window that are dark enough for any
+        # target to score (Score.darkness above 0); none at all under the midnight sun
+        start, stop = self.plan_window()
+        step = self.plan_slot_minutes / 60
+        slot_hours = start + step * np.arange(max(int((stop - start) / step), 0))
+        sun_alt, _ = self.get_solar_system().interpolate('sun', self.midnight.jd + (slot_hours + step / 2) / 24.0)
+        return slot_hours[sun_alt < Score.light_sun_alt]
+
+    def schedule(self):
+        # an observing order for the night (see Schedule) from the plan_candidates best scoring visible targets,
+        # as self.plan: one dict per slot with a target, numbers only, Writer.plan_row formats them
+        summary = self.viewing_summary_dictionary
+        candidates = sorted((obj for obj, details in summary.items() if 'rise_hours' in details),
+                            key=lambda obj: -summary[obj].get('score', 0.0))[:self.plan_candidates]
+        step = self.plan_slot_minutes / 60
+        slot_hours = self.plan_slots()
+        with Trace.span('schedule') as span:
+            span.add(objects=len(candidates), slots=len(slot_hours))
+            self.plan = []
+            if not candidates or not len(slot_hours):
+                return self.plan
+            times = np.broadcast_to(slot_hours + step / 2, (len(candidates), len(slot_hours)))
+            alt, az = np.empty(times.shape), np.empty(times.shape)
+            fixed = [k for k, obj in enumerate(candidates) if obj not in self.planet_list]
+            if fixed:
+                places = [self.target_catalogs[candidates[k]] for k in fixed]
+                ras = np.array([catalog.ra[i] for catalog, i in places])
+                decs = np.array([catalog.dec[i] for catalog, i in places])
+                alt[fixed], az[fixed] = self.fixed_target_altaz_func(ras, decs)(times[fixed])
+            for k, obj in enumerate(candidates):
+                if obj in self.planet_list:
+                    alt[k], az[k] = self.planet_altaz_func(obj)(times[k])
+            order, slews = Schedule.plan(alt, az, self.visible(alt, az),
+                                         [summary[obj]['max_alt'] for obj in candidates],
+                                         [max(summary[obj].get('score', 0.0), 1.0) / 100 for obj in candidates])
+            clock = self.local_clock_hours(slot_hours)
+            for slot in np.flatnonzero(order >= 0).tolist():
+                k = order[slot]
+                self.plan.append({"obj": candidates[k], "start_clock": clock[slot], "minutes": self.plan_slot_minutes,
+                                  "alt": alt[k, slot], "az": az[k, slot], "slew": slews[slot]})
+            span.add(planned=len(self.plan))
+        return self.plan
+
+    def check_sky_tonight(self, obj, engine=None):
+        """Single-object processing — used for planets"""
+        with Trace.span('check_sky_tonight', obj=obj):
+            self._check_sky_tonight(obj, engine)
+
+    def _check_sky_tonight(self, obj, engine):
+        # Set summary base values for object
+        self.viewing_summary_dictionary[obj] = self.summary_base(obj)
+
+        # Move on to the calculation
+        if obj in self.planet_list:
+            alts, azs = self.get_solar_system().interpolate(obj, self.viewing_times.jd)
+            alts, azs = alts[np.newaxis], azs[np.newaxis]
+            altaz_func = self.planet_altaz_func(obj)
+        else:
+            catalog, i = self.target_catalogs.setdefault(obj, Catalog.lookup(obj))
+            ra, dec = catalog.ra[i], catalog.dec[i]
+            alts, azs = self.fixed_target_altaz([ra], [dec], engine)
+            altaz_func = self.fixed_target_altaz_func([ra], [dec])
+        self.add_viewing_rows([obj], *self.hourly_samples(alts, azs), alts, azs)
+        self.score_targets([obj], alts, azs)
+        self.solve_rise_set([obj], altaz_func, alts, azs)
+
+    def iter_html(self):
+        return Writer.iter_detail(self)
+
+    def write_out_html(self):
+        # streamed row by row, set_html is not needed first
+        with Trace.span('write_html', report='detail') as span:
+            Writer.write_stream(self.iter_html(), self.html_filename)
+            span.add(rows=len(self.visibility), bytes=os.path.getsize(self.html_filename))
+
+    def summary_objects(self, sort_by_rise=False, sort_by_score=False):
+        # sort_by_score puts the best scores first and is ahead of sort_by_rise, which breaks its ties
+        objects = self.viewing_summary_dictionary.keys()
+        if sort_by_rise:
+            def _rise_key(obj):
+                # hours from midnight, so the evening sorts ahead of the morning
+                return self.viewing_summary_dictionary[obj].get('rise_hours', float('inf'))
+            objects = sorted(objects, key=_rise_key)
+        if sort_by_score:
+            objects = sorted(objects, key=lambda obj: -self.viewing_summary_dictionary[obj].get('score', 0.0))
+        return list(objects)
+
+    def iter_summary_html(self, sort_by_rise=False, sort_by_score=False):
+        return Writer.iter_summary(self, self.summary_objects(sort_by_rise, sort_by_score))
+
+    def make_summary_html(self, sort_by_rise=False, sort_by_score=False):
+        self.summary_sort_by_rise = sort_by_rise
+        self.summary_sort_by_score = sort_by_score
+        self.html_summary = ''.join(self.iter_summary_html(sort_by_rise, sort_by_score))
+
+    def write_out_summary_html(self, sort_by_rise=None, sort_by_score=None):
+        # streamed, the sort options default to whatever make_summary_html was last given
+        if sort_by_rise is None:
+            sort_by_rise = self.summary_sort_by_rise
+        if sort_by_score is None:
+            sort_by_score = self.summary_sort_by_score
+        with Trace.span('write_html', report='summary') as span:
+            Writer.write_stream(self.iter_summary_html(sort_by_rise, sort_by_score), self.summary_filename)
+            span.add(rows=len(self.viewing_summary_dictionary), bytes=os.path.getsize(self.summary_filename))
+
+
+def summary_entry(details):
+    # a Catalog details dict as the summary page shows it
+    difficulty = details['difficulty']
+    return {"type": details['type'],
+            "filters": details['filters'],
+            "link": f'<a href="{details["link"]}" target="_blank">Finder Chart</a>' if details['link'] else '',
+            "difficulty": f'<span class="dot{"green" if difficulty == "easy" else "orange" if difficulty == "medium" else "red"}"></span>' if difficulty else ''}
+
+
+def local_clock(delta_hours):
+    # hours from local midnight -> 'H:MM' local clock time, rounded to the minute
+    minutes = int(round(delta_hours * 60)) % 1440
+    return f'{minutes // 60}:{minutes % 60:02d}'
+
+
+def html_footer():
+    html_foot = "</table>\n" \
+                "<h5> Finder Charts provided by https://freestarcharts.com/ </h5>\n" \
+                "</body>"
+    return html_foot
+
+
+def return_sector(degree):
+    # compass quadrant of an azimuth, by the same rule as the minimum altitudes and the detail rows
+    return Results.SECTORS[int(Events.quadrant(degree))]
+
+
+def html_header(location_name, viewing_date, plot_file_name, half_dark_hours, summary='false', summary_page_info = ''):
+    html_head = "<html><head><title>Astronomy Observation Suggestions</title>\n" \
+                "<style>table, th,\n \
+      td {\n \
+        padding: 3px; \n \
+        border: 1px solid black; \n \
+        border-collapse: collapse; \n \
+      } \n \
+    .dotgreen {\n\
+      height: 15px;\n\
+      width: 15px;\n\
+      background-color: #008000;\n\
+      border-radius: 50%;\n\
+      display: inline-block;\n\
+    }\n\
+    .dotred{\n\
+      height: 15px;\n\
+      width: 15px;\n\
+      background-color: #FF0000;\n\
+      border-radius: 50%;\n\
+      display: inline-block;\n\
+    }\n\
+    .dotorange{\n\
+      height: 15px;\n\
+      width: 15px;\n\
+      background-color: #FF8C00;\n\
+      border-radius: 50%;\n\
+      display: inline-block;\n\
+    }\n\
+    .main-table td, .main-table th {\n\
+      font-size: 85%;\n\
+    }\n\
+    </style></head>\n<body>\n"  # add location specific information
+    html_head += "<h2 style=\"font-family:verdana;\">Viewing Information for {0} On the evening of {1} through the "\
+            "following morning</h2>\n".format(location_name, viewing_date)
+    html_head += "<table> <tr><td>\n"
+    html_head += '<img src="{0}">\n'.format(plot_file_name)
+    html_head += "</td><td style=\"font-size:9pt;vertical-align:top;padding-left:10px\"> " + summary_page_info + " </td></tr>\n</table>\n"
+    #  html_head += "<h2>Viewing Items for {0} on {1}</h2>\n".format(location_name, viewing_date)
+    if summary == 'false':
+        html_head += "<h3>Azimuth Chart</h3>\n"
+        html_head += "<table style=\"font-family:verdana;\">\n" \
+                     "<tr><td>Direction</td><td>From</td><td>To</td></tr>\n" \
+                     "<tr><td> North</td>  <td>0&deg;  </td><td>89&deg;  </td></tr>\n"
+        html_head += "<tr><td> East </td>  <td>90&deg; </td><td>179&deg;  </td></tr>\n"
+        html_head += "<tr><td> South</td>  <td>180&deg;</td><td>269&deg;  </td></tr>\n"
+        html_head += "<tr><td> West </td>  <td>270&deg;</td><td>359&deg;  </td></tr> </table> <br>\n"
+        html_head += "<b>Jump to Hour: </b><a id=\"#Top\"></a>"
+        for hour in range((24 - half_dark_hours), 24, 1):
+            html_head += "<a href = \"#{0}\"> {0} </a> - ".format(hour)
+        for hour in range(0, half_dark_hours, 1):
+            html_head += "<a href = \"#{0}\"> {0} </a> - ".format(hour)
+        html_head += "<a href = \"#{0}\"> {0} </a> ".format(half_dark_hours)
+        html_head += "<table class=\"main-table\">\n"
+        html_head += header_row()
+    else:
+        html_head += "<table class=\"main-table\" style=\"font-family:verdana;\">\n"
+        html_head += summary_header_row()
+    return html_head
+
+
+def summary_header_row():
+    return "<tr><td colspan=9> </td></tr>\n "\
+            "<tr bgcolor=lightgrey style=\"page-break-after:avoid\"><td><b>Object</b></td><td><b>Type</b></td><td><b>Difficulty</b></td>"\
+            "<td><b>Rise Time</b></td><td><b>Set Time</b></td>" \
+            "<td><a href=\"https://en.wikipedia.org/wiki/Horizontal_coordinate_system\"><b>Max Altitude</b></a>" \
+            "</td><td><b>Score</b></td><td><b>Finder Chart</b><br></td><td><b>Suggested Filter</b></td></tr>\n"
+
+
+def plan_header(slot_minutes):
+    # ends the summary table and starts the plan's, html_footer closes it
+    return "</table>\n<h3 style=\"font-family:verdana;\">Suggested Observing Order</h3>\n" \
+           "<p style=\"font-family:verdana;font-size:9pt\">{0} minutes per object through the darkest part of the " \
+           "night, each close to its highest point of the night and in order to keep the telescope's slews short." \
+           "</p>\n" \
+           "<table class=\"main-table\" style=\"font-family:verdana;\">\n" \
+           "<tr bgcolor=lightgrey><td><b>#</b></td><td><b>Start</b></td><td><b>Object</b></td><td><b>Type</b></td>" \
+           "<td><b>Altitude</b></td><td><b>Azimuth</b></td><td><b>Slew</b></td><td><b>Finder Chart</b></td></tr>\n" \
+           .format(slot_minutes)
+
+
+def header_row():
+    return "<tr><td><b>Object</b></td><td><b>Type</b></td><td><b>Date</b></td><td><b>Hour</b></td>" \
+           "<td><b>Altitude</b></td><td><b>Azimuth</b></td><td><b>Finder Chart</b><br></td><td><b>Suggested Filter" \
+           "</b></td></tr>\n"
+
+
+def get_lunar_phase(lunar_date):
+    yr, m, d = map(int, lunar_date.split('-'))
+    date = datetime.date(yr, m, d)
+    phase = moon.phase(date)  # returns lunar phase as a float 0-29.53
+    # Convert to percentage of the moon cycle (0 new moon, 15 full moon)
+    percent = int((phase / 29.53) * 100)
+    return percent
+
+
+def convert_html_to_pdf(html_filename, pdf_filename, renderer=None):
+    # renderer defaults to the process wide Pdf.PdfRenderer, so the browser is only started for the first report
+    from Report import Pdf
+    renderer = renderer or Pdf.shared_renderer()
+    with Trace.span('pdf_render') as span:
+        latency = renderer.render(html_filename, pdf_filename)
+        span.add(bytes=os.path.getsize(pdf_filename))
+    print(f"PDF created: {pdf_filename} in {latency:.2f}s")
+    return latency
@@ -0,0 +1,83 @@
+# Results part of the Report package
+# The hourly visibility rows as typed numpy columns rather than one pre-formatted html string per row.  Rows are
+# appended a whole object at a time, sorted with one stable argsort on the hour, and only turned into text when a
+# report is written (see Writer), so the same table can feed the HTML, a CSV or anything else.  Hours are local
+# clock hours since 1970-01-01 with the UTC offset in minutes beside them, so an hour that happens twice when DST
+# ends still sorts and groups as two hours.
+
+import numpy as np
+
+from Ephemeris.Events import quadrant
+from Report.TimeGrid import utc_hour
+
+SECTORS = ['N', 'E', 'S', 'W']
+
+
+def display_az(azs):
+    # azimuths the way every table prints them, int(az) + 1 so 1 to 360; the sector is Events.quadrant of az
+    return np.floor(azs).astype(np.int64) + 1
+
+
+class VisibilityTable:
+    columns = ['object_id', 'time', 'hour', 'offset', 'alt', 'az', 'sector']
+    dtypes = {'object_id': np.int32, 'time': np.float64, 'hour': np.int64, 'offset': np.int16, 'alt': np.float64,
+              'az': np.float64, 'sector': np.int8}
+
+    def __init__(self):
+        self.objects = []  # object_id -> name
+        self.object_ids = {}
+        self._chunks = {name: [] for name in self.columns}
+        self._data = None
+
+    def __len__(self):
+        return sum(len(chunk) for chunk in self._chunks['time'])
+
+    def object_id(self, obj):
+        if obj not in self.object_ids:
+            self.object_ids[obj] = len(self.objects)
+            self.objects.append(obj)
+        return self.object_ids[obj]
+
+    def append(self, obj, times_jd, alts, azs, hours=None, offsets=0):
+        # every row for one object, times are UTC julian dates and alt/az are degrees; hours (local, since the
+        # epoch, see TimeGrid) are the UTC hours of the times when not given
+        self.extend([obj], np.zeros(len(times_jd), dtype=np.intp), times_jd, alts, azs, hours, offsets)
+
+    def extend(self, objs, which, times_jd, alts, azs, hours=None, offsets=0):
+        # rows for many objects at once, row k belongs to objs[which[k]]; objects get their ids in the order of
+        # objs, and only when they have rows
+        which = np.asarray(which, dtype=np.intp)
+        ids = np.full(len(objs), -1, dtype=np.int32)
+        for i in np.unique(which).tolist():
+            ids[i] = self.object_id(objs[i])
+        times_jd = np.asarray(times_jd, dtype=np.float64)
+        azs = np.asarray(azs, dtype=np.float64)
+        rows = {'object_id': ids[which],
+                'time': times_jd, 'hour': utc_hour(times_jd) if hours is None else hours,
+                'offset': np.broadcast_to(offsets, times_jd.shape), 'alt': alts, 'az': azs,
+                'sector': quadrant(azs)}
+        for name in self.columns:
+            self._chunks[name].append(np.asarray(rows[name], dtype=self.dtypes[name]))
+        self._data = None
+
+    @property
+    def data(self):
+        # the columns as one array each, concatenated once after the last append
+        if self._data is None:
+            self._data = {name: np.concatenate(chunks) if chunks else np.zeros(0, self.dtypes[name])
+                          for name, chunks in self._chunks.items()}
+            self._chunks = {name: [array] for name, array in self._data.items()}
+        return self._data
+
+    def order(self):
+        # by the UTC minute each row's hour began; within an hour rows stay in the order the objects were checked
+        data = self.data
+        return np.argsort(data['hour'] * 60 - data['offset'], kind='stable')
+
+    def rows(self, order=None):
+        # (name, local hour since the epoch, UTC offset in minutes, alt, az, sector) a row at a time, for the
+        # writers
+        data = self.data
+        for i in self.order() if order is None else order:
+            yield (self.objects[data['object_id'][i]], int(data['hour'][i]), int(data['offset'][i]), data['alt'][i],
+                   data['az'][i], SECTORS[data['sector'][i]])
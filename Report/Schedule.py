@@ -0,0 +1,89 @@
+# Schedule part of the Report package
+# Turns the night's visible targets into an observing order: the dark part of the night is cut into equal slots
+# and each slot gets one target, so that every target is observed close to its culmination, only while it is
+# above its quadrant's minimum altitude, and the telescope slews as little as it can between them.
+#
+# The merit of a target in a slot is its priority (the observability score, see Score) times how close it is to
+# its highest altitude of the night.  Slots are filled greedily in time order, each with the target of best merit
+# less the cost of slewing to it, and the order is then improved by 2-opt: a run of up to max_segment slots is
+# reversed whenever every target in it can still be seen in its new slot and the total cost goes down.  Everything
+# is (targets, slots) numpy arrays, so a few hundred targets plan in milliseconds.
+
+import numpy as np
+
+from Report.Score import separation
+
+slew_weight = 1.0  # a 180 deg slew costs as much merit as observing one top priority target at culmination
+max_segment = 8  # longest run of slots 2-opt reverses
+max_passes = 20
+
+
+def merit(alt, visible, max_alt, priority):
+    # (targets, slots) value of observing each target in each slot, -inf where it can not be seen
+    closeness = np.clip(alt / np.maximum(max_alt, 1.0)[:, None], 0.0, 1.0)
+    return np.where(visible, priority[:, None] * closeness, -np.inf)
+
+
+def slew(alt, az, order):
+    # degrees slewed into each slot of order (target per slot, -1 for empty), from the target of the last filled
+    # slot as it is placed at the start of this one; 0 for the first target and for empty slots
+    slews = np.zeros(len(order))
+    filled = np.flatnonzero(order >= 0)
+    if len(filled) > 1:
+        prev, cur, slots = order[filled[:-1]], order[filled[1:]], filled[1:]
+        slews[slots] = separation(alt[prev, slots], az[prev, slots], alt[cur, slots], az[cur, slots])
+    return slews
+
+
+def cost(value, alt, az, order, weight=slew_weight):
+    # what the plan minimises: the slewing, weighted, less the merit observed
+    filled = np.flatnonzero(order >= 0)
+    return weight * slew(alt, az, order).sum() / 180.0 - value[order[filled], filled].sum()
+
+
+def greedy(value, alt, az, weight=slew_weight):
+    targets, slots = value.shape
+    order = np.full(slots, -1, dtype=np.intp)
+    used = np.zeros(targets, dtype=bool)
+    prev = -1
+    for slot in range(slots):
+        candidate = np.where(used, -np.inf, value[:, slot])
+        if prev >= 0:
+            candidate = candidate - weight * separation(alt[prev, slot], az[prev, slot],
+                                                        alt[:, slot], az[:, slot]) / 180.0
+        best = int(np.argmax(candidate))
+        if np.isfinite(candidate[best]):
+            order[slot] = prev = best
+            used[best] = True
+    return order
+
+
+def two_opt(value, alt, az, order, weight=slew_weight, segment=max_segment, passes=max_passes):
+    # reverses runs of filled slots while that lowers the cost and keeps every target visible in its slot
+    order = order.copy()
+    filled = np.flatnonzero(order >= 0)
+    best_cost = cost(value, alt, az, order, weight)
+    for _ in range(passes):
+        improved = False
+        for i in range(len(filled) - 1):
+            for j in range(i + 1, min(i + segment, len(filled))):
+                slots = filled[i:j + 1]
+                reversed_targets = order[slots][::-1]
+                if not np.isfinite(value[reversed_targets, slots]).all():
+                    continue
+                trial = order.copy()
+                trial[slots] = reversed_targets
+                trial_cost = cost(value, alt, az, trial, weight)
+                if trial_cost < best_cost - 1e-9:
+                    order, best_cost, improved = trial, trial_cost, True
+        if not improved:
+            break
+    return order
+
+
+def plan(alt, az, visible, max_alt, priority, weight=slew_weight):
+    # alt/az/visible shaped (targets, slots), max_alt and priority per target; returns the target index observed
+    # in each slot (-1 when nothing is left to see) and the degrees slewed into it
+    value = merit(alt, visible, np.asarray(max_alt, dtype=np.float64), np.asarray(priority, dtype=np.float64))
+    order = two_opt(value, alt, az, greedy(value, alt, az, weight), weight)
+    return order, slew(alt, az, order)
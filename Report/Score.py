@@ -0,0 +1,68 @@
+# Score part of the Report package
+# How well each target can actually be seen tonight, worked out from arrays the report already has: the targets'
+# alt/az on the viewing grid, and the sun and moon from the shared solar system ephemeris interpolated onto the
+# same grid, so scoring adds no transforms.  Every sample a target is above its quadrant's minimum altitude gets a
+# quality between 0 and 1, the product of
+#   darkness  1 with the sun below -18 deg (astronomical night), 0 above -6 deg (civil twilight), linear between;
+#             planets are bright enough to need only the sun below -6 deg, and nothing with it above the horizon
+#   airmass   1 / airmass (Kasten & Young), 1 at the zenith, about 0.5 at 30 deg
+#   moon      1 - illumination * exp(-separation / moon_scale_deg) while the moon is up, 1 when it is down
+# A target's score is 100 x its best quality of the night, so a faint galaxy high in a dark moonless sky scores
+# near 100 and one low in twilight next to a full moon near 0.
+
+import numpy as np
+
+dark_sun_alt = -18.0
+light_sun_alt = -6.0
+bright_dark_sun_alt = -6.0  # civil twilight is dark enough for bright targets, the planets
+bright_light_sun_alt = 0.0
+moon_scale_deg = 40.0
+
+
+def separation(alt1, az1, alt2, az2):
+    # angle in degrees between two alt/az directions, any broadcastable shapes
+    alt1, az1, alt2, az2 = (np.radians(a) for a in (alt1, az1, alt2, az2))
+    cos_sep = np.sin(alt1) * np.sin(alt2) + np.cos(alt1) * np.cos(alt2) * np.cos(az1 - az2)
+    return np.degrees(np.arccos(np.clip(cos_sep, -1.0, 1.0)))
+
+
+def airmass(alt):
+    # Kasten & Young (1989), good to the horizon; alt in degrees, below the horizon counts as the horizon
+    alt = np.maximum(alt, 0.0)
+    return 1.0 / (np.sin(np.radians(alt)) + 0.50572 * (alt + 6.07995) ** -1.6364)
+
+
+def darkness(sun_alt, dark=dark_sun_alt, light=light_sun_alt):
+    return np.clip((light - np.asarray(sun_alt)) / (light - dark), 0.0, 1.0)
+
+
+class Sky:
+    # the sun and moon over one viewing grid, shared by every target scored against it
+    def __init__(self, sun_alt, sun_az, moon_alt, moon_az):
+        self.sun_alt = np.asarray(sun_alt, dtype=np.float64)
+        self.moon_alt = np.asarray(moon_alt, dtype=np.float64)
+        self.moon_az = np.asarray(moon_az, dtype=np.float64)
+        self.darkness = darkness(self.sun_alt)
+        self.bright_darkness = darkness(self.sun_alt, bright_dark_sun_alt, bright_light_sun_alt)
+        # fraction of the disc lit, from the sun-moon elongation
+        self.illumination = (1.0 - np.cos(np.radians(separation(sun_alt, sun_az, moon_alt, moon_az)))) / 2.0
+        self.moon_up = self.moon_alt > 0.0
+
+    def score(self, alts, azs, visible, bright=False):
+        # alts/azs/visible shaped (objects, samples), bright for planets; returns a dict of per object arrays: score
+        # (0-100), best (sample of the best quality, -1 when never visible), and airmass, moon separation and
+        # darkness at best, plus dark_fraction, the share of the object's visible samples in astronomical night
+        moon_sep = separation(alts, azs, self.moon_alt, self.moon_az)
+        moon = np.where(self.moon_up, 1.0 - self.illumination * np.exp(-moon_sep / moon_scale_deg), 1.0)
+        mass = airmass(alts)
+        sky_darkness = self.bright_darkness if bright else self.darkness
+        quality = np.where(visible, sky_darkness * moon / mass, -1.0)
+        best = np.argmax(quality, axis=1)
+        rows = np.arange(len(best))
+        seen = visible.any(axis=1)
+        visible_samples = np.maximum(visible.sum(axis=1), 1)
+        return {'score': np.where(seen, 100.0 * np.maximum(quality[rows, best], 0.0), 0.0),
+                'best': np.where(seen, best, -1),
+                'airmass': mass[rows, best], 'moon_sep': moon_sep[rows, best],
+                'moon_up': self.moon_up[best], 'darkness': sky_darkness[best],
+                'dark_fraction': (visible & (self.sun_alt <= dark_sun_alt)).sum(axis=1) / visible_samples}
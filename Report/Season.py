@@ -0,0 +1,163 @@
+# Season part of the Report package
+# Plans a run of nights at once (a Messier marathon, a month of outreach ...).  Visibility for the whole
+# catalog is worked out as one objects x nights x samples array: the per night time grid, the Messier data and
+# the sun are computed once for the whole season, and the catalog goes through the numpy fixed target engine in
+# chunks sized so that memory stays under max_chunk_bytes however long the season is.
+#
+# The catalog is placed for the middle of the season, which is good to 0.01 deg for a season of a few months.
+#
+# python -m Report.Season --name "Ward Pound Ridge" --lat 41.26 --long -73.60 --start 2025-03-01 --nights 30
+
+import argparse
+import datetime
+import os
+
+import astropy.units as u
+import numpy as np
+from astropy.coordinates import EarthLocation
+from astropy.time import Time
+
+from Ephemeris import Ephemeris, Events, SolarSystem
+from Catalog import Catalog
+from Report import Writer
+from Site import TimeZone
+
+
+class SeasonPlanner:
+    messier_max = 110
+    dark_sun_alt = -18.0  # astronomical darkness
+    max_chunk_bytes = 64 * 1024 * 1024
+    # peak bytes per object per sample while a chunk is worked out, measured with tracemalloc at 56 (mostly the
+    # engine's float64 hour angle, trig and alt/az temporaries) and rounded up
+    chunk_bytes_per_sample = 64
+
+    def __init__(self, location_lat, location_long, location_name, start_date, nights, height=0,
+                 min_alt_n=20, min_alt_e=20, min_alt_s=20, min_alt_w=20, samples_per_hour=4, timezone=None):
+        self.lat = location_lat
+        self.long = location_long
+        self.site_name = location_name
+        self.start_date = start_date  # evening of the first night, YYYY-MM-DD
+        self.nights = nights
+        self.thresholds = (min_alt_n, min_alt_e, min_alt_s, min_alt_w)
+        self.viewing_location = EarthLocation(lat=self.lat * u.deg, lon=self.long * u.deg,
+                                              height=height * u.imperial.foot)
+        self.catalog = Catalog.shared('messier')
+        self.messier_keys = [f"m{i}" for i in range(1, self.messier_max)]
+        self.indices, _ = self.catalog.select(self.messier_keys)
+        self.ras = self.catalog.ra[self.indices]
+        self.decs = self.catalog.dec[self.indices]
+        self.timezone = TimeZone.checked_zone(timezone or TimeZone.zone_for(self.lat, self.long), self.long)
+
+        # one hours-from-midnight grid shared by every night, each night from its own local midnight so a DST
+        # change in the season moves the nights after it
+        midnights = [datetime.date.fromisoformat(start_date) + datetime.timedelta(k + 1) for k in range(nights)]
+        offsets = np.array([TimeZone.local_midnight_offset(self.timezone, date) for date in midnights])
+        first_midnight = Time(str(midnights[0]) + ' 00:00:00')
+        self.delta_midnight = np.linspace(-12, 12, 24 * samples_per_hour + 1)
+        self.sample_hours = self.delta_midnight[1] - self.delta_midnight[0]
+        self.times_jd = (first_midnight.utc.jd + np.arange(nights) - offsets / 1440.0)[:, None] \
+            + self.delta_midnight[None, :] / 24.0
+        self.dates = [str(datetime.date.fromisoformat(start_date) + datetime.timedelta(k)) for k in range(nights)]
+        self.dark = None
+        self.sun_events = None
+        self.results = None
+
+    def compute_sun(self):
+        # sun altitude for every night in a single ephemeris call, then the dark mask and each night's events
+        times = Time(self.times_jd.ravel(), format='jd', scale='utc')
+        sun = SolarSystem.SolarSystemEphemeris(times, self.viewing_location, ['sun'])
+        sun_alt = sun.alt[0].reshape(self.times_jd.shape)
+        self.dark = sun_alt < self.dark_sun_alt
+        self.sun_events = [Events.sun_events(self.delta_midnight, night) for night in sun_alt]
+        return self.dark
+
+    def chunk_size(self):
+        # objects per chunk so a chunk's peak memory stays under max_chunk_bytes
+        per_object = self.chunk_bytes_per_sample * self.times_jd.size
+        return max(1, int(self.max_chunk_bytes // per_object))
+
+    def fixed_engine(self):
+        return Ephemeris.FixedTargetEngine.from_time(Time(self.times_jd.ravel(), format='jd', scale='utc'),
+                                                     self.viewing_location)
+
+    def chunk(self, engine, start, stop):
+        # dark hours above the minimum altitude and peak altitude then, (objects, nights), for objects start:stop
+        alt, az = engine.altaz(self.ras[start:stop], self.decs[start:stop])
+        alt = alt.reshape(stop - start, *self.times_jd.shape)
+        az = az.reshape(alt.shape)
+        visible = (alt >= Events.quadrant_thresholds(az, *self.thresholds)) & self.dark[None]
+        peak_alt = np.where(visible, alt, -np.inf).max(axis=-1)
+        return visible.sum(axis=-1) * self.sample_hours, np.where(np.isfinite(peak_alt), peak_alt, np.nan)
+
+    def compute(self):
+        if self.dark is None:
+            self.compute_sun()
+        engine = self.fixed_engine()
+        n_objects = len(self.messier_keys)
+        hours = np.zeros((n_objects, self.nights))
+        peak = np.full((n_objects, self.nights), np.nan)
+        step = self.chunk_size()
+        for start in range(0, n_objects, step):
+            stop = min(start + step, n_objects)
+            hours[start:stop], peak[start:stop] = self.chunk(engine, start, stop)
+
+        # best night is the one with the longest dark window, ties go to the higher peak altitude
+        ranking = hours + np.nan_to_num(peak, nan=0.0) / 1000.0
+        best = np.argmax(ranking, axis=1)
+        rows = np.arange(n_objects)
+        self.results = {'hours': hours, 'peak': peak, 'best_night': best,
+                        'best_hours': hours[rows, best], 'best_peak': peak[rows, best],
+                        'nights_visible': (hours > 0).sum(axis=1)}
+        return self.results
+
+    def iter_html(self):
+        # the season table a row at a time, see Writer
+        if self.results is None:
+            self.compute()
+        r = self.results
+        yield ("<html><head><title>Season Planner</title>\n"
+               "<style>table, th, td {padding: 3px; border: 1px solid black; border-collapse: collapse;}</style>"
+               "</head>\n<body>\n")
+        yield "<h2 style=\"font-family:verdana;\">Season plan for {0}, {1} nights from the evening of {2}</h2>\n"\
+            .format(self.site_name, self.nights, self.start_date)
+        yield "<table style=\"font-family:verdana;\">\n<tr bgcolor=lightgrey><td><b>Object</b></td>" \
+              "<td><b>Type</b></td><td><b>Best Date</b></td><td><b>Dark Hours</b></td>" \
+              "<td><b>Peak Altitude</b></td><td><b>Nights Visible</b></td></tr>\n"
+        order = sorted(range(len(self.messier_keys)), key=lambda i: (r['best_hours'][i] == 0, r['best_night'][i]))
+        for i in order:
+            if r['best_hours'][i] == 0:
+                continue
+            obj = self.messier_keys[i]
+            yield '<tr><td>{0}</td><td>{1}</td><td>{2}</td><td>{3:.1f}</td><td>{4}&#0176</td><td>{5}</td></tr>\n'\
+                .format(obj.capitalize(), self.catalog.metadata('type')[self.indices[i]], self.dates[r['best_night'][i]],
+                        r['best_hours'][i], int(r['best_peak'][i]), r['nights_visible'][i])
+        yield "</table>\n</body>"
+
+    def make_html(self):
+        return ''.join(self.iter_html())
+
+    def write_out_html(self, output_folder=''):
+        file_name = os.path.join(output_folder, self.start_date + '_' + self.site_name.replace(' ', '_') +
+                                 f'_season_{self.nights}_nights.html')
+        return Writer.write_stream(self.iter_html(), file_name)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Plan which nights suit each catalog object.')
+    parser.add_argument('--name', default='Site')
+    parser.add_argument('--lat', type=float, required=True)
+    parser.add_argument('--long', type=float, required=True)
+    parser.add_argument('--height', type=float, default=0, help='feet')
+    parser.add_argument('--start', required=True, help='YYYY-MM-DD evening of the first night')
+    parser.add_argument('--nights', type=int, default=30)
+    parser.add_argument('--min-alt', type=int, default=20)
+    parser.add_argument('--timezone', help='IANA zone, e.g. America/New_York; looked up from the site if not given')
+    parser.add_argument('--output', default='')
+    args = parser.parse_args(argv)
+    planner = SeasonPlanner(args.lat, args.long, args.name, args.start, args.nights, args.height,
+                            *[args.min_alt] * 4, timezone=args.timezone)
+    print(f"Season plan written to {planner.write_out_html(args.output)}")
+
+
+if __name__ == '__main__':
+    main()
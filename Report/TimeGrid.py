@@ -0,0 +1,88 @@
+# TimeGrid part of the Report package
+# The night's sample times as numbers: julian dates plus integer milliseconds, hours, minutes and days since
+# 1970-01-01 UTC, worked out arithmetically from midnight's two part julian date instead of formatting every
+# sample to an ISO string and slicing it.  Local times are the same integers moved by each sample's UTC offset in
+# the site's time zone (see Site.TimeZone), so a DST change during the night shows up on the right sample.  A
+# grid depends only on the night, the sampling and the zone, so Viewings of the same night share one (see
+# shared); the arrays are read only for that reason.  Text is only made from these when a report is written.
+#
+# A grid is either evenly spaced (shared) or clock aligned (shared_clock): only the instants that fall on the
+# hour, or on the half or quarter hour, of the local clock, which is all the hourly tables need.
+
+import datetime
+import functools
+
+import numpy as np
+
+from Site import TimeZone
+
+UNIX_EPOCH_JD = 2440587.5
+UNIX_EPOCH = datetime.datetime(1970, 1, 1)
+MS_PER_MINUTE = 60000
+MS_PER_HOUR = 3600000
+MS_PER_DAY = 86400000
+
+
+def unix_ms(jd1, jd2=0.0):
+    # milliseconds since 1970-01-01 UTC, rounded like Time.iso is; jd1 carries the whole days so nothing is lost
+    return np.round(((np.asarray(jd1, dtype=np.float64) - UNIX_EPOCH_JD) + np.asarray(jd2, dtype=np.float64))
+                    * MS_PER_DAY).astype(np.int64)
+
+
+def utc_hour(jd):
+    # whole hours since 1970-01-01 UTC
+    return np.floor_divide(unix_ms(jd), MS_PER_HOUR)
+
+
+def hour_datetime(hour):
+    # a count of hours since 1970-01-01 (UTC or local clock) as a naive datetime
+    return UNIX_EPOCH + datetime.timedelta(hours=int(hour))
+
+
+class TimeGrid:
+    def __init__(self, midnight_jd1, midnight_jd2, delta_hours, zone='UTC'):
+        # midnight as Time's jd1/jd2 (UTC), delta_hours the sample offsets from it, zone an IANA name
+        self.zone = zone
+        self.delta_hours = np.asarray(delta_hours, dtype=np.float64)
+        jd2 = midnight_jd2 + self.delta_hours / 24.0
+        self.jd = midnight_jd1 + jd2
+        self.unix_ms = unix_ms(midnight_jd1, jd2)
+        self.hour = self.unix_ms // MS_PER_HOUR  # hours since the epoch, unique across midnight
+        self.minute = self.unix_ms // MS_PER_MINUTE % 60
+        self.day = self.unix_ms // MS_PER_DAY
+        self.offset = TimeZone.offsets(zone, self.unix_ms)  # minutes, local = UTC + offset
+        local_ms = self.unix_ms + self.offset.astype(np.int64) * MS_PER_MINUTE
+        self.local_hour = local_ms // MS_PER_HOUR  # local clock hours since the epoch
+        self.local_minute = local_ms // MS_PER_MINUTE % 60
+        self.slot = self.local_hour * 60 - self.offset  # UTC minute the local hour began, one per hour lived
+        for array in (self.delta_hours, self.jd, self.unix_ms, self.hour, self.minute, self.day, self.offset,
+                      self.local_hour, self.local_minute, self.slot):
+            array.setflags(write=False)
+
+    def __len__(self):
+        return len(self.jd)
+
+
+def clock_hours(midnight_jd1, midnight_jd2, start_hours, stop_hours, zone='UTC', per_hour=2):
+    # hours from midnight of every instant inside [start_hours, stop_hours] that is on a whole 1/per_hour of an
+    # hour on the local clock (per_hour 1, 2 or 4), with start_hours and stop_hours themselves.  UTC offsets are
+    # whole quarter hours, so the candidates are the quarter hours from local midnight
+    quarters = np.arange(np.ceil(start_hours * 4), np.floor(stop_hours * 4) + 1) / 4.0
+    ms = unix_ms(midnight_jd1, midnight_jd2 + quarters / 24.0)
+    local_minute = (ms // MS_PER_MINUTE + TimeZone.offsets(zone, ms)) % 60
+    on_clock = quarters[local_minute % (60 // per_hour) == 0]
+    return np.unique(np.concatenate([[start_hours], on_clock, [stop_hours]]))
+
+
+@functools.lru_cache(maxsize=64)
+def shared(midnight_jd1, midnight_jd2, start_hours, stop_hours, samples, zone='UTC'):
+    # the grid of np.linspace(start_hours, stop_hours, samples) hours from midnight, one per night, sampling and
+    # zone
+    return TimeGrid(midnight_jd1, midnight_jd2, np.linspace(start_hours, stop_hours, samples), zone)
+
+
+@functools.lru_cache(maxsize=64)
+def shared_clock(midnight_jd1, midnight_jd2, start_hours, stop_hours, zone='UTC', per_hour=2):
+    # the clock aligned grid (see clock_hours), one per night, window, zone and per_hour
+    return TimeGrid(midnight_jd1, midnight_jd2,
+                    clock_hours(midnight_jd1, midnight_jd2, start_hours, stop_hours, zone, per_hour), zone)
@@ -0,0 +1,103 @@
+# Writer part of the Report package
+# Streams the detail and summary reports a piece at a time instead of growing one big string.  The hourly rows
+# are kept as numbers (Results.VisibilityTable) and each table row is formatted as it is written, so the memory
+# used while writing does not grow with the size of the report.
+#
+# for chunk in iter_detail(viewing): ...           any consumer of strings
+# write_stream(iter_detail(viewing), file_name)    straight to a file (or an open file object)
+
+from Report import Report, Results, TimeGrid
+
+
+def table_row(obj, details, obs_date, obs_hour, alt, az, sector, utc_hour):
+    # one hourly row of the detail report, details is the object's entry in viewing_summary_dictionary
+    tr_bgclr = "#d5f5e3" if utc_hour % 2 == 0 else "#d6eaf8"
+    direction = f'{az} - {sector}'
+    return (f'<tr bgcolor="{tr_bgclr}"><td>{obj.upper()}</td><td>{details["type"]}</td>'
+            f'<td>{obs_date}</td><td>{obs_hour}</td><td>{alt}&#730;</td>'
+            f'<td>{direction}&#730;</td><td>{details["filters"]}</td><td style="white-space:nowrap">{details["link"]}</td></tr>\n')
+
+
+def summary_row(obj, details):
+    # details has the numbers from Viewing.solve_rise_set, hours from midnight on the local clock and degrees
+    return '<tr><td>' + obj.capitalize() + '</td><td>' + details['type'].capitalize() + \
+           '</td><td style="text-align:center">' + details['difficulty'] + '</td><td>' + \
+           Report.local_clock(details['rise_clock']) + ' ' + Report.return_sector(details['rise_az']) + \
+           '</td><td>' + \
+           Report.local_clock(details['set_clock']) + ' ' + Report.return_sector(details['set_az']) + \
+           '</td><td>' + \
+           str(int(details['max_alt'])) + '&#0176 @ ' + Report.local_clock(details['transit_clock']) + \
+           '</td>' + score_cell(details) + \
+           '<td style="white-space:nowrap">' + details['link'] + '</td><td>' + details['filters'] + '</td></tr>' + "\n"
+
+
+def score_cell(details):
+    # the observability score, with what went into it as a tooltip (see Score); best_hours is on the local clock
+    if 'score' not in details:
+        return '<td></td>'
+    moon = 'moon down' if details['moon_sep'] is None else f"moon {int(details['moon_sep'])}&#0176 away"
+    return (f'<td style="text-align:center" title="best at {Report.local_clock(details["best_hours"])}, '
+            f'airmass {details["airmass"]:.2f}, {moon}, {details["dark_fraction"]:.0%} of its time in full dark">'
+            f'{int(round(details["score"]))}</td>')
+
+
+def plan_row(number, details, entry):
+    # one slot of Viewing.plan, entry has the numbers from Viewing.schedule
+    obj = entry['obj']
+    slew = '' if number == 1 else f"{int(round(entry['slew']))}&#0176"
+    return (f'<tr><td>{number}</td><td>{Report.local_clock(entry["start_clock"])}</td><td>{obj.capitalize()}</td>'
+            f'<td>{details["type"].capitalize()}</td><td>{int(entry["alt"])}&#0176</td>'
+            f'<td>{Results.display_az(entry["az"])} - {Report.return_sector(entry["az"])}</td><td>{slew}</td>'
+            f'<td style="white-space:nowrap">{details["link"]}</td></tr>\n')
+
+
+def iter_plan(viewing):
+    # the observing order after the summary table, nothing when Viewing.schedule was not run
+    if not viewing.plan:
+        return
+    yield Report.plan_header(viewing.plan_slot_minutes)
+    for number, entry in enumerate(viewing.plan, 1):
+        yield plan_row(number, viewing.viewing_summary_dictionary[entry['obj']], entry)
+
+
+def iter_detail(viewing):
+    yield Report.html_header(viewing.site_name, viewing.viewing_date_evening, viewing.plot_src,
+                             viewing.half_dark_hours)
+    last_hour = None
+    for obj, hour, offset, alt, az, sector in viewing.visibility.rows(viewing.viewing_order):
+        if (hour, offset) != last_hour:  # rows come sorted by hour, the date and hour are worked out once per hour
+            last_hour = (hour, offset)
+            local = TimeGrid.hour_datetime(hour)
+            obs_date = local.strftime('%Y-%m-%d')
+            utc_hour = (hour * 60 - offset) // 60 % 24
+            yield "<tr><td><a href=\"#top\">Top</td><td colspan=7><a id=\"{0}\">Viewing hour starting at" \
+                  " {0}</a> </td></tr>".format(local.hour)
+            yield Report.header_row()
+        yield table_row(obj, viewing.viewing_summary_dictionary[obj], obs_date, local.hour, int(alt),
+                        Results.display_az(az), sector, utc_hour)
+    yield Report.html_footer()
+
+
+def iter_summary(viewing, objects):
+    # note 'true' means the summary flavour of the header
+    yield Report.html_header(viewing.site_name, viewing.viewing_date_evening, viewing.plot_src,
+                             viewing.half_dark_hours, 'true', viewing.summary_page_information)
+    for obj in objects:
+        details = viewing.viewing_summary_dictionary[obj]
+        if 'rise_hours' not in details:
+            continue
+        yield summary_row(obj, details)
+    yield from iter_plan(viewing)
+    yield Report.html_footer()
+
+
+def write_stream(chunks, target):
+    # target is a file name or anything with write(); ends with a newline like the print() it replaces
+    if hasattr(target, 'write'):
+        for chunk in chunks:
+            target.write(chunk)
+        target.write('\n')
+        return target
+    with open(target, 'w') as f:
+        write_stream(chunks, f)
+    return target
@@ -0,0 +1,156 @@
+# Site package
+# Looks up where a site is (address -> lat/long) and how high it is (lat/long -> elevation) without asking the
+# remote services more than once.  Answers are kept in a small SQLite file with a time to live, coordinates
+# already saved in user_data_folder/*.json are trusted as they are, and in offline mode the network is never
+# touched at all; a lookup that is not cached just comes back empty.  The time zone of a site is worked out
+# offline (see TimeZone) and kept in the same file.
+
+import contextlib
+import glob
+import json
+import os
+import re
+import sqlite3
+import time
+
+from Trace import Trace
+
+ELEVATION_URL = 'https://api.open-elevation.com/api/v1/lookup?locations={0},{1}'
+
+
+def normalize_address(address):
+    # 'Ward Pound Ridge Reservation,  Pound Ridge , NY' -> 'ward pound ridge reservation, pound ridge, ny'
+    parts = [' '.join(re.sub(r'[^\w\s-]', ' ', part).split()) for part in address.lower().split(',')]
+    return ', '.join(part for part in parts if part)
+
+
+def get_elevation_in_feet(lat, long, timeout=10):
+    import requests
+    r = requests.get(ELEVATION_URL.format(lat, long), timeout=timeout).json()
+    elevation_meters = r['results'][0]['elevation']
+    return round(elevation_meters * 3.28084)
+
+
+class SiteLookup:
+    db_file_name = 'site_cache.sqlite'
+    geocode_ttl = 90 * 24 * 3600  # seconds
+    elevation_ttl = 365 * 24 * 3600
+    user_agent = 'viewing_tonight'
+    timeout = 10
+
+    def __init__(self, db_file_name=None, offline=False):
+        self.db_file_name = db_file_name or self.db_file_name
+        self.offline = offline
+        self.geolocator = None
+        with self._connect() as db:
+            db.execute('CREATE TABLE IF NOT EXISTS geocode (address TEXT PRIMARY KEY, lat REAL, lon REAL, '
+                       'fetched REAL, source TEXT)')
+            db.execute('CREATE TABLE IF NOT EXISTS elevation (lat REAL, lon REAL, feet REAL, fetched REAL, '
+                       'PRIMARY KEY (lat, lon))')
+            db.execute('CREATE TABLE IF NOT EXISTS timezone (lat REAL, lon REAL, zone TEXT, source TEXT, '
+                       'version TEXT, PRIMARY KEY (lat, lon))')
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # a connection per call keeps this safe to share between threads and processes
+        db = sqlite3.connect(self.db_file_name, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def _fresh(self, fetched, ttl, source='remote'):
+        return source == 'user' or time.time() - fetched < ttl
+
+    def remember_coordinates(self, address, lat, lon, source='user'):
+        with self._connect() as db:
+            db.execute('INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?, ?)',
+                       (normalize_address(address), lat, lon, time.time(), source))
+
+    def load_user_data_folder(self, folder_path='user_data_folder'):
+        # trust the coordinates saved with each location file
+        for file_name in glob.glob(os.path.join(folder_path, '*.json')):
+            try:
+                with open(file_name, 'r') as json_file:
+                    data = json.load(json_file)
+            except (OSError, ValueError):
+                continue
+            if data.get('latitude') is not None and data.get('longitude') is not None:
+                full_address = f"{data.get('address', '')}, {data.get('city', '')}, {data.get('state', '')}"
+                self.remember_coordinates(full_address, data['latitude'], data['longitude'])
+                if data.get('timezone'):
+                    self.remember_timezone(data['latitude'], data['longitude'], data['timezone'])
+
+    def get_coordinates(self, address):
+        with Trace.span('geocode') as span:
+            return self._get_coordinates(address, span)
+
+    def _get_coordinates(self, address, span):
+        key = normalize_address(address)
+        with self._connect() as db:
+            row = db.execute('SELECT lat, lon, fetched, source FROM geocode WHERE address = ?', (key,)).fetchone()
+        if row and (self.offline or self._fresh(row[2], self.geocode_ttl, row[3])):
+            span.label(source='cache')
+            return row[0], row[1]
+        if self.offline:
+            span.label(source='offline')
+            return None, None
+        span.label(source='remote')
+        if self.geolocator is None:
+            from geopy.geocoders import Nominatim
+            self.geolocator = Nominatim(user_agent=self.user_agent, timeout=self.timeout)
+        location = self.geolocator.geocode(address)
+        if not location:
+            return (row[0], row[1]) if row else (None, None)
+        self.remember_coordinates(address, location.latitude, location.longitude, source='remote')
+        return location.latitude, location.longitude
+
+    def remember_timezone(self, lat, long, zone, source='user'):
+        with self._connect() as db:
+            db.execute('INSERT OR REPLACE INTO timezone VALUES (?, ?, ?, ?, ?)',
+                       (round(float(lat), 4), round(float(long), 4), zone, source, ''))
+
+    def get_timezone(self, lat, long):
+        # IANA zone name of a site: one the user gave, else from the zone map (see TimeZone), remembered until the
+        # map is recompiled.  Never needs the network
+        from Site import TimeZone
+        key = (round(float(lat), 4), round(float(long), 4))
+        with Trace.span('timezone') as span:
+            with self._connect() as db:
+                row = db.execute('SELECT zone, source, version FROM timezone WHERE lat = ? AND lon = ?',
+                                 key).fetchone()
+            if row and (row[1] == 'user' or row[2] == TimeZone.version()):
+                span.label(source='cache')
+                return row[0]
+            span.label(source='map')
+            zone = TimeZone.zone_for(lat, long)
+            with self._connect() as db:
+                db.execute('INSERT OR REPLACE INTO timezone VALUES (?, ?, ?, ?, ?)',
+                           key + (zone, 'map', TimeZone.version()))
+            return zone
+
+    def get_elevation_in_feet(self, lat, long):
+        # None when it is not cached and can not be fetched
+        with Trace.span('elevation') as span:
+            return self._get_elevation_in_feet(lat, long, span)
+
+    def _get_elevation_in_feet(self, lat, long, span):
+        key = (round(float(lat), 4), round(float(long), 4))
+        with self._connect() as db:
+            row = db.execute('SELECT feet, fetched FROM elevation WHERE lat = ? AND lon = ?', key).fetchone()
+        if row and (self.offline or self._fresh(row[1], self.elevation_ttl)):
+            span.label(source='cache')
+            return row[0]
+        if self.offline:
+            span.label(source='offline')
+            return None
+        span.label(source='remote')
+        try:
+            feet = get_elevation_in_feet(lat, long, timeout=self.timeout)
+        except Exception as e:
+            print(f"Elevation lookup failed for {lat}, {long}: {e}")
+            return row[0] if row else None
+        with self._connect() as db:
+            db.execute('INSERT OR REPLACE INTO elevation VALUES (?, ?, ?, ?)', key + (feet, time.time()))
+        return feet
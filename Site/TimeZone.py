@@ -0,0 +1,327 @@
+# TimeZone part of the Site package
+# Which IANA time zone a site is in, worked out offline, and the UTC offsets of whole arrays of times in it.
+#
+# The zone comes from Site/timezones.npz, a raster of the zone boundaries at resolution degrees (about 5 km),
+# stored as runs of equal zone along each row so it loads in milliseconds.  The one checked in is compiled from
+# the timezone-boundary-builder polygons (https://github.com/evansiroky/timezone-boundary-builder, data (c)
+# OpenStreetMap contributors, ODbL), sampled through the timezonefinder package with --timezonefinder, or it can
+# be compiled from the GeoJSON release itself with --geojson.  The tz database's zone1970.tab cities are kept as
+# well and only used when there is no raster: a site then takes the zone of its nearest city, or out past
+# max_distance_km the nautical Etc/GMT zone of its longitude.  A site within a cell of a border whose zone keeps a
+# different time (see border_zones) is flagged by Viewing, as the raster can not settle which side it is on; a
+# location file or batch job can name its zone outright, and SiteLookup remembers the zone of each site.
+#
+# Offsets come from zoneinfo.  Every offset in use is a whole number of quarter hours and changes on a quarter
+# hour of UTC, so an array of times costs one zoneinfo call per quarter hour it covers however many times there
+# are, and a DST change in the middle of the night lands on the right sample.
+#
+# python -m Site.TimeZone --zone-tab /usr/share/zoneinfo/zone1970.tab --timezonefinder --resolution 0.05
+# python -m Site.TimeZone --zone-tab /usr/share/zoneinfo/zone1970.tab --geojson combined.json
+# python -m Site.TimeZone 41.26 -73.60
+
+import argparse
+import datetime
+import functools
+import hashlib
+import os
+import re
+import threading
+
+import numpy as np
+
+folder = os.path.dirname(os.path.abspath(__file__))
+file_name = 'timezones.npz'
+max_distance_km = 1500.0
+EARTH_RADIUS_KM = 6371.0
+QUARTER_HOUR_MS = 900000
+UNIX_EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def path():
+    return os.path.join(folder, file_name)
+
+
+def nautical_zone(long):
+    # the Etc zone of a longitude, the sign is the POSIX one: Etc/GMT+5 is five hours behind UTC
+    hours = int(np.clip(np.round(long / 15.0), -12, 12))
+    return 'Etc/GMT' if hours == 0 else f'Etc/GMT{-hours:+d}'
+
+
+class ZoneMap:
+    def __init__(self, arrays, version=''):
+        # arrays is an open npz file (or a dict of the same arrays): zone names, the city of each zone, and
+        # optionally the raster of zone numbers (-1 for none) as runs, see raster_arrays
+        self.version = version
+        self.zones = np.asarray(arrays['zones']).astype(str)
+        self.lat = np.radians(np.asarray(arrays['lat'], dtype=np.float64))
+        self.long = np.radians(np.asarray(arrays['long'], dtype=np.float64))
+        self.city_zone = np.asarray(arrays['city_zone'])
+        self.has_raster = 'run_zone' in arrays
+        if self.has_raster:
+            self.resolution = float(arrays['resolution'])
+            self.row_start = np.asarray(arrays['row_start'])
+            self.run_col = np.asarray(arrays['run_col'])
+            self.run_zone = np.asarray(arrays['run_zone'])
+            self.rows, self.cols = len(self.row_start) - 1, int(round(360.0 / self.resolution))
+
+    @classmethod
+    def load(cls, file=None):
+        file = file or path()
+        with open(file, 'rb') as npz_file:
+            version = hashlib.sha1(npz_file.read()).hexdigest()[:12]
+        return cls(np.load(file), version)
+
+    def nearest_city(self, lat, long):
+        # (zone number, distance in km) of the closest zone city
+        lat, long = np.radians(lat), np.radians(long)
+        h = (np.sin((self.lat - lat) / 2) ** 2
+             + np.cos(lat) * np.cos(self.lat) * np.sin((self.long - long) / 2) ** 2)
+        distance = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+        i = int(np.argmin(distance))
+        return int(self.city_zone[i]), float(distance[i])
+
+    def cell(self, row, col):
+        # zone number of one raster cell, -1 for none
+        row = min(max(row, 0), self.rows - 1)
+        col %= self.cols
+        start, stop = self.row_start[row], self.row_start[row + 1]
+        run = start + int(np.searchsorted(self.run_col[start:stop], col, side='right')) - 1
+        return int(self.run_zone[run])
+
+    def cell_of(self, lat, long):
+        return int((90.0 - lat) / self.resolution), int((long + 180.0) / self.resolution)
+
+    def zone(self, lat, long):
+        if self.has_raster:
+            code = self.cell(*self.cell_of(lat, long))
+            return str(self.zones[code]) if code >= 0 else nautical_zone(long)
+        code, distance = self.nearest_city(lat, long)
+        return str(self.zones[code]) if distance <= max_distance_km else nautical_zone(long)
+
+    def neighbours(self, lat, long):
+        # the zones of the cells around the site's, the site's own included; only its zone without a raster
+        if not self.has_raster:
+            return {self.zone(lat, long)}
+        row, col = self.cell_of(lat, long)
+        codes = {self.cell(row + i, col + j) for i in (-1, 0, 1) for j in (-1, 0, 1)}
+        return {str(self.zones[code]) if code >= 0 else nautical_zone(long) for code in codes}
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def shared():
+    # the process wide ZoneMap, None when timezones.npz has not been compiled
+    global _shared
+    with _shared_lock:
+        if _shared is None and os.path.exists(path()):
+            _shared = ZoneMap.load()
+        return _shared
+
+
+def version():
+    zone_map = shared()
+    return zone_map.version if zone_map is not None else 'nautical'
+
+
+def zone_for(lat, long):
+    zone_map = shared()
+    return zone_map.zone(lat, long) if zone_map is not None else nautical_zone(long)
+
+
+def border_zones(lat, long, zone, date):
+    # zones of the map cells next to the site that keep a different time from zone at midnight starting date,
+    # empty unless the site is within a cell (about resolution degrees) of such a border
+    zone_map = shared()
+    if zone_map is None:
+        return []
+    midnight_offset = local_midnight_offset(zone, date)
+    return sorted(other for other in zone_map.neighbours(lat, long)
+                  if other != zone and local_midnight_offset(other, date) != midnight_offset)
+
+
+@functools.lru_cache(maxsize=None)
+def tzinfo(zone):
+    # zoneinfo needs the tz database, on Windows that is the tzdata package; the nautical zones work without it
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+    try:
+        return ZoneInfo(zone)
+    except ZoneInfoNotFoundError:
+        nautical = re.fullmatch(r'Etc/GMT([+-]\d+)?', zone)
+        if nautical is None:
+            raise
+        return datetime.timezone(datetime.timedelta(hours=-int(nautical.group(1) or 0)), zone)
+
+
+def checked_zone(zone, long):
+    # zone when this machine has it, otherwise the nautical zone of the longitude
+    from zoneinfo import ZoneInfoNotFoundError
+    try:
+        tzinfo(zone)
+        return zone
+    except (ZoneInfoNotFoundError, ValueError) as e:
+        print(f"Time zone {zone} is not available ({e}), using {nautical_zone(long)}; pip install tzdata")
+        return nautical_zone(long)
+
+
+def offset_minutes(zone, when):
+    # UTC offset in minutes of an aware datetime (UTC or otherwise) in zone
+    return int(when.astimezone(tzinfo(zone)).utcoffset().total_seconds() // 60)
+
+
+def local_midnight_offset(zone, date):
+    # UTC offset in minutes at local midnight starting date (a datetime.date or YYYY-MM-DD)
+    if isinstance(date, str):
+        date = datetime.date.fromisoformat(date)
+    midnight = datetime.datetime.combine(date, datetime.time(0), tzinfo=tzinfo(zone))
+    return int(midnight.utcoffset().total_seconds() // 60)
+
+
+def offsets(zone, unix_ms):
+    # UTC offset in minutes at each time (milliseconds since 1970-01-01 UTC, any shape), one zoneinfo call per
+    # quarter hour of UTC the times cover
+    unix_ms = np.asarray(unix_ms, dtype=np.int64)
+    quarters, inverse = np.unique(unix_ms // QUARTER_HOUR_MS, return_inverse=True)
+    table = np.array([offset_minutes(zone, UNIX_EPOCH + datetime.timedelta(milliseconds=int(q) * QUARTER_HOUR_MS))
+                      for q in quarters.tolist()], dtype=np.int32)
+    return table[inverse].reshape(unix_ms.shape)
+
+
+def parse_iso6709(text):
+    # '+404251-0740023' or '+4043-07400' -> (40.7142, -74.0064) degrees
+    lat, long = re.fullmatch(r'([+-]\d+)([+-]\d+)', text).groups()
+
+    def _degrees(value, degree_digits):
+        sign = -1.0 if value[0] == '-' else 1.0
+        digits = value[1:]
+        parts = [digits[:degree_digits]] + [digits[i:i + 2] for i in range(degree_digits, len(digits), 2)]
+        return sign * sum(int(part) / 60.0 ** k for k, part in enumerate(parts))
+    return _degrees(lat, 2), _degrees(long, 3)
+
+
+def zone_tab_arrays(zone_tab):
+    # the principal city of every zone in zone1970.tab (or zone.tab)
+    zones, lat, long = [], [], []
+    with open(zone_tab, 'r', encoding='utf-8') as tab_file:
+        for line in tab_file:
+            if line.startswith('#') or not line.strip():
+                continue
+            fields = line.rstrip('\n').split('\t')
+            city_lat, city_long = parse_iso6709(fields[1])
+            zones.append(fields[2])
+            lat.append(city_lat)
+            long.append(city_long)
+    table = sorted(set(zones))
+    return {'zones': np.asarray(table), 'lat': np.asarray(lat), 'long': np.asarray(long),
+            'city_zone': np.asarray([table.index(zone) for zone in zones], dtype=np.int16)}
+
+
+def raster_arrays(grid, zones, resolution, arrays):
+    # adds a (rows, cols) raster of indexes into zones to the city arrays, as runs of equal zone along each row:
+    # run k starts at column run_col[k] with zone run_zone[k], the runs of row r are row_start[r]:row_start[r + 1]
+    starts = np.ones(grid.shape, dtype=bool)
+    starts[:, 1:] = grid[:, 1:] != grid[:, :-1]
+    run_rows, run_col = np.nonzero(starts)
+    row_start = np.searchsorted(run_rows, np.arange(grid.shape[0] + 1))
+    remap = np.asarray([zones.index(zone) for zone in arrays['zones'].tolist()], dtype=np.int16)
+    return {**arrays, 'zones': np.asarray(zones), 'city_zone': remap[arrays['city_zone']],
+            'resolution': np.asarray(resolution), 'row_start': row_start.astype(np.int32),
+            'run_col': run_col.astype(np.int16), 'run_zone': grid[run_rows, run_col].astype(np.int16)}
+
+
+def cell_centres(resolution):
+    # (lat, long) of the centre of every raster row and column
+    rows, cols = int(round(180.0 / resolution)), int(round(360.0 / resolution))
+    return 90.0 - (np.arange(rows) + 0.5) * resolution, -180.0 + (np.arange(cols) + 0.5) * resolution
+
+
+def finder_arrays(resolution, arrays):
+    # adds the raster sampled from the timezonefinder package (timezone-boundary-builder's polygons, oceans
+    # included) at every cell centre; only needed to compile, and takes a few minutes at 0.05 degrees
+    from timezonefinder import TimezoneFinder
+    finder = TimezoneFinder()
+    lats, longs = cell_centres(resolution)
+    zones = sorted(arrays['zones'].tolist())
+    codes = {zone: i for i, zone in enumerate(zones)}
+    grid = np.full((len(lats), len(longs)), -1, dtype=np.int16)
+    for row, lat in enumerate(lats.tolist()):
+        for col, long in enumerate(longs.tolist()):
+            zone = finder.timezone_at(lng=long, lat=lat)
+            if zone is not None:
+                if zone not in codes:
+                    codes[zone] = len(zones)
+                    zones.append(zone)
+                grid[row, col] = codes[zone]
+    order = np.argsort(zones)
+    rank = np.empty(len(zones), dtype=np.int16)
+    rank[order] = np.arange(len(zones))
+    return raster_arrays(np.where(grid >= 0, rank[grid], -1).astype(np.int16), sorted(zones), resolution, arrays)
+
+
+def geojson_arrays(geojson, resolution, arrays):
+    # adds a raster of the zone polygons (timezone-boundary-builder's combined.json) to arrays, cells whose centre
+    # is in no polygon are -1
+    import json
+    from matplotlib.path import Path
+    with open(geojson, 'r', encoding='utf-8') as json_file:
+        features = json.load(json_file)['features']
+    zones = sorted(set(arrays['zones'].tolist()) | {feature['properties']['tzid'] for feature in features})
+    rows, cols = int(round(180.0 / resolution)), int(round(360.0 / resolution))
+    grid = np.full((rows, cols), -1, dtype=np.int16)
+    for feature in features:
+        code = zones.index(feature['properties']['tzid'])
+        geometry = feature['geometry']
+        polygons = geometry['coordinates'] if geometry['type'] == 'MultiPolygon' else [geometry['coordinates']]
+        for outer, *holes in polygons:
+            outer = np.asarray(outer)
+            col0 = max(int((outer[:, 0].min() + 180.0) / resolution), 0)
+            col1 = min(int((outer[:, 0].max() + 180.0) / resolution) + 1, cols)
+            row0 = max(int((90.0 - outer[:, 1].max()) / resolution), 0)
+            row1 = min(int((90.0 - outer[:, 1].min()) / resolution) + 1, rows)
+            long, lat = np.meshgrid(-180.0 + (np.arange(col0, col1) + 0.5) * resolution,
+                                    90.0 - (np.arange(row0, row1) + 0.5) * resolution)
+            centres = np.column_stack([long.ravel(), lat.ravel()])
+            inside = Path(outer).contains_points(centres)
+            for hole in holes:
+                inside &= ~Path(np.asarray(hole)).contains_points(centres)
+            block = grid[row0:row1, col0:col1].reshape(-1)
+            block[inside] = code
+            grid[row0:row1, col0:col1] = block.reshape(row1 - row0, col1 - col0)
+    return raster_arrays(grid, zones, resolution, arrays)
+
+
+def save(arrays, file=None):
+    global _shared
+    file = file or path()
+    np.savez_compressed(file, **arrays)
+    with _shared_lock:
+        _shared = None  # reopened from the new file next time
+    return file
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compile the time zone map, or look up the zone of a site.')
+    parser.add_argument('coordinates', type=float, nargs='*', help='latitude longitude to look up')
+    parser.add_argument('--zone-tab', help='zone1970.tab from the tz database')
+    parser.add_argument('--geojson', help="timezone-boundary-builder's combined.json, for exact borders")
+    parser.add_argument('--timezonefinder', action='store_true',
+                        help='the borders from the timezonefinder package instead of a GeoJSON file')
+    parser.add_argument('--resolution', type=float, default=0.05, help='raster cell size in degrees')
+    args = parser.parse_args(argv)
+
+    if args.zone_tab or args.geojson or args.timezonefinder:
+        arrays = zone_tab_arrays(args.zone_tab) if args.zone_tab else dict(np.load(path()))
+        if args.geojson:
+            arrays = geojson_arrays(args.geojson, args.resolution, arrays)
+        elif args.timezonefinder:
+            arrays = finder_arrays(args.resolution, arrays)
+        print(f"{len(arrays['zones'])} zones written to {save(arrays)}")
+    if len(args.coordinates) == 2:
+        zone = zone_for(*args.coordinates)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        print(f"{zone} UTC{offset_minutes(zone, now) / 60:+g} now")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+# Trace package
+# Nested spans over the stages of a report (geocode, elevation, construction, plot, ephemeris, catalog
+# transforms, html, pdf, mail) so a production run shows where its time goes.  A span is a with block; spans
+# opened inside it are its children, per thread.  Each can carry labels given when it is opened and counts added
+# while it runs (objects, rows, bytes ...), which add up in the summary.
+#
+# Tracing is off unless enable() is called or VIEWING_TRACE is set in the environment, and can be switched at any
+# time.  A span always measures its own elapsed time, so a caller can print it either way, but only records it
+# while tracing is on.  What was recorded can be written as a Chrome trace (chrome://tracing or
+# https://ui.perfetto.dev), as plain json, or summarised per stage as a table.  Standard library only, so every
+# package can use it without changing what it imports.
+
+import contextlib
+import json
+import os
+import threading
+import time
+
+_enabled = os.environ.get('VIEWING_TRACE', '') not in ('', '0')
+_records = []
+_records_lock = threading.Lock()
+_local = threading.local()
+_wall_offset = time.time() - time.perf_counter()  # span starts are wall clock, so processes line up
+
+
+def enable(flag=True):
+    global _enabled
+    _enabled = bool(flag)
+
+
+def disable():
+    enable(False)
+
+
+def enabled():
+    return _enabled
+
+
+def reset():
+    # drops everything recorded so far and returns it
+    with _records_lock:
+        recorded = list(_records)
+        _records.clear()
+    return recorded
+
+
+def records():
+    with _records_lock:
+        return list(_records)
+
+
+class Span:
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+        self.counts = {}
+        self.start = None
+        self.elapsed = 0.0
+        self.parent = None
+        self.depth = 0
+
+    def add(self, **counts):
+        # numbers to add to this span, e.g. span.add(objects=110, bytes=len(html))
+        for key, value in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + value
+
+    def label(self, **labels):
+        self.labels.update(labels)
+
+    def record(self):
+        return {'name': self.name, 'parent': self.parent, 'depth': self.depth, 'start': self.start + _wall_offset,
+                'elapsed': self.elapsed, 'pid': os.getpid(), 'tid': threading.get_ident(),
+                'labels': dict(self.labels), 'counts': dict(self.counts)}
+
+
+@contextlib.contextmanager
+def span(name, **labels):
+    # with span('plot', fmt='png') as s: ... s.add(bytes=len(image))
+    current = Span(name, labels)
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    if stack:
+        current.parent = stack[-1].name
+        current.depth = len(stack)
+    stack.append(current)
+    current.start = time.perf_counter()
+    try:
+        yield current
+    finally:
+        current.elapsed = time.perf_counter() - current.start
+        stack.pop()
+        if _enabled:
+            with _records_lock:
+                _records.append(current.record())
+
+
+def add(**counts):
+    # counts for the innermost open span of this thread, nothing when there is none
+    stack = getattr(_local, 'stack', None)
+    if stack:
+        stack[-1].add(**counts)
+
+
+def chrome_trace(recorded=None):
+    # the Trace Event Format, complete ('X') events in microseconds
+    recorded = records() if recorded is None else recorded
+    origin = min((r['start'] for r in recorded), default=0.0)
+    events = [{'name': r['name'], 'cat': 'report', 'ph': 'X', 'ts': round((r['start'] - origin) * 1e6, 1),
+               'dur': round(r['elapsed'] * 1e6, 1), 'pid': r['pid'], 'tid': r['tid'],
+               'args': {**r['labels'], **r['counts']}} for r in recorded]
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def write_chrome_trace(file_name, recorded=None):
+    with open(file_name, 'w') as trace_file:
+        json.dump(chrome_trace(recorded), trace_file)
+
+
+def write_json(file_name, recorded=None):
+    with open(file_name, 'w') as json_file:
+        json.dump({'records': records() if recorded is None else recorded, 'summary': summary(recorded)},
+                  json_file, indent=2, default=str)
+
+
+def summary(recorded=None):
+    # per stage name: calls, total, self (total less the time spent in child spans), mean and max seconds, and the
+    # counts added up; in the order the stages first finished
+    recorded = records() if recorded is None else recorded
+    stages = {}
+    for r in recorded:
+        stage = stages.setdefault(r['name'], {'calls': 0, 'total': 0.0, 'self': 0.0, 'max': 0.0, 'counts': {}})
+        stage['calls'] += 1
+        stage['total'] += r['elapsed']
+        stage['self'] += r['elapsed']
+        stage['max'] = max(stage['max'], r['elapsed'])
+        for key, value in r['counts'].items():
+            stage['counts'][key] = stage['counts'].get(key, 0) + value
+    for r in recorded:
+        if r['parent'] in stages:
+            stages[r['parent']]['self'] -= r['elapsed']
+    for stage in stages.values():
+        stage['mean'] = stage['total'] / stage['calls']
+    return stages
+
+
+def summary_table(recorded=None):
+    lines = [f"{'stage':28s} {'calls':>6s} {'total s':>9s} {'self s':>9s} {'mean ms':>9s} {'max ms':>9s}  counts"]
+    for name, stage in summary(recorded).items():
+        counts = ', '.join(f'{key} {value:g}' for key, value in stage['counts'].items())
+        lines.append(f"{name:28s} {stage['calls']:6d} {stage['total']:9.3f} {stage['self']:9.3f} "
+                     f"{stage['mean'] * 1000:9.1f} {stage['max'] * 1000:9.1f}  {counts}")
+    return '\n'.join(lines)
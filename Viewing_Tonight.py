@@ -16,104 +16,22 @@
 # print out html and email to email address
 # add image of sun and moon to show when they will impact
 
+# The window only imports what it needs to come up.  The report code (astropy, matplotlib, Playwright) is
+# imported by the report thread the first time Generate Report is pressed, see _generate.
+
 import json
 import os.path
 import sys
-import astropy
-import astropy.units as u
-import numpy as np
-from astropy.time import Time
-from astropy.coordinates import SkyCoord, EarthLocation, AltAz, solar_system, get_body
-import smtplib
-import ssl
-from email.mime.text import MIMEText
-from email.mime.image import MIMEImage
-from email.mime.multipart import MIMEMultipart
 import datetime
-from astropy.visualization import astropy_mpl_style, quantity_support
-import matplotlib.pyplot as plt
-from astropy.coordinates import get_sun
-from astropy.coordinates import get_body
-from astral import moon
-from Messier import Messier
-from collections import defaultdict
-import time
+import queue
+from concurrent.futures import ThreadPoolExecutor
+os.environ.setdefault('MPLBACKEND', 'Agg')  # the plot is only saved, and it is drawn off the Tk thread
+from Site import Site
+from Trace import Trace
 import threading
 import multiprocessing
 import tkinter as tk
 from tkinter import filedialog, messagebox
-from geopy.geocoders import Nominatim
-import requests
-import pandas as pd
-
-
-class Mail:  # need to add lots of error checking in the functions here
-    data = {}
-    json_file_name = 'mail.json'
-    mail_exists = True
-    plot_exists = True
-    sender_email_address = ''
-    sender_email_password = ''
-    receiver_email_address = ''
-    port = 465
-    marker = "Sun_Moon_Plot"
-    encodedcontent = ''
-    attachment_part = ''
-
-    def __init__(self, plot_file_name):
-        self.verify_json_exists()
-        self.plot_file_name = plot_file_name
-        if self.mail_exists:
-            self.load_json()
-            self.set_email_password()
-            self.context = ssl.create_default_context()
-
-    def send_email(self, html_msg, plain_msg):
-        # create html message
-        message = MIMEMultipart("related")
-        message["Subject"] = "Astronomy Email"  # add infomation related to site and date
-        message["From"] = self.sender_email_address
-        message["To"] = self.receiver_email_address
-        message.preamble = 'This is a multi-part message in MIME format.'
-        msgAlternative = MIMEMultipart('alternative')
-        message.attach(msgAlternative)
-        part1 = MIMEText(plain_msg, "plain")
-        part2 = MIMEText(html_msg, "html")
-        message.attach(part1)
-        msgAlternative.attach(part2)
-        # Attach Plot if exists
-        if self.plot_exists:
-            msgText = MIMEText(html_msg, 'html')
-            msgAlternative.attach(msgText)
-            fo = open(self.plot_file_name, "rb")
-            msgImage = MIMEImage(fo.read())
-            fo.close()
-            msgImage.add_header('Content-ID', '<{0}>'.format(self.plot_file_name))
-            message.attach(msgImage)
-
-        with smtplib.SMTP_SSL("smtp.gmail.com", self.port, context=self.context) as server:
-            server.login(self.sender_email_address, self.sender_email_password)
-            server.sendmail(self.sender_email_address, self.receiver_email_address, message.as_string())
-            server.quit()
-
-    def set_email_password(self):
-        self.sender_email_address = self.data['sender_email']
-        self.sender_email_password = self.data['sender_password']
-        self.receiver_email_address = self.data['receiver_email']
-
-    def verify_plot_exists(self):
-        if not os.path.isfile(self.plot_file_name):
-            print("Can not load Location file, {0}".format(self.plot_file_name))
-            self.plot_exists = False
-
-    def verify_json_exists(self):
-        if not os.path.isfile(self.json_file_name):
-            print("Can not load Location file, {0}".format(self.json_file_name))
-            self.mail_exists = False
-
-    def load_json(self):
-        with open(self.json_file_name, 'r') as loc_json_file:
-            self.data = json.load(loc_json_file)
 
 
 class Location:
@@ -135,11 +53,11 @@ class Location:
             self.data = json.load(loc_json_file)
 
 class UserDataAppTkinter:
-    def __init__(self, root, location_entry_callback=None, location_name_callback=None):
+    def __init__(self, root, location_entry_callback=None, location_name_callback=None, site_lookup=None):
         self.root = root
         self.root.title("User Information")
         self.folder_path = 'user_data_folder'
-        self.geolocator = Nominatim(user_agent='user_data_app')
+        self.site_lookup = site_lookup or Site.SiteLookup()
         self.user_data = {}
         self.location_entry_callback = location_entry_callback
         self.location_name_callback = location_name_callback
@@ -171,8 +89,7 @@ class UserDataAppTkinter:
             os.makedirs(self.folder_path)
 
     def get_coordinates(self, address):
-        location = self.geolocator.geocode(address)
-        return (location.latitude, location.longitude) if location else (None, None)
+        return self.site_lookup.get_coordinates(address)
 
     def save_location(self):
         filename = filedialog.asksaveasfilename(defaultextension=".json", initialdir=self.folder_path,
@@ -188,6 +105,8 @@ class UserDataAppTkinter:
             lat, lon = self.get_coordinates(full_address)
             self.user_data['latitude'] = lat
             self.user_data['longitude'] = lon
+            if lat is not None and lon is not None:
+                self.site_lookup.remember_coordinates(full_address, lat, lon)
 
             with open(filename, 'w') as json_file:
                 json.dump(self.user_data, json_file, indent=4)
@@ -216,10 +135,15 @@ class UserDataAppTkinter:
                         self.entries[key].insert(0, self.user_data.get(key, ''))
 
                     full_address = f"{self.user_data['address']}, {self.user_data['city']}, {self.user_data['state']}"
-                    lat, lon = self.get_coordinates(full_address)
                     name = self.user_data['name']
-                    self.user_data['latitude'] = lat
-                    self.user_data['longitude'] = lon
+                    # coordinates saved with the location are trusted, only look up older files without them
+                    if self.user_data.get('latitude') is not None and self.user_data.get('longitude') is not None:
+                        self.site_lookup.remember_coordinates(full_address, self.user_data['latitude'],
+                                                              self.user_data['longitude'])
+                    else:
+                        lat, lon = self.get_coordinates(full_address)
+                        self.user_data['latitude'] = lat
+                        self.user_data['longitude'] = lon
 
 
                     # Update the main app's location entry if callback is provided
@@ -233,546 +157,13 @@ class UserDataAppTkinter:
                 messagebox.showerror("Error", f"Failed to read the file:\n{e}")        
 
 
-class Targets:
-    data = {}
-    json_file_name = 'viewing_targets.json'
+class Cancelled(Exception):
+    pass
 
-    def __init__(self):
-        self.load_json()
-
-    def verify_json_exists(self):
-        if not os.path.isfile(self.json_file_name):
-            print("Can not load Targets file, {0}".format(self.json_file_name))
-            sys.exit("Program is existing")
-
-    def load_json(self):
-        with open(self.json_file_name, 'r') as loc_json_file:
-            self.data = json.load(loc_json_file)
-
-
-class Timing:
-    start_time = time.time()
-    end_time = time.time()
-    elapsed_time = ''
-
-    def __init__(self, label):
-        self.start_time = time.time()
-        self.label = label
-
-    def end_now(self):
-        self.end_time = time.time()
-        self.elapsed_time = self.end_time - self.start_time
-
-    def print_delta(self):
-        print(f"{self.label} Elapsed time: {self.elapsed_time:.2f} seconds")
-
-
-class Viewing:
-    messier_max = 110
-    planet_list = ['mercury', 'venus', 'mars', 'jupiter', 'saturn', 'uranus', 'neptune']
-    viewing_arr = []
-
-    def __init__(self, location_lat, location_long, location_name, viewing_date,
-                 min_alt_n=20, min_alt_e=20, min_alt_s=20, min_alt_w=20):
-        self.lat = location_lat
-        self.long = location_long
-        self.date = self.fix_date(viewing_date)
-        self.file_date = viewing_date
-        self.moon_phase_pct = get_lunar_phase(self.date)
-        self.viewing_date_evening = str(datetime.date(int(viewing_date[0:4]), int(viewing_date[5:7]), int(viewing_date[8:10])))
-        self.site_name = location_name
-        self.site_file_name = self.site_name.replace(' ', '-')
-        self.min_alt_n = min_alt_n
-        self.min_alt_e = min_alt_e
-        self.min_alt_s = min_alt_s
-        self.min_alt_w = min_alt_w
-        self.height = get_elevation_in_feet(location_lat, location_long)
-        self.viewing_location = EarthLocation(lat=self.lat * u.deg, lon=self.long * u.deg, height=self.height * u.imperial.foot)
-        self.utcoffset_int = -4  # need to make this loadable from the viewing location
-        self.utcoffset = self.utcoffset_int * u.hour  # Eastern Daylight Time
-        self.viewing_date_midnight_time = self.date + ' 00:00:00'
-        self.midnight = Time(self.viewing_date_midnight_time) - self.utcoffset
-        self.delta_midnight = np.linspace(-6, 6, 500) * u.hour  # this is the default value that is tuned later
-        self.sun_moon_delta_midnight = np.linspace(-12, 12, 1000) * u.hour
-        self.viewing_times = self.midnight + self.delta_midnight
-        self.sun_moon_viewing_times = self.midnight + self.sun_moon_delta_midnight
-        self.viewing_frame = AltAz(obstime=self.viewing_times, location=self.viewing_location)
-        self.sun_moon_viewing_frame = AltAz(obstime=self.sun_moon_viewing_times, location=self.viewing_location)
-        self.html = ''
-        self.html_summary = ''
-        self.plot_file_name = 'sun_moon_plot' + self.date + self.site_file_name + '.png'
-        self.viewing_index = {}  # mon*10000+day*100+hour, dictionary index
-        self.viewing_dictionary = {}  # key dictionary index, value html table line
-        self.viewing_summary_dictionary = {}  # key dictionary index, value html table line
-        self.v_i_ctr = 0
-        self.dusk = ''
-        self.sunset = ''
-        self.sunrise = ''
-        self.dawn = ''
-        self.half_dark_hours = 0
-        self.viewing_summary_dictionary = defaultdict(dict)  # calculate general info for summary view
-        self.summary_page_information = self.set_summary_page_information()
-        self.summary_filename = self.file_date + '_' + self.site_name.replace(' ', '_') + '_' +\
-                                'astronomy_report_summary.html'
-        self.summary_pdf_filename = 'astronomy_report_summary' + self.file_date + self.site_file_name + '.pdf'
-        self.my_messier = Messier.MessierData()
-        self._cache_time_arrays()
-
-    def set_summary_page_information(self):
-        pageinfo = """<h2> What is this page for?</h2>
-        The information on this page is intended to help you plan your observing session for the date
-         shown at the top of this page by providing a list of objects which will be visible in the sky over the course
-        of the evening.  The information provided here is applicable to the location shown at the very top of this page.
-        <br>
-        <h3>How to read the chart to the left </h3>
-        <ul>
-        <li>The time axis at the bottom of the chart presents midnight as 0. </li>
-        <li>The red line indicates the sun's altitude over the course of the charted period.  Sunset (left) and sunrise
-        (right) occur at the two points where the red line touches the bottom of the chart.</li>
-        <li>The grey shaded areas on the chart indicate twilight periods.  These are the periods when the sun continues
-         to illuminate sky after sunset or begins illuminating the sky before sunrise.</li>
-        <li>The grey dashed line indicates the moon's altitude over the course of the charted period.  The current
-        amount of lunar illumination is displayed as a percentage above the chart, with 0% indicating new moon, and
-        100% indicating a full moon. </li>
-        <li>Ideal conditions for observing deep sky objects will most commonly take place during the period indicated
-        by the black portion of the chart and with as little moon as possible.</li>
-        </ul>
-        <h2>What is the table below for?</h2>
-        The table below displays a list of planets and Messier objects which will be above the horizon between sunset
-        and sunrise.
-        <h3>Below Table Column Explanation</h3>
-        <ul>
-        <li><b>Rise Hour</b> indicates the earliest time at which the object may be observed.  The earliest time indicated by
-         the Rise Hour column will be sunset; this is because you (typically) won't be able to see the object earlier
-         than sundown.  The letter following the hour (N, E, S, or W) indicates the compass quadrant the object is
-         in at that time: N = 0&deg;&ndash;89&deg;, E = 90&deg;&ndash;179&deg;, S = 180&deg;&ndash;269&deg;,
-         W = 270&deg;&ndash;359&deg;.</li>
-        <li><b>Set Hour</b> indicates the latest time at which the object may be observed.  The latest time indicated by
-         the Set Hour column will be sunrise; this is because you (typically) will no longer be able to see the object
-         after sunrise.  As with Rise Hour, the letter following the hour indicates the compass quadrant the object
-         occupies at that time.</li>
-        <li><b>Max Altitude</b> provides the time at which the object will be highest in the sky and how high it will be at
-         that time. </li>
-        <li><b>Finder Chart</b> contains a link to a star map to help you know what stars are near the object. </li>
-        <li><b>Suggested Filter</b> contains information regarding the filter(s) we believe will help reveal the most
-         detail for an object, but this can be rather subjective.  Brighter objects typically do not require a filter.
-         Fainter objects may be observed without a filter in ideal conditions, but the right filter can often bring
-         out additional detail, especially when observing from light-polluted locations.</li>
-         </ul>"""
-
-        return pageinfo
-
-    def sort_data(self):
-        viewing_copy = self.viewing_index
-        self.viewing_arr = sorted((value, key) for (key, value) in viewing_copy.items())
-
-    def set_html(self):
-        last_hour = -1
-        for row in self.viewing_arr:
-            if 0 < (row[0] % 100) + self.utcoffset_int < 25:
-                hour = (row[0] % 100) + self.utcoffset_int
-            elif ((row[0] % 100) + self.utcoffset_int) < 0:
-                hour = (row[0] % 100) + self.utcoffset_int + 24
-            else:
-                hour = (row[0] % 100) + self.utcoffset_int
-            if hour != last_hour:
-                last_hour = hour
-                self.html += "<tr><td><a href=\"#top\">Top</td><td colspan=7><a id=\"{0}\">Viewing hour starting at" \
-                             " {0}</a> </td></tr>".format(hour)
-                self.html += header_row()
-            self.html += self.viewing_dictionary[row[1]]
-        self.html = html_header(self.site_name, self.viewing_date_evening, self.plot_file_name, self.half_dark_hours) \
-                    + self.html + html_footer()
-
-    def adjust_delta_midnight(self):
-        self.get_hours_sunset()
-        if self.half_dark_hours != 0:
-            self.delta_midnight  = np.linspace(-self.half_dark_hours, self.half_dark_hours, 500) * u.hour
-            self.viewing_times   = self.midnight + self.delta_midnight
-            self.viewing_frame   = AltAz(obstime=self.viewing_times, location=self.viewing_location)
-            self._cache_time_arrays()
-
-    def _cache_time_arrays(self):
-        iso = self.viewing_times.iso
-        self._t_hours   = np.array([t[11:13] for t in iso])
-        self._t_minutes = np.array([int(t[14:16]) for t in iso])
-        self._t_dates   = np.array([t[0:10] for t in iso])
-        self._t_days    = np.array([t[8:10] for t in iso])
-        self._t_months  = np.array([t[5:7]  for t in iso])
-
-    def get_hours_sunset(self):
-        midnight = datetime.datetime.strptime(self.viewing_date_midnight_time, '%Y-%m-%d %H:%M:%S')
-        if int(self.dusk[1:2]) < 0:
-            self.dusk = str(24 + int(self.dusk))
-        dusktime = datetime.datetime.strptime(self.date + ' ' + self.dusk + ':00', '%Y-%m-%d %H:%M:%S')
-        diff = midnight - dusktime
-        self.half_dark_hours = round(diff.seconds / 3600)
-
-    def get_sunset(self, sunaltaz):
-        # note hour is utc, not local
-        from dateutil import tz
-        from datetime import datetime
-        from_zone = tz.gettz('UTC')
-        to_zone = tz.gettz('America/New_York')
-        last_alt = 0
-        for altaz in sunaltaz:
-            if altaz.alt.is_within_bounds(0 * u.deg, 1 * u.deg):
-                utc = datetime.strptime(str(altaz.obstime), '%Y-%m-%d %H:%M:%S.%f').replace(tzinfo=from_zone)
-                ny_zone = utc.astimezone(to_zone)
-                time = str(ny_zone)[11:16]
-                date = str(ny_zone)[0:10]
-                if last_alt > altaz.alt:
-                    self.dusk = time
-                    self.date = date
-                else:
-                    self.sunrise = time
-                    self.date = date
-            elif altaz.alt.is_within_bounds(-20 * u.deg, -18 * u.deg):
-                utc = datetime.strptime(str(altaz.obstime), '%Y-%m-%d %H:%M:%S.%f').replace(tzinfo=from_zone)
-                ny_zone = utc.astimezone(to_zone)
-                time = str(ny_zone)[11:16]
-                date = str(ny_zone)[0:10]
-                if last_alt > altaz.alt:
-                    self.sunset = time
-                    self.date = date
-                else:
-                    self.dawn = time
-                    self.date = date
-            last_alt = altaz.alt
-
-    def plot_sun_moon(self):
-        plt.figure()
-        plt.style.use(astropy_mpl_style)
-        quantity_support()
-
-        # Create Sun Moon Plot
-        sunaltazs_viewing_date = get_sun(self.sun_moon_viewing_times).transform_to(self.sun_moon_viewing_frame)
-        moonaltazs = get_body("moon", self.sun_moon_viewing_times).transform_to(self.sun_moon_viewing_frame)
-
-        plt.plot(self.sun_moon_delta_midnight, moonaltazs.alt, '--', color='gray', label='Moon')
-        plt.plot(self.sun_moon_delta_midnight, sunaltazs_viewing_date.alt, color='red', label='Sun')
-        plt.fill_between(self.sun_moon_delta_midnight, 0 * u.deg, 90 * u.deg,
-                         sunaltazs_viewing_date.alt < -0 * u.deg, color='gray', alpha=0.5, zorder=0)
-        plt.fill_between(self.sun_moon_delta_midnight, 0 * u.deg, 90 * u.deg,
-                         sunaltazs_viewing_date.alt < -18 * u.deg, color='black', alpha=0.5, zorder=0)
-        plt.legend(loc='upper left')
-        plt.xlim(-12 * u.hour, 12 * u.hour)
-        plt.xticks((np.arange(13) * 2 - 12) * u.hour)
-        plt.ylim(0 * u.deg, 90 * u.deg)
-        plt.xlabel(f'Hours from Midnight on {self.date}')
-        plt.ylabel('Altitude [deg]')
-        plt.title(f'Sun & Moon Details at {self.site_name} with {self.moon_phase_pct}% Moon')
-        plt.savefig(self.plot_file_name)
-        self.get_sunset(sunaltazs_viewing_date)
-
-    def fix_date(self, date):
-        # This function pushes the date forward 1 day to account for the fact that my calculations should be from
-        # midnight on the date provided
-        yr = int(date[0:4])
-        m = int(date[5:7])
-        d = int(date[8:10])
-        return str(datetime.date(yr, m, d) + datetime.timedelta(1))
-
-    def check_all_messier(self):
-        messier_keys = [f"m{i}" for i in range(1, self.messier_max)]
-        ras  = np.array([self.my_messier.coordinates[k][0] for k in messier_keys])
-        decs = np.array([self.my_messier.coordinates[k][1] for k in messier_keys])
-        # Reshape to (N, 1) so numpy broadcasts against the (500,) frame → result shape (N, 500)
-        sky_coords = SkyCoord(ra=ras.reshape(-1, 1) * u.deg, dec=decs.reshape(-1, 1) * u.deg)
-        all_altazs = sky_coords.transform_to(self.viewing_frame)
-
-        for i, obj in enumerate(messier_keys):
-            self.viewing_summary_dictionary[obj] = {"rise": 999, "set": 0, "max_az": 0}
-            alts = all_altazs[i].alt.deg
-            azs  = all_altazs[i].az.deg
-
-            min_alt = np.where((azs >= 0)   & (azs < 90),  self.min_alt_n,
-                      np.where((azs >= 90)  & (azs < 180), self.min_alt_e,
-                      np.where((azs >= 180) & (azs < 270), self.min_alt_s,
-                                                            self.min_alt_w)))
-            candidate_mask    = (alts >= min_alt) & (alts <= 90) & (self._t_minutes < 5)
-            candidate_indices = np.where(candidate_mask)[0]
-
-            object_type       = self.my_messier.object_type[obj]
-            finder_link       = f'<a href="https://freestarcharts.com/images/Articles/Messier/Single/{obj.upper()}_Finder_Chart.pdf" target="_blank">Finder Chart</a>'
-            suggested_filters = self.my_messier.messier_filters.get(obj, '')
-            difficulty        = self.my_messier.messier_difficulty.get(obj, '')
-            difficulty_html   = f'<span class="dot{"green" if difficulty == "easy" else "orange" if difficulty == "medium" else "red"}"></span>' if difficulty else ''
-
-            if len(candidate_indices) > 0:
-                _, unique_first_pos = np.unique(self._t_hours[candidate_mask], return_index=True)
-                final_indices = candidate_indices[unique_first_pos]
-                summary = self.viewing_summary_dictionary[obj]
-                for idx in final_indices:
-                    d     = int(alts[idx])
-                    zstr  = int(azs[idx]) + 1
-                    ohour = self._t_hours[idx]
-                    odate = self._t_dates[idx]
-                    oday  = self._t_days[idx]
-                    omon  = self._t_months[idx]
-                    obs_date, obs_hour = un_utc(odate, ohour)
-                    tr_bgclr  = "#d5f5e3" if int(ohour) % 2 == 0 else "#d6eaf8"
-                    compass   = return_sector(zstr)
-                    direction = f'{zstr} - {compass}'
-                    table_row = (f'<tr bgcolor="{tr_bgclr}"><td>{obj.upper()}</td><td>{object_type}</td>'
-                                 f'<td>{obs_date}</td><td>{obs_hour}</td><td>{d}&#730;</td>'
-                                 f'<td>{direction}&#730;</td><td>{suggested_filters}</td><td style="white-space:nowrap">{finder_link}</td></tr>\n')
-                    key = int(omon) * 10000 + int(oday) * 100 + int(ohour)
-                    self.viewing_index[self.v_i_ctr]      = key
-                    self.viewing_dictionary[self.v_i_ctr] = table_row
-                    if summary["rise"] == 999:
-                        summary.update({"rise": obs_hour, "rise_dir": compass, "type": object_type, "date": obs_date,
-                                        "filters": suggested_filters, "link": finder_link, "difficulty": difficulty_html})
-                    summary.update({"set": obs_hour, "set_dir": compass})
-                    if d > summary["max_az"]:
-                        summary.update({"max_az": d, "max_az_hr": obs_hour})
-                    self.v_i_ctr += 1
-                self.viewing_summary_dictionary[obj] = summary
-
-    def check_sky_tonight(self, obj):
-        """Single-object processing — used for planets"""
-        # Set summary base values for object
-        self.viewing_summary_dictionary[obj] = {"rise": 999, "set": 0, "max_az": 0}
-
-        # Move on to the calculation
-        check_time = Timing('check time')
-        if obj in self.planet_list:
-            sky_obj = get_body(obj, Time(self.date + ' 00:00:00'))
-        else:
-            ra, dec = self.my_messier.coordinates[obj]
-            sky_obj = SkyCoord(ra=ra * u.deg, dec=dec * u.deg)
-        sky_objaltazs_viewing_date = sky_obj.transform_to(self.viewing_frame)
-
-        alts    = sky_objaltazs_viewing_date.alt.deg
-        azs     = sky_objaltazs_viewing_date.az.deg
-        hours   = self._t_hours
-        minutes = self._t_minutes
-        dates   = self._t_dates
-        days    = self._t_days
-        months  = self._t_months
-
-        min_alt = np.where((azs >= 0)   & (azs < 90),  self.min_alt_n,
-                  np.where((azs >= 90)  & (azs < 180), self.min_alt_e,
-                  np.where((azs >= 180) & (azs < 270), self.min_alt_s,
-                                                        self.min_alt_w)))
-        candidate_mask    = (alts >= min_alt) & (alts <= 90) & (minutes < 5)
-        candidate_indices = np.where(candidate_mask)[0]
-
-        object_type = 'Planet'
-        suggested_filters = ''
-        finder_link = ''
-        difficulty_html = ''
-        if obj not in self.planet_list:
-            object_type = self.my_messier.object_type[obj]
-            finder_link = f'<a href="https://freestarcharts.com/images/Articles/Messier/Single/{obj.upper()}_Finder_Chart.pdf" target="_blank">Finder Chart</a>'
-            suggested_filters = self.my_messier.messier_filters.get(obj, '')
-            difficulty = self.my_messier.messier_difficulty.get(obj, '')
-            difficulty_html = f'<span class="dot{"green" if difficulty == "easy" else "orange" if difficulty == "medium" else "red"}"></span>' if difficulty else ''
-
-        if len(candidate_indices) > 0:
-            _, unique_first_pos = np.unique(hours[candidate_mask], return_index=True)
-            final_indices = candidate_indices[unique_first_pos]
-            summary = self.viewing_summary_dictionary[obj]
-            for idx in final_indices:
-                d     = int(alts[idx])
-                zstr  = int(azs[idx]) + 1
-                ohour, odate, oday, omon = hours[idx], dates[idx], days[idx], months[idx]
-                obs_date, obs_hour = un_utc(odate, ohour)
-                tr_bgclr  = "#d5f5e3" if int(ohour) % 2 == 0 else "#d6eaf8"
-                compass   = return_sector(zstr)
-                direction = f'{zstr} - {compass}'
-                table_row = (f'<tr bgcolor="{tr_bgclr}"><td>{obj.upper()}</td><td>{object_type}</td>'
-                             f'<td>{obs_date}</td><td>{obs_hour}</td><td>{d}&#730;</td>'
-                             f'<td>{direction}&#730;</td><td>{suggested_filters}</td><td style="white-space:nowrap">{finder_link}</td></tr>\n')
-                key = int(omon) * 10000 + int(oday) * 100 + int(ohour)
-                self.viewing_index[self.v_i_ctr]      = key
-                self.viewing_dictionary[self.v_i_ctr] = table_row
-                if summary["rise"] == 999:
-                    summary.update({"rise": obs_hour, "rise_dir": compass, "type": object_type, "date": obs_date,
-                                    "filters": suggested_filters, "link": finder_link, "difficulty": difficulty_html})
-                summary.update({"set": obs_hour, "set_dir": compass})
-                if d > summary["max_az"]:
-                    summary.update({"max_az": d, "max_az_hr": obs_hour})
-                self.v_i_ctr += 1
-            self.viewing_summary_dictionary[obj] = summary
-        check_time.end_now()
-        # check_time.print_delta()
-
-    def write_out_html(self):
-        with open('astronomy_report.html', 'w') as f:
-            print(self.html, file=f)
-
-    def make_summary_html(self, sort_by_rise=False):
-        objects = self.viewing_summary_dictionary.keys()
-        if sort_by_rise:
-            def _rise_key(obj):
-                rise = self.viewing_summary_dictionary[obj]['rise']
-                if rise == 999:
-                    return float('inf')
-                return rise if rise >= 12 else rise + 24
-            objects = sorted(objects, key=_rise_key)
-        for obj in objects:
-            if self.viewing_summary_dictionary[obj]['rise'] == 999 and self.viewing_summary_dictionary[obj]['set'] == 0:
-                continue
-            self.html_summary += '<tr><td>' + obj.capitalize() + '</td><td>' + \
-                                 self.viewing_summary_dictionary[obj]['type'].capitalize() + \
-                                 '</td><td style="text-align:center">' + \
-                                 self.viewing_summary_dictionary[obj]['difficulty'] + '</td><td>' + \
-                                 str(self.viewing_summary_dictionary[obj]['rise']) + ' ' + self.viewing_summary_dictionary[obj].get('rise_dir', '') + '</td><td>' + \
-                                 str(self.viewing_summary_dictionary[obj]['set']) + ' ' + self.viewing_summary_dictionary[obj].get('set_dir', '') + '</td><td>' + \
-                                 str(int(self.viewing_summary_dictionary[obj]['max_az'])) + '&#0176 @ ' + \
-                                 str(self.viewing_summary_dictionary[obj]['max_az_hr']) + '</td><td style="white-space:nowrap">' + \
-                                 self.viewing_summary_dictionary[obj]['link'] + '</td><td>' + \
-                                 self.viewing_summary_dictionary[obj]['filters'] + '</td></tr>' + "\n"
-        self.html_summary = html_header(self.site_name, self.viewing_date_evening, self.plot_file_name,
-                                        self.half_dark_hours, 'true', self.summary_page_information) + \
-                                        self.html_summary + html_footer()
-        # note true means summary html
-
-    def write_out_summary_html(self):
-        with open(self.summary_filename, 'w') as f:
-            print(self.html_summary, file=f)
-
-    def add_footer(self):
-        self.html = html_header(self.site_name, self.viewing_date_evening, self.plot_file_name, self.half_dark_hours,
-                                self.utcoffset_int) + self.html + html_footer()
-
-
-def un_utc(date, hour):
-    local_hour = int(hour) - 4
-    if local_hour < 0:
-        local_hour += 24
-        yr = int(date[0:4])
-        m = int(date[5:7])
-        d = int(date[8:10])
-        new_date = datetime.date(yr, m, d) - datetime.timedelta(1)
-    else:
-        new_date = date
-    return str(new_date), local_hour
-
-
-def html_footer():
-    html_foot = "</table>\n" \
-                "<h5> Finder Charts provided by https://freestarcharts.com/ </h5>\n" \
-                "</body>"
-    return html_foot
-
-
-def return_sector(degree):
-    if 0 <= degree < 90:
-        return "N"
-    elif 90 <= degree < 180:
-        return "E"
-    elif 180 <= degree < 270:
-        return "S"
-    elif 270 <= degree < 360:
-        return "W"
-
-
-def html_header(location_name, viewing_date, plot_file_name, half_dark_hours, summary='false', summary_page_info = ''):
-    html_head = "<html><head><title>Astronomy Observation Suggestions</title>\n" \
-                "<style>table, th,\n \
-      td {\n \
-        padding: 3px; \n \
-        border: 1px solid black; \n \
-        border-collapse: collapse; \n \
-      } \n \
-    .dotgreen {\n\
-      height: 15px;\n\
-      width: 15px;\n\
-      background-color: #008000;\n\
-      border-radius: 50%;\n\
-      display: inline-block;\n\
-    }\n\
-    .dotred{\n\
-      height: 15px;\n\
-      width: 15px;\n\
-      background-color: #FF0000;\n\
-      border-radius: 50%;\n\
-      display: inline-block;\n\
-    }\n\
-    .dotorange{\n\
-      height: 15px;\n\
-      width: 15px;\n\
-      background-color: #FF8C00;\n\
-      border-radius: 50%;\n\
-      display: inline-block;\n\
-    }\n\
-    .main-table td, .main-table th {\n\
-      font-size: 85%;\n\
-    }\n\
-    </style></head>\n<body>\n"  # add location specific information
-    html_head += "<h2 style=\"font-family:verdana;\">Viewing Information for {0} On the evening of {1} through the "\
-            "following morning</h2>\n".format(location_name, viewing_date)
-    html_head += "<table> <tr><td>\n"
-    html_head += '<img src="{0}">\n'.format(plot_file_name)
-    html_head += "</td><td style=\"font-size:9pt;vertical-align:top;padding-left:10px\"> " + summary_page_info + " </td></tr>\n</table>\n"
-    #  html_head += "<h2>Viewing Items for {0} on {1}</h2>\n".format(location_name, viewing_date)
-    if summary == 'false':
-        html_head += "<h3>Azimuth Chart</h3>\n"
-        html_head += "<table style=\"font-family:verdana;\">\n" \
-                     "<tr><td>Direction</td><td>From</td><td>To</td></tr>\n" \
-                     "<tr><td> North</td>  <td>0&deg;  </td><td>89&deg;  </td></tr>\n"
-        html_head += "<tr><td> East </td>  <td>90&deg; </td><td>179&deg;  </td></tr>\n"
-        html_head += "<tr><td> South</td>  <td>180&deg;</td><td>269&deg;  </td></tr>\n"
-        html_head += "<tr><td> West </td>  <td>270&deg;</td><td>359&deg;  </td></tr> </table> <br>\n"
-        html_head += "<b>Jump to Hour: </b><a id=\"#Top\"></a>"
-        for hour in range((24 - half_dark_hours), 24, 1):
-            html_head += "<a href = \"#{0}\"> {0} </a> - ".format(hour)
-        for hour in range(0, half_dark_hours, 1):
-            html_head += "<a href = \"#{0}\"> {0} </a> - ".format(hour)
-        html_head += "<a href = \"#{0}\"> {0} </a> ".format(half_dark_hours)
-        html_head += "<table class=\"main-table\">\n"
-        html_head += header_row()
-    else:
-        html_head += "<table class=\"main-table\" style=\"font-family:verdana;\">\n"
-        html_head += summary_header_row()
-    return html_head
-
-
-def summary_header_row():
-    return "<tr><td colspan=9> </td></tr>\n "\
-            "<tr bgcolor=lightgrey style=\"page-break-after:avoid\"><td><b>Object</b></td><td><b>Type</b></td><td><b>Difficulty</b></td>"\
-            "<td><b>Rise Hour</b></td><td><b>Set Hour</b></td>" \
-            "<td><a href=\"https://en.wikipedia.org/wiki/Horizontal_coordinate_system\"><b>Max Altitude</b></a>" \
-            "</td><td><b>Finder Chart</b><br></td><td><b>Suggested Filter</b></td></tr>\n"
-
-
-def header_row():
-    return "<tr><td><b>Object</b></td><td><b>Type</b></td><td><b>Date</b></td><td><b>Hour</b></td>" \
-           "<td><b>Altitude</b></td><td><b>Azimuth</b></td><td><b>Finder Chart</b><br></td><td><b>Suggested Filter" \
-           "</b></td></tr>\n"
-
-
-def get_lunar_phase(lunar_date):
-    yr, m, d = map(int, lunar_date.split('-'))
-    date = datetime.date(yr, m, d)
-    phase = moon.phase(date)  # returns lunar phase as a float 0-29.53
-    # Convert to percentage of the moon cycle (0 new moon, 15 full moon)
-    percent = int((phase / 29.53) * 100)
-    return percent
-
-
-def convert_html_to_pdf(html_filename, pdf_filename):
-    from playwright.sync_api import sync_playwright
-    file_url = 'file:///' + os.path.abspath(html_filename).replace('\\', '/')
-    with sync_playwright() as p:
-        browser = p.chromium.launch()
-        page = browser.new_page()
-        page.goto(file_url, wait_until='networkidle')
-        page.pdf(path=pdf_filename, format='A4', landscape=True, print_background=True)
-        browser.close()
-    print(f"PDF created: {pdf_filename}")
-
-
-
-def get_elevation_in_feet(lat, long):
-    query = f'https://api.open-elevation.com/api/v1/lookup?locations={lat},{long}'
-    r = requests.get(query).json()
-    elevation_meters = r['results'][0]['elevation']
-    return round(elevation_meters * 3.28084)
 
 class MainApp:
+    poll_ms = 100  # how often the window picks up progress from the report thread
+
     def __init__(self, root):
         self.root = root
         root.title("Viewing Tonight")
@@ -780,9 +171,17 @@ class MainApp:
         root.resizable(False, False)
 
         self.location_data = None
-        self.geolocator    = Nominatim(user_agent='mainapp_viewer')
+        self.site_lookup   = Site.SiteLookup()
+        self.site_lookup.load_user_data_folder('user_data_folder')
+        self.ephemeris_cache = None  # Ephemeris.Cache.EphemerisCache, made on the first report
         self.font_config   = ("Segoe UI", 11)
 
+        # report generation runs on one background thread and talks back through the progress queue
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.progress = queue.Queue()
+        self.cancel_event = threading.Event()
+        self.report_job = None
+
         # ── Header ──────────────────────────────────────────────────────────
         hdr = tk.Frame(root, bg='#1e293b', pady=14)
         hdr.grid(row=0, column=0, columnspan=2, sticky='ew')
@@ -802,12 +201,33 @@ class MainApp:
         opts.grid(row=4, column=0, columnspan=2, sticky='ew', padx=10, pady=(10, 4))
 
         self.sort_by_rise_var = tk.BooleanVar(value=True)
-        tk.Checkbutton(opts, text="Sort summary table by Rise Hour",
+        tk.Checkbutton(opts, text="Sort summary table by Rise Time",
                        variable=self.sort_by_rise_var,
                        font=self.font_config, bg='#1e293b', fg='#e2e8f0',
                        selectcolor='#0f172a', activebackground='#1e293b',
                        activeforeground='#38bdf8').pack(anchor='w')
 
+        self.sort_by_score_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(opts, text="Sort summary table by Score (best first)",
+                       variable=self.sort_by_score_var,
+                       font=self.font_config, bg='#1e293b', fg='#e2e8f0',
+                       selectcolor='#0f172a', activebackground='#1e293b',
+                       activeforeground='#38bdf8').pack(anchor='w')
+
+        self.offline_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(opts, text="Offline (use saved locations and elevations only)",
+                       variable=self.offline_var, command=self._set_offline,
+                       font=self.font_config, bg='#1e293b', fg='#e2e8f0',
+                       selectcolor='#0f172a', activebackground='#1e293b',
+                       activeforeground='#38bdf8').pack(anchor='w')
+
+        self.trace_var = tk.BooleanVar(value=Trace.enabled())
+        tk.Checkbutton(opts, text="Trace the report (stage table and report_trace.json)",
+                       variable=self.trace_var,
+                       font=self.font_config, bg='#1e293b', fg='#e2e8f0',
+                       selectcolor='#0f172a', activebackground='#1e293b',
+                       activeforeground='#38bdf8').pack(anchor='w')
+
         elev_row = tk.Frame(opts, bg='#1e293b')
         elev_row.pack(anchor='w', pady=(8, 0))
         tk.Label(elev_row, text="Min Elevation (°):", font=self.font_config,
@@ -836,10 +256,17 @@ class MainApp:
                   activebackground='#475569', activeforeground='#e2e8f0',
                   **_btn).pack(side='left', padx=(0, 6))
 
-        tk.Button(btn_f, text="Generate Report  ›", command=self.generate_output,
-                  bg='#0369a1', fg='white',
-                  activebackground='#0284c7', activeforeground='white',
-                  **_btn).pack(side='left', padx=6)
+        self.generate_button = tk.Button(btn_f, text="Generate Report  ›", command=self.generate_output,
+                                         bg='#0369a1', fg='white',
+                                         activebackground='#0284c7', activeforeground='white',
+                                         **_btn)
+        self.generate_button.pack(side='left', padx=6)
+
+        self.cancel_button = tk.Button(btn_f, text="Cancel", command=self.cancel_output, state='disabled',
+                                       bg='#334155', fg='#e2e8f0',
+                                       activebackground='#475569', activeforeground='#e2e8f0',
+                                       **_btn)
+        self.cancel_button.pack(side='left', padx=6)
 
         tk.Button(btn_f, text="Save Location", command=self.save_location,
                   bg='#334155', fg='#e2e8f0',
@@ -851,7 +278,7 @@ class MainApp:
                                      bg='#0f172a', font=("Segoe UI", 10), width=55)
         self.status_label.grid(row=6, column=0, columnspan=2, pady=(4, 2))
 
-        tk.Button(root, text="Close", command=root.quit,
+        tk.Button(root, text="Close", command=self.close,
                   font=("Segoe UI", 11, "bold"), relief='flat',
                   bg='#7f1d1d', fg='#fca5a5',
                   activebackground='#991b1b', activeforeground='white',
@@ -883,8 +310,10 @@ class MainApp:
         return entry
 
     def get_coordinates(self, address):
-        location = self.geolocator.geocode(address)
-        return (location.latitude, location.longitude) if location else (None, None)
+        return self.site_lookup.get_coordinates(address)
+
+    def _set_offline(self):
+        self.site_lookup.offline = self.offline_var.get()
 
     def load_or_save(self):
         # Create a callback function to update the location entry
@@ -899,7 +328,8 @@ class MainApp:
 
         self.location_data = UserDataAppTkinter(tk.Toplevel(self.root), 
                                               location_entry_callback=update_location_entry,
-                                              location_name_callback=update_location_name)
+                                              location_name_callback=update_location_name,
+                                              site_lookup=self.site_lookup)
         # self.location_entry.insert(0,self.location_data.user_data.get('address'))
 
 
@@ -909,6 +339,10 @@ class MainApp:
         self.status_label.config(text="Location Saved", fg="green")
 
     def generate_output(self):
+        if self.report_job is not None and not self.report_job.done():
+            self.status_label.config(text="A report is already being generated", fg="orange")
+            return
+
         date_value = self.date_entry.get()
         location_value = self.location_entry.get()
         location_name_value = self.location_name_entry.get()
@@ -919,64 +353,139 @@ class MainApp:
 
         print(f"Date: {date_value}, Location: {location_value}")
 
-        # Convert location address to coordinates
-        lat, lon = self.get_coordinates(location_value)
-        if lat is None or lon is None:
-            messagebox.showerror("Error", f"Could not find coordinates for location: {location_value}")
-            return
-
-        # Use location name from entry field if provided, otherwise use location address
-        location_name = location_name_value if location_name_value else location_value
-
-        self.status_label.config(text="Generating…", fg="blue")
-        self.root.update_idletasks()
-
         def _parse_min_alt(direction):
             try:
                 return int(self.min_alt_entries[direction].get())
             except ValueError:
                 return 20
 
-        main_time = Timing('Main Time')
-        scan_sky = Viewing(lat, lon, location_name, date_value,
-                           min_alt_n=_parse_min_alt('N'), min_alt_e=_parse_min_alt('E'),
-                           min_alt_s=_parse_min_alt('S'), min_alt_w=_parse_min_alt('W'))
+        # Tk variables are only read here on the main thread, the report thread gets plain values
+        settings = {'date': date_value, 'location': location_value,
+                    # Use location name from entry field if provided, otherwise use location address
+                    'name': location_name_value if location_name_value else location_value,
+                    'sort_by_rise': self.sort_by_rise_var.get(),
+                    'sort_by_score': self.sort_by_score_var.get(),
+                    'trace': self.trace_var.get(),
+                    'min_alt': {f'min_alt_{d.lower()}': _parse_min_alt(d) for d in ['N', 'E', 'S', 'W']}}
+
+        self.cancel_event.clear()
+        self.generate_button.config(state='disabled')
+        self.cancel_button.config(state='normal')
+        self.status_label.config(text="Generating…", fg="blue")
+        self.report_job = self.executor.submit(self._run_report, settings)
+        self.root.after(self.poll_ms, self._poll_progress)
+
+    def cancel_output(self):
+        if self.report_job is not None and not self.report_job.done():
+            self.cancel_event.set()
+            self.status_label.config(text="Cancelling after the current step…", fg="orange")
+
+    def close(self):
+        self.cancel_event.set()
+        self.executor.shutdown(wait=False)
+        self.root.quit()
+
+    def _report_progress(self, text, fg="green"):
+        # called on the report thread, stops the run here when cancel was pressed
+        if self.cancel_event.is_set():
+            raise Cancelled()
+        self.progress.put(('status', text, fg))
+
+    def _poll_progress(self):
+        while True:
+            try:
+                kind, text, fg = self.progress.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'error':
+                messagebox.showerror("Error", text)
+            self.status_label.config(text=text, fg=fg)
+        if self.report_job.done() and self.progress.empty():
+            self.generate_button.config(state='normal')
+            self.cancel_button.config(state='disabled')
+        else:
+            self.root.after(self.poll_ms, self._poll_progress)
+
+    def _run_report(self, settings):
+        try:
+            self._generate(settings)
+        except Cancelled:
+            self.progress.put(('status', "Cancelled", "orange"))
+        except Exception as e:
+            self.progress.put(('error', f"Report failed: {e}", "red"))
+
+    def _generate(self, settings):
+        # everything slow happens here, off the Tk thread; progress goes back through self.progress
+        Trace.enable(settings['trace'])
+        Trace.reset()
+        with Trace.span('report', site=settings['name'], date=settings['date']) as report:
+            if not self._generate_stages(settings):
+                return
+        print(f"Main Time Elapsed time: {report.elapsed:.2f} seconds")
+        if Trace.enabled():
+            print(Trace.summary_table())
+            Trace.write_chrome_trace('report_trace.json')
+        self.progress.put(('status', "Done ✔", "darkgreen"))
+
+    def _generate_stages(self, settings):
+        # False when the location can not be found
+        self._report_progress("Loading the report code…", "blue")
+        with Trace.span('import'):
+            from Ephemeris import Cache
+            from Report.Report import Viewing, Targets, convert_html_to_pdf
+        if self.ephemeris_cache is None:
+            self.ephemeris_cache = Cache.EphemerisCache()
+
+        self._report_progress(f"Looking up {settings['location']}…", "blue")
+        # Convert location address to coordinates
+        lat, lon = self.get_coordinates(settings['location'])
+        if lat is None or lon is None:
+            self.progress.put(('error', f"Could not find coordinates for location: {settings['location']}", "red"))
+            return False
+
+        self._report_progress("Setting up the night…", "blue")
+        with Trace.span('construct'):
+            scan_sky = Viewing(lat, lon, settings['name'], settings['date'], **settings['min_alt'],
+                               engine='numpy', cache=self.ephemeris_cache, site_lookup=self.site_lookup)
+        print(f"Time zone {scan_sky.timezone}, UTC{scan_sky.utcoffset_minutes / 60:+g} at midnight")
 
         # Plot assets…
-        scan_sky.plot_sun_moon()
-        scan_sky.adjust_delta_midnight()
-        
+        self._report_progress("Plotting the sun and moon…")
+        with Trace.span('sun_moon'):
+            scan_sky.plot_sun_moon()
+            scan_sky.adjust_delta_midnight()
+
         # Process planets (keep sequential for better UI feedback)
-        planets_time = Timing('Planets Time')
-        for planet in scan_sky.planet_list:
-            self.status_label.config(text=f"Working on: {planet}", fg="green")
-            self.root.update_idletasks()
-            scan_sky.check_sky_tonight(planet)
-        planets_time.end_now()
-        planets_time.print_delta()
+        with Trace.span('planets') as planets_time:
+            for planet in scan_sky.planet_list:
+                self._report_progress(f"Working on: {planet}")
+                scan_sky.check_sky_tonight(planet)
+        print(f"Planets Time Elapsed time: {planets_time.elapsed:.2f} seconds")
 
         viewing_targets = Targets()
-        targets_time = Timing('Targets Time')
-        if 'target_group' in viewing_targets.data and viewing_targets.data["target_group"] == "messier":
-            self.status_label.config(text="Processing Messier objects...", fg="green")
-            self.root.update_idletasks()
-            scan_sky.check_all_messier()
-            self.status_label.config(text="Messier objects processing complete", fg="green")
-            self.root.update_idletasks()
-            
-        targets_time.end_now()
-        targets_time.print_delta()
-
-        scan_sky.sort_data()
-        scan_sky.set_html()
-        scan_sky.write_out_html()
-        scan_sky.make_summary_html(sort_by_rise=self.sort_by_rise_var.get())
-        scan_sky.write_out_summary_html()
-        convert_html_to_pdf(scan_sky.summary_filename, scan_sky.summary_pdf_filename)
-
-        main_time.end_now()
-        main_time.print_delta()
-        self.status_label.config(text="Done ✔", fg="darkgreen")
+        with Trace.span('targets') as targets_time:
+            if 'target_group' in viewing_targets.data and viewing_targets.data["target_group"] == "messier":
+                self._report_progress("Processing Messier objects...")
+                scan_sky.check_all_messier()
+                self._report_progress("Messier objects processing complete")
+            if viewing_targets.data.get('target_list'):
+                self._report_progress("Processing the target list...")
+                scan_sky.check_target_list(viewing_targets.data['target_list'])
+        print(f"Targets Time Elapsed time: {targets_time.elapsed:.2f} seconds")
+
+        self._report_progress("Planning the observing order…")
+        scan_sky.schedule()
+
+        self._report_progress("Writing the report…")
+        with Trace.span('html'):
+            scan_sky.sort_data()
+            scan_sky.write_out_html()
+            scan_sky.write_out_summary_html(sort_by_rise=settings['sort_by_rise'],
+                                            sort_by_score=settings['sort_by_score'])
+        self._report_progress("Writing the PDF…")
+        with Trace.span('pdf'):
+            convert_html_to_pdf(scan_sky.summary_filename, scan_sky.summary_pdf_filename)
+        return True
 
 if __name__ == '__main__':
     # Required for Windows multiprocessing
@@ -0,0 +1,37 @@
+import os
+
+import numpy as np
+
+from Ephemeris import Cache
+from Ephemeris.Cache import EphemerisCache
+
+
+def test_truncated_entry_is_a_miss(tmp_path):
+    cache = EphemerisCache(str(tmp_path))
+    key = cache.key(site='test')
+    cache.save(key, 'alt', np.arange(1000))
+    path = cache.path(key, 'alt')
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) // 2)
+    assert cache.load(key, 'alt') is None
+    assert cache.misses == 1
+
+
+def test_evicted_entries_are_ignored(tmp_path):
+    cache = EphemerisCache(str(tmp_path), max_bytes=0)
+    key = cache.key(site='test')
+    assert cache.save(key, 'alt', np.arange(10)).shape == (10,)
+    cache.evict()
+    cache.clear()
+    assert cache.load(key, 'alt') is None
+    assert cache.size() == 0
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
+
+
+def test_key_changes_with_version_and_options(tmp_path, monkeypatch):
+    cache = EphemerisCache(str(tmp_path))
+    key = cache.key(stage='fixed_targets', engine='numpy', options={'precess': True})
+    assert cache.key(stage='fixed_targets', engine='numpy', options={'precess': False}) != key
+    assert cache.key(stage='fixed_targets', engine='astropy', options={'precess': True}) != key
+    monkeypatch.setattr(Cache, 'CACHE_VERSION', Cache.CACHE_VERSION + 1)
+    assert cache.key(stage='fixed_targets', engine='numpy', options={'precess': True}) != key
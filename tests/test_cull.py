@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from Ephemeris import Cull, Ephemeris
+
+
+def cleared(ra, dec, latitude, longitude, jd_start, jd_end, min_alt):
+    # objects whose apparent place clears min_alt at some sample of the window
+    times = np.linspace(jd_start, jd_end, 200)
+    alt, _ = Ephemeris.FixedTargetEngine(times, latitude, longitude).altaz(ra, dec)
+    return (alt >= min_alt).any(axis=1)
+
+
+@pytest.mark.parametrize('jd', [Ephemeris.J2000, Ephemeris.J2000 - 36525.0 * 0.7, Ephemeris.J2000 + 36525.0])
+@pytest.mark.parametrize('latitude, dec_range', [(40.0, (-34.0, -26.0)), (0.0, (-40.0, 40.0))])
+def test_cull_keeps_everything_that_clears(jd, latitude, dec_range):
+    # decades either side of J2000: around the southern edge of the declination band, and on the equator where
+    # precession's shift in RA moves rising and setting objects' altitudes the most
+    rng = np.random.default_rng(1)
+    ra = rng.uniform(0.0, 360.0, 20000)
+    dec = rng.uniform(*dec_range, 20000)
+    longitude, min_alt = -75.0, 20.0
+    jd_start, jd_end = jd - 0.25, jd
+    keep = Cull.visible(ra, dec, latitude, longitude, jd_start, jd_end, min_alt)
+    sorted_dec, dec_order = np.sort(dec), np.argsort(dec)
+    in_band = np.zeros(len(dec), dtype=bool)
+    in_band[Cull.band_indices(sorted_dec, dec_order, latitude, min_alt, Cull.margin(jd))] = True
+    seen = cleared(ra, dec, latitude, longitude, jd_start, jd_end, min_alt)
+    assert seen.any()
+    assert not (seen & ~keep).any()
+    assert not (seen & ~in_band).any()
+    assert keep.sum() < len(ra)  # it still culls
+
+
+def test_margin_grows_with_precession():
+    assert Cull.margin(Ephemeris.J2000) == Cull.BASE_MARGIN
+    assert Cull.margin(Ephemeris.J2000 + 36525.0) == pytest.approx(Cull.BASE_MARGIN + 1.397, abs=0.001)
@@ -0,0 +1,35 @@
+import astropy.units as u
+import numpy as np
+import pytest
+from astropy.coordinates import AltAz, EarthLocation, SkyCoord
+from astropy.time import Time
+from astropy.utils import iers
+
+from Catalog import Catalog
+from Ephemeris.Ephemeris import FixedTargetEngine
+
+BOUND_DEG = 0.0005  # the bound stated at the top of Ephemeris.py
+
+
+@pytest.fixture(scope='module', autouse=True)
+def offline_iers():
+    # the tables astropy ships, the same ones both sides use
+    with iers.conf.set_temp('auto_download', False):
+        yield
+
+
+@pytest.mark.filterwarnings('ignore')  # dates past the IERS tables and the leap second list
+@pytest.mark.parametrize('date', ['2000-03-01', '2005-01-10', '2012-06-30', '2016-12-31', '2020-06-01',
+                                  '2025-05-11', '2033-11-20', '2050-12-31'])
+def test_fixed_targets_match_astropy(date):
+    messier = Catalog.shared('messier')
+    location = EarthLocation(lat=39.1 * u.deg, lon=-94.58 * u.deg, height=300 * u.m)
+    times = Time(date + ' 02:00') + np.linspace(0, 8, 9) * u.hour
+    expected = SkyCoord(messier.ra * u.deg, messier.dec * u.deg)[:, None].transform_to(
+        AltAz(obstime=times[None, :], location=location))
+    alt, az = FixedTargetEngine.from_time(times, location).altaz(messier.ra, messier.dec)
+    up = expected.alt.deg > 5.0
+    d_alt = np.abs(alt - expected.alt.deg)
+    d_az = np.abs((az - expected.az.deg + 180.0) % 360.0 - 180.0) * np.cos(expected.alt.rad)
+    assert d_alt[up].max() < BOUND_DEG
+    assert d_az[up].max() < BOUND_DEG
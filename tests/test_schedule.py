@@ -0,0 +1,35 @@
+import pytest
+from astropy.utils import iers
+
+from Report.Report import Viewing
+
+
+@pytest.fixture(scope='module', autouse=True)
+def offline_iers():
+    with iers.conf.set_temp('auto_download', False):
+        yield
+
+
+def planned(lat, long, date, timezone):
+    viewing = Viewing(lat, long, 'Test', date, engine='numpy', height=0, timezone=timezone)
+    viewing.adjust_delta_midnight()
+    for planet in viewing.planet_list:
+        viewing.check_sky_tonight(planet)
+    viewing.check_all_messier()
+    return viewing, viewing.schedule()
+
+
+@pytest.mark.filterwarnings('ignore')
+def test_no_plan_under_the_midnight_sun():
+    viewing, plan = planned(69.6492, 18.9553, '2025-06-21', 'Europe/Oslo')  # Tromso
+    assert viewing.dusk is None and viewing.dawn is None
+    assert len(viewing.plan_slots()) == 0
+    assert plan == []
+
+
+@pytest.mark.filterwarnings('ignore')
+def test_plan_covers_the_dark_night():
+    viewing, plan = planned(39.0997, -94.5786, '2025-10-20', 'America/Chicago')
+    start, stop = viewing.plan_window()
+    assert len(viewing.plan_slots()) == int((stop - start) * 60 / viewing.plan_slot_minutes)
+    assert len(plan) > 20
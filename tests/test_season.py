@@ -0,0 +1,42 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+from astropy.utils import iers
+
+from Report.Season import SeasonPlanner
+
+
+@pytest.fixture(scope='module', autouse=True)
+def offline_iers():
+    with iers.conf.set_temp('auto_download', False):
+        yield
+
+
+def planner(max_chunk_bytes):
+    season = SeasonPlanner(39.1, -94.58, 'Test', '2025-05-01', 30, timezone='America/Chicago')
+    season.max_chunk_bytes = max_chunk_bytes
+    return season
+
+
+def test_chunking_does_not_change_results():
+    whole = planner(1 << 40)
+    chunked = planner(2 * 1024 * 1024)
+    assert whole.chunk_size() >= len(whole.messier_keys) > chunked.chunk_size() > 1
+    expected, results = whole.compute(), chunked.compute()
+    for name in expected:
+        np.testing.assert_array_equal(results[name], expected[name])
+
+
+def test_chunk_stays_under_max_chunk_bytes():
+    season = planner(4 * 1024 * 1024)
+    season.compute_sun()
+    engine = season.fixed_engine()
+    step = season.chunk_size()
+    tracemalloc.start()
+    try:
+        season.chunk(engine, 0, step)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert peak <= season.max_chunk_bytes
@@ -0,0 +1,21 @@
+import numpy as np
+
+from Ephemeris import Events
+from Report import Report, Results
+
+AZS = [0.0, 89.999, 90.0, 359.5, 360.0]
+SECTORS = ['N', 'E', 'E', 'N', 'N']  # by the printed azimuth, int(az) + 1
+PRINTED = [1, 90, 91, 360, 361]
+
+
+def test_one_rule_everywhere():
+    assert [Results.SECTORS[q] for q in Events.quadrant(AZS)] == SECTORS
+    assert [Report.return_sector(az) for az in AZS] == SECTORS
+    assert Events.quadrant_thresholds(AZS, 10, 20, 30, 40).tolist() == [10, 20, 20, 10, 10]
+    assert Results.display_az(np.array(AZS)).tolist() == PRINTED
+
+
+def test_table_sector_column():
+    table = Results.VisibilityTable()
+    table.append('m1', np.full(len(AZS), 2460000.5), np.full(len(AZS), 45.0), AZS)
+    assert [row[5] for row in table.rows(np.arange(len(AZS)))] == SECTORS
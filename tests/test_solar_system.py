@@ -0,0 +1,36 @@
+import astropy.units as u
+import numpy as np
+import pytest
+from astropy.coordinates import AltAz, EarthLocation, get_body
+from astropy.time import Time
+from astropy.utils import iers
+
+from Ephemeris.SolarSystem import SolarSystemEphemeris, nodes
+
+
+@pytest.fixture(scope='module', autouse=True)
+def offline_iers():
+    with iers.conf.set_temp('auto_download', False):
+        yield
+
+
+def test_nodes_keep_gaps():
+    jd = np.concatenate([np.linspace(0, 0.5, 50), np.linspace(1, 1.5, 50)])
+    node = nodes(jd, 5.0 / 1440.0)
+    assert node[0] == 0 and node[-1] == len(jd) - 1
+    assert 49 in node and 50 in node  # both ends of the gap
+    assert np.diff(jd[node]).max() <= 0.5
+    assert (nodes(jd[::-1], 5.0 / 1440.0) == np.arange(len(jd))).all()
+
+
+def test_bodies_match_astropy():
+    location = EarthLocation(lat=41.26 * u.deg, lon=-73.6 * u.deg, height=140 * u.m)
+    times = Time('2025-05-12 04:00') + np.linspace(-12, 12, 1000) * u.hour
+    bodies = ['sun', 'moon', 'mercury', 'jupiter', 'neptune']
+    ephemeris = SolarSystemEphemeris(times, location, bodies)
+    frame = AltAz(obstime=times, location=location)
+    for i, body in enumerate(bodies):
+        expected = get_body(body, times, location).transform_to(frame)
+        assert np.abs(ephemeris.alt[i] - expected.alt.deg).max() < 1.0 / 3600
+        d_az = np.abs((ephemeris.az[i] - expected.az.deg + 180.0) % 360.0 - 180.0) * np.cos(expected.alt.rad)
+        assert d_az.max() < 1.0 / 3600
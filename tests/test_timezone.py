@@ -0,0 +1,27 @@
+import pytest
+
+from Site import TimeZone
+
+
+@pytest.mark.parametrize('lat, long, zone', [
+    (39.0997, -94.5786, 'America/Chicago'),  # Kansas City
+    (36.1627, -86.7816, 'America/Chicago'),  # Nashville
+    (37.5930, -112.1871, 'America/Denver'),  # Bryce Canyon
+    (33.4484, -112.0740, 'America/Phoenix'),
+    (69.6492, 18.9553, 'Europe/Oslo'),  # Tromso
+    (19.0760, 72.8777, 'Asia/Kolkata'),  # Mumbai
+    (64.8378, -147.7164, 'America/Anchorage'),  # Fairbanks
+    (40.7128, -74.0060, 'America/New_York'),
+    (51.5074, -0.1278, 'Europe/London'),
+    (-33.8688, 151.2093, 'Australia/Sydney'),
+    (-40.0, -140.0, 'Etc/GMT+9'),  # South Pacific
+])
+def test_zone_for(lat, long, zone):
+    assert TimeZone.zone_for(lat, long) == zone
+
+
+def test_border_zones():
+    # Utah keeps daylight saving time, Arizona does not
+    assert TimeZone.border_zones(36.99, -111.5, 'America/Phoenix', '2026-06-01') == ['America/Denver']
+    assert TimeZone.border_zones(36.99, -111.5, 'America/Phoenix', '2026-01-01') == []
+    assert TimeZone.border_zones(39.0997, -94.5786, 'America/Chicago', '2026-06-01') == []